@@ -0,0 +1,67 @@
+"""
+Native async versions of the highest-volume read endpoints. They mirror the
+synchronous routes under the `async/` prefix and return identical payloads;
+under ASGI they hold no thread while waiting on the database or cache.
+"""
+
+from django.urls import path
+
+from habit import async_views as habit_views
+from leagues import async_views as league_views
+from user import async_views as user_views
+
+urlpatterns = [
+    path(
+        "users/me/",
+        user_views.AsyncCurrentUserView.as_view(),
+        name="async-current-user",
+    ),
+    path(
+        "users/leaderboards/global/",
+        user_views.AsyncGlobalLeaderboardView.as_view(),
+        name="async-global-leaderboard",
+    ),
+    path("habits/", habit_views.AsyncHabitListView.as_view(), name="async-habit-list"),
+    path(
+        "habits/<int:pk>/",
+        habit_views.AsyncHabitDetailView.as_view(),
+        name="async-habit-detail",
+    ),
+    path(
+        "habits/me/logs/",
+        habit_views.AsyncUserHabitLogListView.as_view(),
+        name="async-user-habit-logs",
+    ),
+    path(
+        "leagues/", league_views.AsyncLeagueListView.as_view(), name="async-league-list"
+    ),
+    path(
+        "leagues/<int:pk>/",
+        league_views.AsyncLeagueDetailsView.as_view(),
+        name="async-league-detail",
+    ),
+    path(
+        "leagues/leaderboards/<int:league_id>/",
+        league_views.AsyncLeagueLeaderboardView.as_view(),
+        name="async-league-leaderboard",
+    ),
+    path(
+        "leagues/leaderboards/<int:league_id>/stream/",
+        league_views.AsyncLeagueLeaderboardStreamView.as_view(),
+        name="async-league-leaderboard-stream",
+    ),
+]
+
+# Maximum queries per request, enforced in tests by QueryBudgetAPIClient.
+# Each includes one query for resolving the user on a cold auth cache.
+query_budgets = {
+    "async-current-user": 2,
+    "async-global-leaderboard": 2,
+    "async-habit-list": 2,
+    "async-habit-detail": 2,
+    "async-user-habit-logs": 2,
+    "async-league-list": 3,
+    "async-league-detail": 3,
+    "async-league-leaderboard": 2,
+    "async-league-leaderboard-stream": 2,
+}
@@ -1,6 +1,7 @@
 from pathlib import Path
 import os
 from datetime import timedelta
+import dj_database_url
 from dotenv import load_dotenv
 
 
@@ -25,16 +26,65 @@ ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "").split(",")
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.CachedJWTAuthentication",
+    ),
+    # orjson-backed JSON; both fall back to the stdlib when it isn't installed.
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ),
 }
 
+# Seconds an authenticated user (with plan and progress) stays cached.
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+
+# Each process reads the change stamps of its locally cached data (plans,
+# users, response namespaces) from the database at most this often (seconds).
+CACHE_STAMP_INTERVAL = float(os.getenv("CACHE_STAMP_INTERVAL", "1"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=int(os.getenv("ACCESS_TOKEN_LIFETIME"))),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=int(os.getenv("REFRESH_TOKEN_LIFETIME"))),
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Opaque refresh tokens must be visible to every worker: either the database
+# store, or "user.tokens.CacheTokenStore" together with a shared cache below.
+OPAQUE_TOKEN_STORE = os.getenv("OPAQUE_TOKEN_STORE", "user.tokens.DatabaseTokenStore")
+
+# Run queued tasks in-process when the transaction commits instead of via
+# the run_worker command (handy for local development). Without it, XP
+# awards and league activity only happen once run_worker is running.
+TASKS_EAGER = os.getenv("TASKS_EAGER", "False") == "True"
+
+# Logs older than this (rounded down to whole months) are compacted into
+# HabitLogArchive by the archive_habit_logs command.
+HABIT_LOG_ARCHIVE_DAYS = int(os.getenv("HABIT_LOG_ARCHIVE_DAYS", "365"))
+
+# League activity timelines keep the newest LEAGUE_FEED_CAP entries. Leagues
+# above LEAGUE_FEED_FANOUT_LIMIT members merge member activity on read instead.
+LEAGUE_FEED_CAP = int(os.getenv("LEAGUE_FEED_CAP", "500"))
+LEAGUE_FEED_FANOUT_LIMIT = int(os.getenv("LEAGUE_FEED_FANOUT_LIMIT", "5000"))
+
+# Live leaderboard streams read each watched league at most this often
+# (seconds), however many score changes and watchers there are.
+LEAGUE_LIVE_INTERVAL = float(os.getenv("LEAGUE_LIVE_INTERVAL", "1"))
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+    LEAGUE_LIVE_BACKEND = "leagues.live.RedisBackend"
+    LEAGUE_LIVE_REDIS_URL = os.getenv("REDIS_URL")
+
 
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -54,15 +104,37 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.QueryInstrumentationMiddleware",
+    "core.routers.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Expose per-request query count and DB time as Server-Timing headers.
+QUERY_INSTRUMENTATION_HEADERS = DEBUG
+
+# Profile this fraction of requests (0 disables sampling). Staff can also
+# profile a single request by sending the PROFILING_HEADER header; results
+# are browsable in the admin under Request profiles.
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_HEADER = "X-Profile"
+
+# Prometheus metrics at /metrics/, readable with "Authorization: Bearer
+# <METRICS_TOKEN>" or from an address listed in METRICS_ALLOWED_IPS (empty
+# by default; behind a proxy every request may come from 127.0.0.1). Set
+# METRICS_DIR to a directory shared by all worker processes to aggregate
+# across them.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv("METRICS_ALLOWED_IPS", "").split(",") if ip]
+METRICS_DIR = os.getenv("METRICS_DIR")
+
 ROOT_URLCONF = "api.urls"
 
 TEMPLATES = [
@@ -94,6 +166,24 @@ DATABASES = {
     }
 }
 
+# Optional read replica. Safe requests read from it unless the user wrote in
+# the last REPLICA_STICKY_SECONDS. Without DATABASE_REPLICA_URL the alias
+# still exists as a second connection to the primary, and tests mirror it
+# onto the test database; that connection cannot see a TestCase's
+# uncommitted data, so only tests that enable DATABASE_REPLICAS themselves
+# (see core.tests) read from it. Leave DATABASE_REPLICA_URL unset when
+# running the test suite.
+if os.getenv("DATABASE_REPLICA_URL"):
+    DATABASES["replica"] = dj_database_url.parse(os.getenv("DATABASE_REPLICA_URL"))
+    DATABASE_REPLICAS = ["replica"]
+else:
+    DATABASES["replica"] = dict(DATABASES["default"])
+    DATABASE_REPLICAS = []
+DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
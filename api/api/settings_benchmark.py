@@ -0,0 +1,23 @@
+"""
+Settings for `manage.py benchmark`: the project settings on an in-memory
+SQLite database, so micro-benchmarks are repeatable and never touch real data.
+"""
+
+import os
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ACCESS_TOKEN_LIFETIME", "5")
+os.environ.setdefault("REFRESH_TOKEN_LIFETIME", "1")
+
+from .settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
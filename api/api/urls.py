@@ -3,9 +3,13 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("users/", include("user.urls")),
     path("leagues/", include("leagues.urls")),
     path("habits/", include("habit.urls")),
+    path("async/", include("api.async_urls")),
+    path("metrics/", metrics_view, name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
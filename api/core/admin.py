@@ -1,3 +1,82 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-# Register your models here.
+from .changelists import LargeTableAdminMixin
+from .models import RequestProfile, Task
+
+
+@admin.register(Task)
+class TaskAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "run_at", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "idempotency_key")
+    readonly_fields = ("created_at", "finished_at", "locked_until", "last_error")
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "url_name",
+        "method",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "created_at",
+    )
+    list_filter = ("url_name", "method", "status_code")
+    search_fields = ("url_name", "path")
+    ordering = ("-duration_ms",)
+    exclude = ("stats", "summary")
+    readonly_fields = (
+        "url_name",
+        "method",
+        "path",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "created_at",
+        "download",
+        "call_tree",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="core_requestprofile_download",
+            )
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if not self.has_view_permission(request, profile):
+            raise PermissionDenied
+        response = HttpResponse(
+            bytes(profile.stats), content_type="application/octet-stream"
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{profile.url_name or "request"}-{pk}.prof"'
+        )
+        return response
+
+    @admin.display(description="pstats file")
+    def download(self, obj):
+        url = reverse("admin:core_requestprofile_download", args=[obj.pk])
+        return format_html(
+            '<a href="{}">Download</a> (open with snakeviz or flameprof)', url
+        )
+
+    @admin.display(description="Call tree (by cumulative time)")
+    def call_tree(self, obj):
+        return format_html("<pre>{}</pre>", obj.summary)
@@ -0,0 +1,60 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .authentication import CachedJWTAuthentication
+from .renderers import FastJSONRenderer
+
+
+class AsyncReadView(View):
+    """
+    Base class for native async read endpoints served under ASGI.
+
+    Authenticates with the same JWT + user cache as the DRF views, awaits the
+    ORM and cache directly, and renders with the same JSON renderer so
+    payloads are identical to the synchronous endpoints. Subclasses implement
+    `async def get()` and return `self.render(data)`.
+    """
+
+    http_method_names = ["get", "head", "options"]
+    authentication_required = True
+    authentication = CachedJWTAuthentication()
+    renderer = FastJSONRenderer()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            result = await self.authenticate(request)
+        except (exceptions.AuthenticationFailed, InvalidToken) as exc:
+            detail = exc.detail
+            return self.unauthorized(
+                detail if isinstance(detail, dict) else {"detail": detail}
+            )
+        request.user = result[0] if result else AnonymousUser()
+
+        if self.authentication_required and not request.user.is_authenticated:
+            return self.unauthorized(exceptions.NotAuthenticated.default_detail)
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        """(user, token) for the request's credentials, or None without any."""
+        return await self.authentication.aauthenticate(request)
+
+    def render(self, data, status=status.HTTP_200_OK):
+        return HttpResponse(
+            self.renderer.render(data),
+            content_type="application/json",
+            status=status,
+        )
+
+    def not_found(self):
+        return self.render(
+            {"detail": exceptions.NotFound.default_detail},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    def unauthorized(self, data):
+        response = self.render(data, status.HTTP_401_UNAUTHORIZED)
+        response["WWW-Authenticate"] = self.authentication.authenticate_header(None)
+        return response
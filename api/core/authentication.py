@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .metrics import AUTH_CACHE
+from .stamps import stamps
+
+USER_CACHE_TTL = 60
+# Bumped by the plan registry on every Plan change.
+PLANS_STAMP = "plans"
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def user_stamp(user_id):
+    return f"user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user's cached entry here and, via its stamp, in every process."""
+    stamps.bump(user_stamp(user_id))
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the user, with plan and progress
+    preloaded, from a short-TTL cache instead of querying on every request.
+
+    Entries are stored with the plans stamp and the user's own stamp (see
+    core.stamps), so a plan change invalidates them all and a user or
+    progress change invalidates that user's entry, in every process.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = user_cache_key(user_id)
+        tokens = stamps.get_many([PLANS_STAMP, user_stamp(user_id)])
+        user = self.from_cache(cache.get(key), tokens)
+        AUTH_CACHE.inc(result="miss" if user is None else "hit")
+        if user is None:
+            user = self.load_user(user_id)
+            cache.set(*self.cache_entry(key, tokens, user))
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of authenticate() for native async views."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user = await self.acached_user(self.get_user_id(validated_token))
+        return self.check_user(user, validated_token)
+
+    async def acached_user(self, user_id):
+        """The user from the cache, loading and caching it on a miss."""
+        key = user_cache_key(user_id)
+        tokens = await stamps.aget_many([PLANS_STAMP, user_stamp(user_id)])
+        user = self.from_cache(await cache.aget(key), tokens)
+        AUTH_CACHE.inc(result="miss" if user is None else "hit")
+        if user is None:
+            user = await self.aload_user(user_id)
+            await cache.aset(*self.cache_entry(key, tokens, user))
+        return user
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+    def from_cache(self, entry, tokens):
+        if entry is not None and entry[0] == tokens:
+            return entry[1]
+        return None
+
+    def cache_entry(self, key, tokens, user):
+        return (
+            key,
+            (tokens, user),
+            getattr(settings, "AUTH_USER_CACHE_TTL", USER_CACHE_TTL),
+        )
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+    def user_queryset(self):
+        return self.user_model.objects.select_related("plan", "progress")
+
+    def load_user(self, user_id):
+        try:
+            return self.user_queryset().get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            ) from e
+
+    async def aload_user(self, user_id):
+        try:
+            return await self.user_queryset().aget(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            ) from e
@@ -0,0 +1,218 @@
+"""
+CPU micro-benchmarks for code that runs on every request. Run them with
+`python manage.py benchmark --settings=api.settings_benchmark`.
+
+A benchmark is a function decorated with @benchmark that receives the shared
+fixture and returns a zero-argument callable; the runner times that callable.
+"""
+
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+BENCHMARKS = {}
+
+
+def benchmark(name, number=100):
+    def register(func):
+        BENCHMARKS[name] = (func, number)
+        return func
+
+    return register
+
+
+def run(func, number, repeat):
+    """Return per-call timings (seconds) for `repeat` rounds of `number` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+class Fixture:
+    """Data shared by all benchmarks, created once in the in-memory database."""
+
+    def __init__(self, size=1000):
+        from habit.models import Habit, HabitLog
+        from leagues.models import League
+        from user.models import CustomUser, UserProgress
+
+        User = get_user_model()
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                [
+                    User(email=f"bench-{i}@example.com", first_name=f"B{i}")
+                    for i in range(size)
+                ]
+            )
+            UserProgress.objects.bulk_create(
+                [UserProgress(user=user, xp=i * 7) for i, user in enumerate(users)]
+            )
+            self.habit = Habit.objects.create(name="Benchmark habit")
+            League.objects.bulk_create(
+                [
+                    League(
+                        created_by=users[i],
+                        title=f"League {i}",
+                        habit=self.habit,
+                        start_date=date.today(),
+                        end_date=date.today() + timedelta(days=7),
+                    )
+                    for i in range(size)
+                ]
+            )
+            self.user = users[0]
+            self.log = HabitLog.objects.create(user=self.user, habit=self.habit)
+
+        self.users = list(
+            CustomUser.objects.select_related("plan", "progress").prefetch_related(
+                "habits"
+            )[:size]
+        )
+        self.leagues = list(
+            League.objects.select_related("created_by").prefetch_related(
+                "participants"
+            )[:size]
+        )
+
+
+def progress_at_level(level):
+    from user.models import UserProgress
+
+    progress = UserProgress(level=level)
+    progress.xp = progress.xp_for_level(level)
+    return progress
+
+
+@benchmark("progress.xp_for_level[1-50]", number=200)
+def bench_xp_for_level_low(fixture):
+    progress = progress_at_level(1)
+    return lambda: [progress.xp_for_level(level) for level in range(1, 51)]
+
+
+@benchmark("progress.calculate_level[L5]", number=2000)
+def bench_calculate_level_5(fixture):
+    return progress_at_level(5).calculate_level
+
+
+@benchmark("progress.calculate_level[L20]", number=500)
+def bench_calculate_level_20(fixture):
+    return progress_at_level(20).calculate_level
+
+
+@benchmark("progress.calculate_level[L50]", number=50)
+def bench_calculate_level_50(fixture):
+    return progress_at_level(50).calculate_level
+
+
+@benchmark("serializer.UserSerializer[1k]", number=3)
+def bench_user_serializer(fixture):
+    from user.serializers import UserSerializer
+
+    return lambda: UserSerializer(fixture.users, many=True).data
+
+
+@benchmark("serializer.LeaguesSerializer[1k]", number=3)
+def bench_leagues_serializer(fixture):
+    from leagues.serializers import LeaguesSerializer
+
+    return lambda: LeaguesSerializer(fixture.leagues, many=True).data
+
+
+@benchmark("habitlog.save+signal", number=200)
+def bench_habit_log_save(fixture):
+    log = fixture.log
+
+    def toggle():
+        log.completed = not log.completed
+        log.save()
+
+    return toggle
+
+
+@benchmark("view.OpaqueRefreshView.rotate", number=100)
+def bench_refresh_rotation(fixture):
+    from user.tokens import get_token_store
+    from user.views import OpaqueRefreshView
+
+    view = OpaqueRefreshView.as_view()
+    factory = APIRequestFactory()
+    state = {"opaque": get_token_store().issue(RefreshToken.for_user(fixture.user))}
+
+    def rotate():
+        request = factory.post(
+            "/users/token/refresh/", {"refresh": state["opaque"]}, format="json"
+        )
+        response = view(request)
+        state["opaque"] = response.data["refresh"]
+
+    return rotate
+
+
+def large_list_payload(size=10_000):
+    """Rows shaped like the log list and plan payloads, with raw date/Decimal values."""
+    from decimal import Decimal
+    from django.utils import timezone
+
+    now = timezone.now()
+    return [
+        {
+            "id": i,
+            "habit": i % 50,
+            "user": i % 1000,
+            "date": date.today() - timedelta(days=i % 365),
+            "completed": bool(i % 3),
+            "price_monthly": Decimal("9.99"),
+            "created_at": now,
+        }
+        for i in range(size)
+    ]
+
+
+@benchmark("render.JSONRenderer[10k rows]", number=3)
+def bench_drf_json_renderer(fixture):
+    from rest_framework.renderers import JSONRenderer
+
+    data = large_list_payload()
+    return lambda: JSONRenderer().render(data)
+
+
+@benchmark("render.FastJSONRenderer[10k rows]", number=3)
+def bench_fast_json_renderer(fixture):
+    from .renderers import FastJSONRenderer
+
+    data = large_list_payload()
+    return lambda: FastJSONRenderer().render(data)
+
+
+@benchmark("parse.JSONParser[10k rows]", number=3)
+def bench_drf_json_parser(fixture):
+    from io import BytesIO
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    body = JSONRenderer().render(large_list_payload())
+    return lambda: JSONParser().parse(BytesIO(body))
+
+
+@benchmark("parse.FastJSONParser[10k rows]", number=3)
+def bench_fast_json_parser(fixture):
+    from io import BytesIO
+    from rest_framework.renderers import JSONRenderer
+    from .parsers import FastJSONParser
+
+    body = JSONRenderer().render(large_list_payload())
+    return lambda: FastJSONParser().parse(BytesIO(body))
@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmarks import BENCHMARKS, Fixture, run
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / "benchmark_baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the CPU micro-benchmarks against in-memory SQLite and compare "
+        "with the stored baseline. Use --settings=api.settings_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Only run these benchmarks.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store these results as the new baseline.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.25,
+            help="Ratio to baseline above which a benchmark is a regression.",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error when any benchmark regressed.",
+        )
+
+    def handle(self, *args, **options):
+        if (
+            connection.vendor != "sqlite"
+            or connection.settings_dict["NAME"] != ":memory:"
+        ):
+            raise CommandError(
+                "Benchmarks must run on in-memory SQLite: "
+                "pass --settings=api.settings_benchmark."
+            )
+
+        unknown = set(options["names"]) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        call_command("migrate", verbosity=0)
+        fixture = Fixture()
+
+        results = {}
+        for name, (factory, number) in BENCHMARKS.items():
+            if options["names"] and name not in options["names"]:
+                continue
+            results[name] = run(factory(fixture), number, options["repeat"])
+
+        baseline_path = Path(options["baseline"])
+        baseline = {}
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+
+        regressions = self.report(results, baseline, options["threshold"])
+
+        if options["save_baseline"]:
+            baseline.update(results)
+            baseline_path.write_text(
+                json.dumps(baseline, indent=2, sort_keys=True) + "\n"
+            )
+            self.stdout.write(f"Baseline written to {baseline_path}")
+
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"Regressed: {', '.join(regressions)}")
+
+    def report(self, results, baseline, threshold):
+        regressions = []
+        self.stdout.write(
+            f"{'benchmark':<38}{'median':>12}{'min':>12}{'baseline':>12}{'ratio':>8}"
+        )
+        for name, result in results.items():
+            row = f"{name:<38}{result['median'] * 1e6:>10.1f}us{result['min'] * 1e6:>10.1f}us"
+            previous = baseline.get(name)
+            if previous:
+                ratio = result["median"] / previous["median"]
+                row += f"{previous['median'] * 1e6:>10.1f}us{ratio:>8.2f}"
+                if ratio > threshold:
+                    regressions.append(name)
+                    row = self.style.ERROR(row + "  REGRESSION")
+                elif ratio < 1 / threshold:
+                    row = self.style.SUCCESS(row + "  faster")
+            else:
+                row += f"{'-':>12}{'-':>8}"
+            self.stdout.write(row)
+        return regressions
@@ -0,0 +1,208 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from .seed_load import LOAD_PASSWORD
+
+# Relative weight of each scenario step; token refresh happens on its own
+# schedule (every `--refresh-every` requests) to mimic real clients.
+SCENARIO = {
+    "check-in": 4,
+    "league-leaderboard": 4,
+    "global-leaderboard": 2,
+    "league-list": 1,
+    "habit-logs": 2,
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1)))
+    )
+    return sorted_values[index]
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.access = None
+        self.refresh = None
+
+    def call(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if self.access:
+            request.add_header("Authorization", f"Bearer {self.access}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the real API routes of a running server with concurrent "
+        "simulated users created by seed_load, and report latency "
+        "percentiles of successful responses and error counts per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--duration", type=float, default=30.0)
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=1000,
+            help="Pick simulated users among the first N seeded users.",
+        )
+        parser.add_argument("--refresh-every", type=int, default=50)
+        parser.add_argument("--timeout", type=float, default=10.0)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+        self.deadline = time.monotonic() + options["duration"]
+
+        self.discover_targets()
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            futures = [
+                pool.submit(self.worker, options["seed"] + worker)
+                for worker in range(options["concurrency"])
+            ]
+            for future in futures:
+                future.result()
+        self.report(time.monotonic() - started)
+
+    def discover_targets(self):
+        client = Client(self.options["base_url"], self.options["timeout"])
+        self.login(client, random.Random(self.options["seed"]))
+        status, body = client.call("GET", reverse("league-list"))
+        if status != 200:
+            raise CommandError(f"Could not list leagues (HTTP {status}).")
+        self.league_ids = [league["id"] for league in json.loads(body)]
+        if not self.league_ids:
+            raise CommandError("No leagues found; run seed_load first.")
+
+    def timed(self, name, client, method, path, body=None):
+        start = time.perf_counter()
+        status, content = client.call(method, path, body)
+        elapsed = time.perf_counter() - start
+        # Errors return early or fail fast, so they are counted by status
+        # but kept out of the latency percentiles.
+        with self.lock:
+            if 200 <= status < 300:
+                self.latencies[name].append(elapsed)
+            else:
+                self.errors[name][status] += 1
+        return status, content
+
+    def login(self, client, rng):
+        email = f"{self.options['prefix']}-{rng.randrange(self.options['users'])}@example.com"
+        status, body = self.timed(
+            "token-obtain",
+            client,
+            "POST",
+            reverse("token_obtain_pair"),
+            {"email": email, "password": LOAD_PASSWORD},
+        )
+        if status != 200:
+            raise CommandError(f"Login failed for {email} (HTTP {status}).")
+        tokens = json.loads(body)
+        client.access, client.refresh = tokens["access"], tokens["refresh"]
+
+    def refresh(self, client):
+        status, body = self.timed(
+            "token-refresh",
+            client,
+            "POST",
+            reverse("token_refresh"),
+            {"refresh": client.refresh},
+        )
+        if status == 200:
+            tokens = json.loads(body)
+            client.access, client.refresh = tokens["access"], tokens["refresh"]
+
+    def own_habits(self, client):
+        """The ids of the habits the logged-in user is subscribed to."""
+        status, body = client.call("GET", reverse("current-user"))
+        if status != 200:
+            raise CommandError(f"Could not load the current user (HTTP {status}).")
+        return json.loads(body)["habits"]
+
+    def worker(self, seed):
+        rng = random.Random(seed)
+        client = Client(self.options["base_url"], self.options["timeout"])
+        self.login(client, rng)
+        habit_ids = self.own_habits(client)
+        scenario = {
+            step: weight
+            for step, weight in SCENARIO.items()
+            if habit_ids or step != "check-in"
+        }
+        names, weights = zip(*scenario.items())
+
+        requests = 0
+        while time.monotonic() < self.deadline:
+            requests += 1
+            if requests % self.options["refresh_every"] == 0:
+                self.refresh(client)
+                continue
+
+            step = rng.choices(names, weights)[0]
+            if step == "check-in":
+                # The idempotent upsert real clients use: repeating a
+                # check-in (seed_load already logged today) is not an error.
+                path = reverse("habit-today", args=[rng.choice(habit_ids)])
+                self.timed(step, client, "PUT", path, {"completed": rng.random() < 0.8})
+            elif step == "league-leaderboard":
+                path = reverse("league_leaderboard", args=[rng.choice(self.league_ids)])
+                self.timed(step, client, "GET", path)
+            elif step == "global-leaderboard":
+                self.timed(step, client, "GET", reverse("global-leaderboard"))
+            elif step == "league-list":
+                self.timed(step, client, "GET", reverse("league-list"))
+            elif step == "habit-logs":
+                self.timed(step, client, "GET", reverse("user-habit-logs"))
+
+    def report(self, elapsed):
+        header = f"{'endpoint':<20}{'ok':>8}{'errors':>8}{'rps':>9}"
+        header += "".join(f"{name:>10}" for name in ("p50", "p90", "p99", "max"))
+        self.stdout.write(header + "   (ms, 2xx only)")
+        for name in sorted(self.latencies.keys() | self.errors.keys()):
+            values = sorted(self.latencies[name])
+            errors = sum(self.errors[name].values())
+            row = f"{name:<20}{len(values):>8}{errors:>8}"
+            row += f"{len(values) / elapsed:>9.1f}"
+            for pct in (50, 90, 99, 100):
+                row += f"{percentile(values, pct) * 1000:>10.1f}"
+            self.stdout.write(row)
+
+        failed = {name: codes for name, codes in self.errors.items() if codes}
+        if failed:
+            self.stdout.write(self.style.WARNING("Non-2xx responses:"))
+            for name in sorted(failed):
+                codes = ", ".join(
+                    f"HTTP {status}: {count}"
+                    for status, count in sorted(failed[name].items())
+                )
+                self.stdout.write(f"  {name:<18}{codes}")
@@ -0,0 +1,123 @@
+import logging
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Task
+from core.queue import claim, execute
+
+PURGE_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background tasks. Each process claims batches of due "
+        "tasks and runs them on a thread pool; failed tasks are retried with "
+        "exponential backoff up to their max_attempts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument(
+            "--poll", type=float, default=1.0, help="Seconds to sleep when idle."
+        )
+        parser.add_argument(
+            "--lease",
+            type=int,
+            default=300,
+            help="Seconds before a claimed task counts as abandoned.",
+        )
+        parser.add_argument(
+            "--keep-done",
+            type=int,
+            default=24,
+            help="Hours to keep finished tasks (and their idempotency keys).",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when the queue is drained."
+        )
+
+    def handle(self, *args, **options):
+        autodiscover_modules("tasks")
+        self.stopping = False
+
+        if options["processes"] <= 1:
+            self.work(options)
+            return
+
+        # Children must not share the parent's database connections.
+        connections.close_all()
+        workers = [
+            multiprocessing.get_context("fork").Process(
+                target=self.work, args=(options,)
+            )
+            for _ in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def work(self, options):
+        previous_handler = signal.signal(signal.SIGTERM, self.stop)
+        processed = 0
+        last_purge = 0
+
+        pool = None
+        if options["threads"] > 1:
+            pool = ThreadPoolExecutor(max_workers=options["threads"])
+
+        try:
+            while not self.stopping:
+                if time.monotonic() - last_purge > PURGE_INTERVAL:
+                    self.purge(options["keep_done"])
+                    last_purge = time.monotonic()
+
+                try:
+                    tasks = claim(options["batch_size"], options["lease"])
+                except DatabaseError:
+                    logger.exception("Could not claim tasks; retrying.")
+                    close_old_connections()
+                    time.sleep(options["poll"])
+                    continue
+                if tasks:
+                    processed += len(tasks)
+                    self.run_batch(pool, tasks)
+                elif options["once"]:
+                    break
+                else:
+                    time.sleep(options["poll"])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            signal.signal(signal.SIGTERM, previous_handler)
+
+        self.stdout.write(f"Processed {processed} tasks.")
+
+    def run_batch(self, pool, tasks):
+        # With a single thread, tasks run inline on this process' connection.
+        if pool is None:
+            return [execute(record) for record in tasks]
+        return list(pool.map(self.run_in_thread, tasks))
+
+    def run_in_thread(self, record):
+        close_old_connections()
+        return execute(record)
+
+    def purge(self, keep_hours):
+        cutoff = timezone.now() - timedelta(hours=keep_hours)
+        Task.objects.filter(status=Task.DONE, finished_at__lt=cutoff).delete()
+
+    def stop(self, signum, frame):
+        self.stopping = True
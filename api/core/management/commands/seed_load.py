@@ -0,0 +1,232 @@
+import random
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from habit.models import Habit, HabitLog
+from leagues.lifecycle import initial_status
+from leagues.models import League, LeagueParticipant
+from user.models import CustomUser, Plan, UserProgress, UserScore, UserUsage
+
+LOAD_PASSWORD = "load-test-password"
+
+
+@contextmanager
+def explicit_value(model, field_name):
+    """
+    Let bulk_create keep the value we set on an auto_now_add field, so logs
+    can be seeded with historical dates. Only safe in a one-off command.
+    """
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate production-scale synthetic data (users, habits, logs, "
+        "leagues) with chunked bulk inserts. The same --seed always produces "
+        f"the same data. Seeded users log in with '{LOAD_PASSWORD}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument("--users", type=int, default=200_000)
+        parser.add_argument("--habits", type=int, default=50)
+        parser.add_argument("--habits-per-user", type=int, default=3)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument(
+            "--log-probability",
+            type=float,
+            default=0.6,
+            help="Chance that a user logged a subscribed habit on a given day.",
+        )
+        parser.add_argument("--leagues", type=int, default=200)
+        parser.add_argument(
+            "--largest-league",
+            type=int,
+            default=50_000,
+            help="Participants in the first league; the rest get up to 1000.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.prefix = options["prefix"]
+
+        if CustomUser.objects.filter(email__startswith=f"{self.prefix}-").exists():
+            raise CommandError(
+                f"Users with prefix '{self.prefix}' already exist; "
+                "use another --prefix or a fresh database."
+            )
+
+        user_ids = self.seed_users(options["users"])
+        habit_ids = self.seed_habits(options["habits"])
+        subscriptions = self.seed_subscriptions(
+            user_ids, habit_ids, options["habits_per_user"]
+        )
+        self.seed_logs(subscriptions, options["days"], options["log_probability"])
+        self.seed_leagues(
+            user_ids, habit_ids, options["leagues"], options["largest_league"]
+        )
+
+        self.stdout.write("Reconciling usage counters...")
+        call_command("reconcile_usage", batch_size=self.batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS("Seeding complete."))
+
+    def progress(self, label, done, total):
+        self.stdout.write(f"\r{label}: {done}/{total}", ending="")
+        if done >= total:
+            self.stdout.write("")
+
+    def seed_users(self, count):
+        plans = list(Plan.objects.order_by("id"))
+        if not plans:
+            raise CommandError("No plans found; run migrate first.")
+        weights = [0.8, 0.15, 0.05][: len(plans)] + [0.0] * (len(plans) - 3)
+        # Hashing once keeps seeding fast; every seeded user shares the hash.
+        password = make_password(LOAD_PASSWORD)
+
+        user_ids = []
+        for start in range(0, count, self.batch_size):
+            stop = min(start + self.batch_size, count)
+            users = [
+                CustomUser(
+                    email=f"{self.prefix}-{i}@example.com",
+                    first_name=f"Load{i}",
+                    last_name="User",
+                    plan=self.rng.choices(plans, weights)[0],
+                    password=password,
+                )
+                for i in range(start, stop)
+            ]
+            with transaction.atomic():
+                users = CustomUser.objects.bulk_create(users)
+                UserProgress.objects.bulk_create(
+                    [
+                        UserProgress(user=user, xp=self.rng.randint(0, 5000))
+                        for user in users
+                    ]
+                )
+                UserUsage.objects.bulk_create([UserUsage(user=user) for user in users])
+                UserScore.objects.bulk_create(
+                    [
+                        UserScore(user=user, score=self.rng.randint(0, 10_000))
+                        for user in users
+                    ]
+                )
+            user_ids.extend(user.pk for user in users)
+            self.progress("Users", stop, count)
+        return user_ids
+
+    def seed_habits(self, count):
+        habits = Habit.objects.bulk_create(
+            [
+                Habit(name=f"{self.prefix} habit {i}", description="Synthetic")
+                for i in range(count)
+            ]
+        )
+        return [habit.pk for habit in habits]
+
+    def seed_subscriptions(self, user_ids, habit_ids, per_user):
+        through = CustomUser.habits.through
+        per_user = min(per_user, len(habit_ids))
+        subscriptions = [
+            (user_id, habit_id)
+            for user_id in user_ids
+            for habit_id in self.rng.sample(habit_ids, per_user)
+        ]
+        for done, batch in enumerate(chunks(subscriptions, self.batch_size), 1):
+            through.objects.bulk_create(
+                [through(customuser_id=u, habit_id=h) for u, h in batch]
+            )
+            self.progress(
+                "Subscriptions",
+                min(done * self.batch_size, len(subscriptions)),
+                len(subscriptions),
+            )
+        return subscriptions
+
+    def seed_logs(self, subscriptions, days, probability):
+        today = date.today()
+        dates = [today - timedelta(days=offset) for offset in range(days)]
+        expected = int(len(subscriptions) * days * probability)
+
+        created = 0
+        batch = []
+        with explicit_value(HabitLog, "date"):
+            for user_id, habit_id in subscriptions:
+                for day in dates:
+                    if self.rng.random() >= probability:
+                        continue
+                    batch.append(
+                        HabitLog(
+                            user_id=user_id,
+                            habit_id=habit_id,
+                            date=day,
+                            completed=self.rng.random() < 0.75,
+                        )
+                    )
+                    if len(batch) >= self.batch_size:
+                        HabitLog.objects.bulk_create(batch)
+                        created += len(batch)
+                        batch = []
+                        self.progress("Habit logs (approx.)", created, expected)
+            HabitLog.objects.bulk_create(batch)
+        self.stdout.write(f"\nHabit logs: {created + len(batch)}")
+
+    def seed_leagues(self, user_ids, habit_ids, count, largest):
+        today = date.today()
+        # Members are drawn first so each league is created with its
+        # participant_count, as joins would have left it.
+        memberships = [
+            self.rng.sample(
+                user_ids,
+                min(largest if i == 0 else self.rng.randint(2, 1000), len(user_ids)),
+            )
+            for i in range(count)
+        ]
+        leagues = []
+        for i, members in enumerate(memberships):
+            start = today - timedelta(days=self.rng.randint(0, 30))
+            leagues.append(
+                League(
+                    created_by_id=self.rng.choice(user_ids),
+                    title=f"{self.prefix} league {i}",
+                    description="Synthetic league",
+                    habit_id=self.rng.choice(habit_ids),
+                    start_date=start,
+                    end_date=today + timedelta(days=self.rng.randint(1, 60)),
+                    # Scoring, feeds and listings only see active leagues.
+                    status=initial_status(start, today),
+                    participant_count=len(members),
+                )
+            )
+        leagues = League.objects.bulk_create(leagues)
+        for index, (league, members) in enumerate(zip(leagues, memberships)):
+            for batch in chunks(members, self.batch_size):
+                LeagueParticipant.objects.bulk_create(
+                    [
+                        LeagueParticipant(
+                            league=league,
+                            user_id=user_id,
+                            score=self.rng.randint(0, 500),
+                        )
+                        for user_id in batch
+                    ]
+                )
+            self.progress("Leagues", index + 1, len(leagues))
@@ -0,0 +1,329 @@
+"""
+Minimal Prometheus-style metrics.
+
+Updates go to a per-thread shard of each metric, so recording needs no
+lock; shards are only summed when /metrics is scraped. With METRICS_DIR set,
+every process periodically writes its totals to <METRICS_DIR>/<pid>-<uuid>.json
+and a scrape merges all files, so any worker can answer for the whole server.
+The uuid keeps a new process that reuses a pid from overwriting an old file.
+Counts of exited processes are still part of the totals: a scrape folds
+their files into exited.json and removes them. METRICS_DIR must be local to
+the host, since liveness is checked by pid.
+"""
+
+import fcntl
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FLUSH_INTERVAL = 5
+EXITED_FILE = "exited.json"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            # Taken once per thread, never on the recording path.
+            with self._shards_lock:
+                self._shards.append(values)
+            return values
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self):
+        """Totals across threads as {label values: value}."""
+        totals = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.items()):
+                totals[key] = self.merge(totals.get(key), value)
+        return totals
+
+    def clear(self):
+        for shard in list(self._shards):
+            shard.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def merge(self, total, value):
+        return (total or 0) + value
+
+    def samples(self, value):
+        yield self.name, (), value
+
+
+class Histogram(Metric):
+    """Bucket counts are stored per bucket and made cumulative on export."""
+
+    type = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, **kwargs
+    ):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, **kwargs)
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            entry = shard[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def time(self, **labels):
+        """Decorator recording the wrapped function's run time."""
+
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, **labels)
+
+            return wrapper
+
+        return decorate
+
+    def merge(self, total, value):
+        counts, value_sum = value
+        if total is None:
+            return [list(counts), value_sum]
+        return [[a + b for a, b in zip(total[0], counts)], total[1] + value_sum]
+
+    def samples(self, value):
+        counts, value_sum = value
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else format_value(bound)
+            yield f"{self.name}_bucket", (("le", le),), cumulative
+        yield f"{self.name}_sum", (), value_sum
+        yield f"{self.name}_count", (), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.last_flush = 0.0
+        self._file = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def register_collector(self, collector):
+        """
+        Add a function called at scrape time, returning (name, type,
+        documentation, [(labels dict, value)]) tuples. Collected values are
+        scrape-process only, e.g. gauges read from the database.
+        """
+        self.collectors.append(collector)
+        return collector
+
+    def directory(self):
+        return getattr(settings, "METRICS_DIR", None)
+
+    def maybe_flush(self):
+        if self.directory() and time.monotonic() - self.last_flush > FLUSH_INTERVAL:
+            self.flush()
+
+    def filename(self):
+        """This process's file in METRICS_DIR; a forked child gets its own."""
+        pid = os.getpid()
+        if self._file is None or self._file[0] != pid:
+            self._file = (pid, f"{pid}-{uuid.uuid4().hex}.json")
+        return self._file[1]
+
+    def flush(self):
+        directory = self.directory()
+        if not directory:
+            return
+        self.last_flush = time.monotonic()
+        data = {
+            name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for name, metric in self.metrics.items()
+        }
+        write_json(directory, self.filename(), data)
+
+    def merge_file(self, totals, path):
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+        for name, entries in data.items():
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            values = totals.setdefault(name, {})
+            for key, value in entries:
+                key = tuple(key)
+                values[key] = metric.merge(values.get(key), value)
+        return True
+
+    def prune(self, directory):
+        """Fold the files of exited processes into EXITED_FILE."""
+        totals = {}
+        self.merge_file(totals, os.path.join(directory, EXITED_FILE))
+        merged = []
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if exited(filename) and self.merge_file(totals, path):
+                merged.append(path)
+        if not merged:
+            return
+        data = {
+            name: [[list(key), value] for key, value in values.items()]
+            for name, values in totals.items()
+        }
+        write_json(directory, EXITED_FILE, data)
+        for path in merged:
+            os.remove(path)
+
+    def totals(self):
+        """Per-metric totals for this process, or every process in METRICS_DIR."""
+        directory = self.directory()
+        if not directory:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+        self.flush()
+        totals = {name: {} for name in self.metrics}
+        # Scrapes in other workers prune too; the lock keeps them from
+        # counting a file both in EXITED_FILE and on its own.
+        with open(os.path.join(directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.prune(directory)
+            for filename in os.listdir(directory):
+                if filename.endswith(".json"):
+                    self.merge_file(totals, os.path.join(directory, filename))
+        return totals
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, values in self.totals().items():
+            metric = self.metrics[name]
+            lines += [
+                f"# HELP {name} {metric.documentation}",
+                f"# TYPE {name} {metric.type}",
+            ]
+            for key, value in sorted(values.items()):
+                pairs = list(zip(metric.labelnames, key))
+                for sample, extra, sample_value in metric.samples(value):
+                    lines.append(
+                        format_sample(sample, pairs + list(extra), sample_value)
+                    )
+
+        for collector in self.collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines += [
+                    f"# HELP {name} {documentation}",
+                    f"# TYPE {name} {metric_type}",
+                ]
+                for labels, value in samples:
+                    lines.append(format_sample(name, labels.items(), value))
+        return "\n".join(lines) + "\n"
+
+
+def write_json(directory, filename, data):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp:
+        json.dump(data, tmp)
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+def exited(filename):
+    """Whether filename is a process file whose process is gone."""
+    pid, separator, _ = filename.partition("-")
+    if not separator or not filename.endswith(".json") or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def format_value(value):
+    return repr(float(value))
+
+
+def format_sample(name, pairs, value):
+    if pairs:
+        labels = ",".join(
+            '{}="{}"'.format(
+                label,
+                str(label_value)
+                .replace("\\", r"\\")
+                .replace('"', r"\"")
+                .replace("\n", r"\n"),
+            )
+            for label, label_value in pairs
+        )
+        return f"{name}{{{labels}}} {format_value(value)}"
+    return f"{name} {format_value(value)}"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by URL name, method and status.",
+    ["view", "method", "status"],
+)
+DB_TIME = Histogram(
+    "db_query_duration_seconds",
+    "Total database time per request by URL name.",
+    ["view"],
+)
+DB_QUERIES = Counter("db_queries_total", "Database queries by URL name.", ["view"])
+AUTH_CACHE = Counter(
+    "auth_user_cache_requests_total",
+    "Token-to-user cache lookups by result (hit or miss).",
+    ["result"],
+)
+RESPONSE_CACHE = Counter(
+    "response_cache_requests_total",
+    "Anonymous response cache lookups by namespace and outcome.",
+    ["namespace", "outcome"],
+)
+SIGNAL_TIME = Histogram(
+    "signal_handler_duration_seconds",
+    "Time spent in instrumented signal handlers.",
+    ["handler"],
+)
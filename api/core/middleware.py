@@ -0,0 +1,241 @@
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedJWTAuthentication
+from .metrics import DB_QUERIES, DB_TIME, REGISTRY, REQUEST_LATENCY
+from .models import RequestProfile
+
+PROFILE_SUMMARY_LINES = 60
+
+
+class SyncAndAsyncMiddleware:
+    """
+    Base for middleware that runs natively under WSGI and ASGI: __call__
+    returns a coroutine from `acall` when the next handler is async, so an
+    async view is not forced onto a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.acall(request)
+        return self.call(request)
+
+
+class QueryStats:
+    """Queries run while handling one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # SQL reaches the wrapper with placeholders, so identical
+            # statements with different parameters share a fingerprint.
+            self.fingerprints[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Fingerprints executed more than once, e.g. an N+1 pattern."""
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+    def server_timing(self):
+        duplicated = sum(self.duplicates.values())
+        return (
+            f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries", '
+            f'db-dup;desc="{duplicated} duplicated"'
+        )
+
+
+class QueryInstrumentationMiddleware(SyncAndAsyncMiddleware):
+    """
+    Record query count, total DB time and duplicated query fingerprints for
+    each request on `request.query_stats`. When QUERY_INSTRUMENTATION_HEADERS
+    is enabled (by default outside production, i.e. when DEBUG is on) they are
+    also returned in a Server-Timing header.
+    """
+
+    def call(self, request):
+        stats = request.query_stats = QueryStats()
+        with self.instrument(stats):
+            response = self.get_response(request)
+        return self.finish(response, stats)
+
+    async def acall(self, request):
+        # Connections are per thread and the async ORM runs its queries on
+        # this request's sync thread, so the wrappers are installed there.
+        stats = request.query_stats = QueryStats()
+        stack = await sync_to_async(self.instrument)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(response, stats)
+
+    def instrument(self, stats):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    def finish(self, response, stats):
+        if getattr(settings, "QUERY_INSTRUMENTATION_HEADERS", settings.DEBUG):
+            response["Server-Timing"] = stats.server_timing()
+        return response
+
+
+class MetricsMiddleware(SyncAndAsyncMiddleware):
+    """
+    Record request latency by URL name, method and status, plus database
+    time and query counts from QueryInstrumentationMiddleware, which must
+    come after this middleware.
+    """
+
+    def call(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    async def acall(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    def record(self, request, response, duration):
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        REQUEST_LATENCY.observe(
+            duration,
+            view=view,
+            method=request.method,
+            status=response.status_code,
+        )
+        stats = getattr(request, "query_stats", None)
+        if stats is not None:
+            DB_TIME.observe(stats.duration, view=view)
+            DB_QUERIES.inc(stats.count, view=view)
+        REGISTRY.maybe_flush()
+        return response
+
+
+class ProfilingMiddleware(SyncAndAsyncMiddleware):
+    """
+    Profile a PROFILING_SAMPLE_RATE fraction of requests, and any request by
+    a staff user that sends the PROFILING_HEADER header, storing the result
+    as a RequestProfile (browsable in the admin). Unsampled requests only
+    pay for one random() call and a header lookup.
+
+    Under ASGI the profile covers the event loop thread while the request
+    runs, including other requests' work interleaved with it, but not ORM
+    calls the async views hand to worker threads.
+    """
+
+    authentication = CachedJWTAuthentication()
+
+    def call(self, request):
+        requested = self.header_name() in request.META
+        if not self.sampled() and not (requested and self.is_staff(request)):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread.
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        profile = self.save(request, response, profiler, duration)
+        return self.finish(response, profile, requested)
+
+    async def acall(self, request):
+        requested = self.header_name() in request.META
+        if not self.sampled() and not (
+            requested and await sync_to_async(self.is_staff)(request)
+        ):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        profile = await sync_to_async(self.save)(request, response, profiler, duration)
+        return self.finish(response, profile, requested)
+
+    def sampled(self):
+        sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0)
+        return sample_rate and random.random() < sample_rate
+
+    def finish(self, response, profile, requested):
+        if requested:
+            response["X-Profile-Id"] = str(profile.pk)
+        return response
+
+    def header_name(self):
+        header = getattr(settings, "PROFILING_HEADER", "X-Profile")
+        return "HTTP_" + header.upper().replace("-", "_")
+
+    def is_staff(self, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        try:
+            result = self.authentication.authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return result is not None and result[0].is_staff
+
+    def save(self, request, response, profiler, duration):
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats("cumulative").print_stats(PROFILE_SUMMARY_LINES)
+        query_stats = getattr(request, "query_stats", None)
+        return RequestProfile.objects.create(
+            url_name=getattr(request.resolver_match, "view_name", "") or "",
+            method=request.method,
+            path=request.path[:500],
+            status_code=response.status_code,
+            duration_ms=duration * 1000,
+            query_count=query_stats.count if query_stats else 0,
+            summary=summary.getvalue(),
+            stats=marshal.dumps(stats.stats),
+        )
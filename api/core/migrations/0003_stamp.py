@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_requestprofile"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Stamp",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=200, unique=True)),
+                ("token", models.BigIntegerField()),
+                ("updated_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -1,3 +1,71 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Task(models.Model):
+    """A unit of deferred work, claimed and run by the run_worker command."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    idempotency_key = models.CharField(
+        max_length=200, unique=True, blank=True, null=True
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class RequestProfile(models.Model):
+    """cProfile output for one sampled request (see ProfilingMiddleware)."""
+
+    url_name = models.CharField(max_length=200, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    summary = models.TextField()
+    # marshal-encoded pstats data, the format written by cProfile's
+    # dump_stats(), so it opens in snakeviz, flameprof, gprof2dot etc.
+    stats = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["-duration_ms"])]
+
+    def __str__(self):
+        return f"{self.method} {self.url_name} ({self.duration_ms:.0f} ms)"
+
+
+class Stamp(models.Model):
+    """The latest change token of a cached key; see core.stamps."""
+
+    key = models.CharField(max_length=200, unique=True)
+    token = models.BigIntegerField()
+    updated_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,230 @@
+"""
+A small database-backed task queue. Tasks are rows in core.Task written in
+the caller's transaction, so a worker only sees them once it commits; the
+run_worker command claims and runs them.
+"""
+
+import functools
+import logging
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .metrics import REGISTRY
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, retry_backoff):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, idempotency_key=None, run_at=None):
+        """
+        Queue a run. Arguments must be JSON serialisable. A second enqueue
+        with the same idempotency_key is dropped while the first row exists,
+        in eager mode too. Returns whether the run was queued.
+        """
+        kwargs = kwargs or {}
+        eager = getattr(settings, "TASKS_EAGER", False)
+        record = Task(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            idempotency_key=idempotency_key,
+            max_attempts=self.max_attempts,
+            run_at=run_at or timezone.now(),
+        )
+        if idempotency_key is not None:
+            if eager:
+                # Eager runs keep their key in a finished row, so duplicates
+                # are dropped exactly as in queued mode.
+                record.status = Task.DONE
+                record.finished_at = record.run_at
+            if not insert_unique(record):
+                return False
+        elif not eager:
+            Task.objects.bulk_create([record])
+        if eager:
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+        return True
+
+    def backoff(self, attempts):
+        return timedelta(seconds=self.retry_backoff * 2 ** (attempts - 1))
+
+
+def insert_unique(record):
+    """
+    Insert a task unless a row with its idempotency_key exists, in one
+    statement. Returns whether it was inserted; bulk_create's
+    ignore_conflicts doesn't say.
+    """
+    connection = connections[router.db_for_write(Task)]
+    quote = connection.ops.quote_name
+    fields = [field for field in Task._meta.concrete_fields if not field.primary_key]
+    values = [
+        field.get_db_prep_save(field.pre_save(record, True), connection)
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(Task._meta.db_table)} "
+            f"({', '.join(quote(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({quote('idempotency_key')}) DO NOTHING RETURNING id",
+            values,
+        )
+        return cursor.fetchone() is not None
+
+
+def task(func=None, *, name=None, max_attempts=3, retry_backoff=10):
+    """Register a function as a task, adding `.delay()` and `.enqueue()`."""
+
+    def decorate(func):
+        task_name = name or f"{func.__module__}.{func.__qualname__}"
+        registry[task_name] = TaskFunction(func, task_name, max_attempts, retry_backoff)
+        return registry[task_name]
+
+    return decorate(func) if func is not None else decorate
+
+
+def deferred_receiver(func=None, **task_options):
+    """
+    Move a model signal receiver off the request path. The decorated
+    receiver only enqueues a task; the worker reloads the instance and calls
+    the original function with it and the signal's scalar kwargs (such as
+    `created`). Receivers for rows deleted in the meantime are skipped.
+    """
+
+    def decorate(func):
+        def run(model_label, pk, **kwargs):
+            model = apps.get_model(model_label)
+            instance = model._default_manager.filter(pk=pk).first()
+            if instance is not None:
+                func(sender=model, instance=instance, **kwargs)
+
+        run.__module__ = func.__module__
+        run.__qualname__ = func.__qualname__
+        handler = task(run, **task_options)
+
+        @functools.wraps(func)
+        def receiver(sender, instance, **kwargs):
+            scalars = {
+                key: value
+                for key, value in kwargs.items()
+                if isinstance(value, (bool, int, float, str, type(None)))
+            }
+            handler.delay(instance._meta.label, instance.pk, **scalars)
+
+        return receiver
+
+    return decorate(func) if func is not None else decorate
+
+
+def claim(batch_size, lease_seconds):
+    """
+    Lock up to batch_size due tasks for this worker. Running tasks whose
+    lease has expired (their worker died) are picked up again.
+    """
+    now = timezone.now()
+    due = Q(status=Task.PENDING, run_at__lte=now) | Q(
+        status=Task.RUNNING, locked_until__lt=now
+    )
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("run_at")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        Task.objects.filter(id__in=ids).update(
+            status=Task.RUNNING,
+            attempts=F("attempts") + 1,
+            locked_until=now + timedelta(seconds=lease_seconds),
+        )
+    return list(Task.objects.filter(id__in=ids).order_by("run_at"))
+
+
+class LeaseLost(Exception):
+    """The task was claimed again after this worker's lease expired."""
+
+
+def execute(record):
+    """
+    Run a claimed task; reschedule it with backoff or mark it failed.
+
+    The task body and its DONE mark commit in one transaction, so a crash
+    never leaves a finished body to be run again. The mark only applies
+    while this claim is still the latest (same attempt number); if the
+    lease expired and another worker took the task, the body rolls back.
+    """
+    func = registry.get(record.name)
+    try:
+        if func is None:
+            raise LookupError(f"No task registered as {record.name!r}.")
+        with transaction.atomic():
+            func.func(*record.args, **record.kwargs)
+            marked = Task.objects.filter(
+                pk=record.pk, status=Task.RUNNING, attempts=record.attempts
+            ).update(status=Task.DONE, finished_at=timezone.now(), locked_until=None)
+            if not marked:
+                raise LeaseLost(f"Task #{record.pk} was claimed by another worker.")
+    except LeaseLost:
+        logger.warning(
+            "Task %s #%s lost its lease; rolled back.", record.name, record.pk
+        )
+        return False
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Task %s #%s failed:\n%s", record.name, record.pk, error)
+        now = timezone.now()
+        # Leave the task alone if a newer claim owns it.
+        claimed = Task.objects.filter(pk=record.pk, attempts=record.attempts)
+        if func is not None and record.attempts < record.max_attempts:
+            claimed.update(
+                status=Task.PENDING,
+                run_at=now + func.backoff(record.attempts),
+                locked_until=None,
+                last_error=error,
+            )
+        else:
+            claimed.update(
+                status=Task.FAILED,
+                finished_at=now,
+                locked_until=None,
+                last_error=error,
+            )
+        return False
+    return True
+
+
+@REGISTRY.register_collector
+def queue_depth():
+    counts = dict(Task.objects.values_list("status").annotate(Count("id")))
+    yield (
+        "task_queue_depth",
+        "gauge",
+        "Background tasks by status.",
+        [
+            ({"status": status}, counts.get(status, 0))
+            for status in (Task.PENDING, Task.RUNNING, Task.FAILED)
+        ],
+    )
@@ -0,0 +1,93 @@
+import re
+from decimal import Decimal
+from itertools import chain, compress
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+_drf_default = encoders.JSONEncoder().default
+
+
+# Where orjson and the stdlib format a float differently: exponents ("1e16"
+# against "1e+16") and small numbers ("0.000025" against "2.5e-05").
+_FLOAT_DIFFERS = re.compile(rb"\d[eE]|0\.0000")
+_CONTAINERS = (dict, list, tuple)
+
+
+def _holds_float(data):
+    """
+    Whether data holds a float or Decimal, walked a level at a time so the
+    per-value work stays in C.
+    """
+    level = [(data,)]
+    while True:
+        values = list(
+            chain.from_iterable(v.values() if isinstance(v, dict) else v for v in level)
+        )
+        types = set(map(type, values))
+        if any(issubclass(t, (float, Decimal)) for t in types):
+            return True
+        nested = {t for t in types if issubclass(t, _CONTAINERS)}
+        if not nested:
+            return False
+        level = list(compress(values, map(nested.__contains__, map(type, values))))
+
+
+def dumps(data):
+    """
+    Encode like DRF's JSONRenderer, with orjson when it is installed.
+
+    orjson writes dates and datetimes itself (UTC as "Z", like DRF); Decimal,
+    dataclasses and anything else it doesn't know go through DRF's encoder,
+    so the bytes match the stdlib renderer. Data orjson can't encode the
+    same way is rendered by JSONRenderer itself: integers wider than 64
+    bits, and floats when the output shows a null (NaN, which DRF refuses)
+    or a number the two format differently.
+    """
+    if orjson is None:
+        return JSONRenderer().render(data)
+    try:
+        ret = orjson.dumps(
+            data,
+            default=_drf_default,
+            option=orjson.OPT_UTC_Z
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATACLASS,
+        )
+    except orjson.JSONEncodeError:
+        return JSONRenderer().render(data)
+    if (b"null" in ret or _FLOAT_DIFFERS.search(ret)) and _holds_float(data):
+        return JSONRenderer().render(data)
+    # Same escaping as JSONRenderer so the output stays a JavaScript subset.
+    if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer backed by orjson, falling back to the stdlib
+    encoder when orjson is missing, indented output was requested or the
+    UNICODE_JSON, COMPACT_JSON or STRICT_JSON settings ask for output orjson
+    doesn't write.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
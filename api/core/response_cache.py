@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .metrics import RESPONSE_CACHE
+from .stamps import stamps
+
+LOCK_SECONDS = 10
+WAIT_SECONDS = 0.05
+WAIT_ATTEMPTS = 20
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record(namespace, outcome):
+    RESPONSE_CACHE.inc(namespace=namespace, outcome=outcome)
+    with _stats_lock:
+        _stats[(namespace, outcome)] += 1
+
+
+def response_cache_stats():
+    """Process-local counts by namespace: hit, stale, miss and bypass."""
+    with _stats_lock:
+        stats = {}
+        for (namespace, outcome), count in _stats.items():
+            stats.setdefault(namespace, {})[outcome] = count
+        return stats
+
+
+def reset_response_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def namespace_stamp(namespace):
+    return f"resp:{namespace}"
+
+
+def bump_response_cache(*namespaces):
+    """Invalidate every cached response in the namespaces, in every process."""
+    stamps.bump(*map(namespace_stamp, namespaces))
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Cache whole GET responses for anonymous callers.
+
+    Entries are fresh for `cache_fresh_seconds` and then served stale for up
+    to `cache_stale_seconds` more while a single worker, holding a cache
+    lock, recomputes them. Keys include the namespace's stamp (see
+    core.stamps) so writes can drop a whole namespace with
+    `bump_response_cache`; views about one object add its own stamp through
+    `response_cache_stamps`. Keys hash the path and only the query
+    parameters in `cache_query_params`, so arbitrary ones cannot fill the
+    cache with copies of a response.
+    """
+
+    cache_namespace = None
+    cache_fresh_seconds = 30
+    cache_stale_seconds = 300
+    cache_query_params = ()
+
+    def get(self, request, *args, **kwargs):
+        if not getattr(settings, "RESPONSE_CACHE_ENABLED", True) or (
+            request.user.is_authenticated
+        ):
+            record(self.cache_namespace, "bypass")
+            return super().get(request, *args, **kwargs)
+
+        key = self.response_cache_key(request)
+        lock_key = f"{key}:lock"
+        entry = cache.get(key)
+
+        if entry is not None:
+            fresh_until, data = entry
+            if time.time() < fresh_until:
+                record(self.cache_namespace, "hit")
+                return Response(data)
+            if not cache.add(lock_key, True, timeout=LOCK_SECONDS):
+                record(self.cache_namespace, "stale")
+                return Response(data)
+        elif not cache.add(lock_key, True, timeout=LOCK_SECONDS):
+            # Someone else is building this entry; wait briefly for it
+            # rather than stampeding the database.
+            for _ in range(WAIT_ATTEMPTS):
+                time.sleep(WAIT_SECONDS)
+                entry = cache.get(key)
+                if entry is not None:
+                    record(self.cache_namespace, "hit")
+                    return Response(entry[1])
+
+        record(self.cache_namespace, "miss")
+        try:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(
+                    key,
+                    (time.time() + self.cache_fresh_seconds, response.data),
+                    timeout=self.cache_fresh_seconds + self.cache_stale_seconds,
+                )
+        finally:
+            cache.delete(lock_key)
+        return response
+
+    def response_cache_stamps(self):
+        """The stamps whose bumps invalidate this view's cached responses."""
+        return [namespace_stamp(self.cache_namespace)]
+
+    def response_cache_key(self, request):
+        version = ".".join(map(str, stamps.get_many(self.response_cache_stamps())))
+        params = sorted(
+            (name, value)
+            for name, values in request.GET.lists()
+            if name in self.cache_query_params
+            for value in values
+        )
+        url = f"{request.path}?{urlencode(params)}"
+        path = hashlib.sha1(url.encode()).hexdigest()
+        return f"resp:{self.cache_namespace}:v{version}:{path}"
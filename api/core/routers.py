@@ -0,0 +1,153 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .middleware import SyncAndAsyncMiddleware
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+STICKY_SECONDS = 5
+STICKY_COOKIE = "db_sticky"
+
+# Set per request by ReplicaRoutingMiddleware; outside a request (commands,
+# shell, tests) everything goes to the primary.
+_routing = ContextVar("db_routing", default=None)
+
+
+class RoutingState:
+    __slots__ = ("use_replica", "wrote")
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", ())
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads of safe requests to a replica from DATABASE_REPLICAS and
+    everything else to the primary ("default"). Once a request writes, its
+    remaining reads stay on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state.use_replica or state.wrote:
+            return "default"
+        replicas = replica_aliases()
+        return random.choice(replicas) if replicas else "default"
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+
+def sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+class ReplicaRoutingMiddleware(SyncAndAsyncMiddleware):
+    """
+    Enable replica reads for safe requests, with read-your-writes
+    stickiness: after a client writes, its requests read from the primary
+    for REPLICA_STICKY_SECONDS, so e.g. CurrentUserView right after an update
+    never returns stale data.
+
+    The writing client gets a short-lived cookie, which reaches whichever
+    worker serves its next request. The user is also marked in the cache,
+    covering their other clients when the cache is shared (REDIS_URL).
+    """
+
+    authentication = JWTAuthentication()
+
+    def call(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        user_id = self.token_user_id(request)
+        sticky = user_id is not None and cache.get(sticky_key(user_id))
+        state = RoutingState(self.use_replica(request, sticky))
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if state.wrote:
+            user_id = self.writer_id(request, user_id)
+            if user_id is not None:
+                cache.set(sticky_key(user_id), True, timeout=self.sticky_seconds())
+            self.set_cookie(request, response)
+        return response
+
+    async def acall(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+
+        user_id = self.token_user_id(request)
+        sticky = user_id is not None and await cache.aget(sticky_key(user_id))
+        state = RoutingState(self.use_replica(request, sticky))
+        # ORM calls handed to threads by sync_to_async copy this context.
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if state.wrote:
+            user_id = await sync_to_async(self.writer_id)(request, user_id)
+            if user_id is not None:
+                await cache.aset(
+                    sticky_key(user_id), True, timeout=self.sticky_seconds()
+                )
+            self.set_cookie(request, response)
+        return response
+
+    def use_replica(self, request, sticky):
+        return request.method in SAFE_METHODS and not (
+            sticky or STICKY_COOKIE in request.COOKIES
+        )
+
+    def sticky_seconds(self):
+        return getattr(settings, "REPLICA_STICKY_SECONDS", STICKY_SECONDS)
+
+    def writer_id(self, request, user_id):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return user_id
+
+    def set_cookie(self, request, response):
+        response.set_cookie(
+            STICKY_COOKIE,
+            "1",
+            max_age=self.sticky_seconds(),
+            secure=request.is_secure(),
+            httponly=True,
+            samesite="Lax",
+        )
+
+    def token_user_id(self, request):
+        """The user id claim of a valid access token, without a DB query."""
+        header = self.authentication.get_header(request)
+        raw_token = self.authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return AccessToken(raw_token)[api_settings.USER_ID_CLAIM]
+        except Exception:
+            return None
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from leagues import live
+from leagues.models import League, LeagueParticipant
+from user.models import CustomUser, Plan, UserProgress
+from .authentication import invalidate_cached_user
+from .response_cache import bump_response_cache
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_on_change(sender, instance, created=False, **kwargs):
+    # Nothing about a new user is cached yet; errors are never cached. The
+    # user's stamp also keys their cached UserDetailView responses.
+    if not created:
+        invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProgress)
+def invalidate_user_on_progress(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def invalidate_users_on_plan_change(sender, **kwargs):
+    # Cached users are stamped with the plans stamp user.signals bumps.
+    bump_response_cache("plans", "users")
+
+
+@receiver(post_save, sender=League)
+@receiver(post_delete, sender=League)
+# Participants are only deleted with their league; a post_delete receiver on
+# LeagueParticipant would also disable the cascade's fast delete.
+@receiver(post_save, sender=LeagueParticipant)
+def invalidate_leagues_on_change(sender, **kwargs):
+    bump_response_cache("leagues")
+
+
+@receiver(m2m_changed, sender=League.participants.through)
+def invalidate_leagues_on_membership(sender, instance, action, pk_set, **kwargs):
+    # participants.add()/remove() write LeagueParticipant rows without
+    # post_save; from the user side, instance is a user and pk_set leagues.
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    bump_response_cache("leagues")
+    league_ids = [instance.pk] if isinstance(instance, League) else pk_set or ()
+    for league_id in league_ids:
+        transaction.on_commit(lambda league_id=league_id: live.publish(league_id))
+
+
+@receiver(post_save, sender=LeagueParticipant)
+def publish_leaderboard_change(sender, instance, **kwargs):
+    league_id = instance.league_id
+    transaction.on_commit(lambda: live.publish(league_id))
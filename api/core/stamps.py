@@ -0,0 +1,115 @@
+"""
+Change stamps for data that processes cache locally.
+
+A writer bumps the stamps of the keys it changed, in its own transaction, so
+the new random token is committed together with the data. Every process keeps
+a memo of the tokens and refreshes it with one query at most every
+CACHE_STAMP_INTERVAL seconds, reading only the stamps changed since the last
+refresh. Cached values are stored with the tokens they were built under and
+are stale once a token differs. The database is the only store all workers
+share whether or not REDIS_URL is set, so a bump reaches every process
+within about one interval. Stamps are timed by the writer's clock, so hosts'
+clocks must agree to within OVERLAP.
+"""
+
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Stamp
+
+INTERVAL = 1.0
+# Rows changed this long before the newest seen are read again, covering
+# transactions that committed after the previous refresh.
+OVERLAP = timedelta(seconds=5)
+# Tokens older than the longest-lived cached value are forgotten; a value
+# built before its key was bumped has expired by then.
+MAX_AGE = timedelta(hours=1)
+
+
+def interval():
+    return getattr(settings, "CACHE_STAMP_INTERVAL", INTERVAL)
+
+
+class Stamps:
+    """This process's memo of the stamp table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._newest = None
+        self._refreshed_at = 0.0
+
+    def get(self, key):
+        """The current token of a key; 0 if it was not bumped lately."""
+        if self.due():
+            self.refresh()
+        return self._tokens.get(key, (0, None))[0]
+
+    def get_many(self, keys):
+        if self.due():
+            self.refresh()
+        return [self._tokens.get(key, (0, None))[0] for key in keys]
+
+    async def aget_many(self, keys):
+        if self.due():
+            await self.arefresh()
+        return [self._tokens.get(key, (0, None))[0] for key in keys]
+
+    def due(self):
+        return time.monotonic() - self._refreshed_at >= interval()
+
+    def changes(self):
+        if self._newest is None:
+            since = timezone.now() - MAX_AGE
+        else:
+            since = self._newest - OVERLAP
+        return Stamp.objects.using("default").filter(updated_at__gte=since)
+
+    def refresh(self):
+        """Read the stamps changed since the last refresh."""
+        self.apply(self.changes().values_list("key", "token", "updated_at"))
+
+    async def arefresh(self):
+        rows = self.changes().values_list("key", "token", "updated_at")
+        self.apply([row async for row in rows])
+
+    def apply(self, rows):
+        with self._lock:
+            newest = self._newest
+            for key, token, updated_at in rows:
+                self._tokens[key] = (token, updated_at)
+                newest = max(newest or updated_at, updated_at)
+            if newest != self._newest:
+                self._newest = newest
+                cutoff = newest - MAX_AGE
+                self._tokens = {
+                    key: entry
+                    for key, entry in self._tokens.items()
+                    if entry[1] >= cutoff
+                }
+            self._refreshed_at = time.monotonic()
+
+    def bump(self, *keys):
+        """Mark keys changed; call inside the transaction writing the data."""
+        now = timezone.now()
+        rows = [
+            Stamp(key=key, token=secrets.randbits(63), updated_at=now) for key in keys
+        ]
+        Stamp.objects.using("default").bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["token", "updated_at"],
+        )
+        # This process sees its own writes at once.
+        with self._lock:
+            for row in rows:
+                self._tokens[row.key] = (row.token, now)
+
+
+stamps = Stamps()
@@ -0,0 +1,83 @@
+import re
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from rest_framework.test import APIClient
+
+from .stamps import stamps
+
+
+def collect_query_budgets(resolver=None):
+    """
+    Gather the `query_budgets` dicts ({url name: max queries}) declared next
+    to `urlpatterns` in every included urls.py.
+    """
+    resolver = resolver or get_resolver()
+    budgets = dict(getattr(resolver.urlconf_module, "query_budgets", {}))
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            budgets.update(collect_query_budgets(pattern))
+    return budgets
+
+
+class QueryBudgetAPIClient(APIClient):
+    """
+    APIClient that fails the test when a request runs more queries than the
+    budget declared for its URL name.
+    """
+
+    budgets = None
+
+    def request(self, **kwargs):
+        if QueryBudgetAPIClient.budgets is None:
+            QueryBudgetAPIClient.budgets = collect_query_budgets()
+
+        # The periodic stamp refresh belongs to the process, not the view.
+        if stamps.due():
+            stamps.refresh()
+        with CaptureQueriesContext(connections["default"]) as captured:
+            response = super().request(**kwargs)
+
+        match = response.resolver_match
+        budget = self.budgets.get(match.url_name) if match else None
+        if budget is not None and len(captured) > budget:
+            queries = "\n".join(query["sql"] for query in captured.captured_queries)
+            raise AssertionError(
+                f"{match.url_name} ran {len(captured)} queries, "
+                f"budget is {budget}:\n{queries}"
+            )
+        return response
+
+
+# Plan fragments meaning a table was read in full or rows were sorted
+# after the fact, by database vendor.
+FULL_SCAN = {"postgresql": r"Seq Scan", "sqlite": r"\bSCAN \w+$"}
+SORT = {"postgresql": r"Sort Key", "sqlite": r"TEMP B-TREE"}
+
+
+class QueryPlanAssertionsMixin:
+    """
+    TestCase mixin checking that a queryset is served by a given index.
+    Sequential scans are disabled on PostgreSQL so the plan shows whether the
+    index can serve the query, not what the planner prefers for a tiny
+    test table.
+    """
+
+    def query_plan(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor not in FULL_SCAN:
+            self.skipTest(f"No query plan checks for {connection.vendor}.")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name, ordered=True):
+        plan = self.query_plan(queryset)
+        vendor = connections[queryset.db].vendor
+        message = f"\n{queryset.query}\n{plan}"
+        self.assertIn(index_name, plan, "Index not used:" + message)
+        self.assertNotRegex(plan, re.compile(FULL_SCAN[vendor], re.M), message)
+        if ordered:
+            self.assertNotRegex(plan, SORT[vendor], "Rows sorted:" + message)
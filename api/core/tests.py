@@ -1,3 +1,1072 @@
-from django.test import TestCase
+import dataclasses
+import json
+import marshal
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+from unittest import mock
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habit.admin import HabitLogAdmin
+from habit.tasks import award_xp
+from habit.views import UserHabitLogListView
+from habit.models import Habit, HabitLog
+from leagues.models import League, LeagueParticipant
+from leagues.views import LeagueDetailsView, LeagueLeaderboardView
+from user.models import Plan, UserScore
+from user.plans import PlanRegistry, plan_registry
+from user.views import GlobalLeaderboardView
+from .authentication import CachedJWTAuthentication, user_stamp
+from .benchmarks import BENCHMARKS, Fixture, run
+from .changelists import estimated_count
+from .metrics import EXITED_FILE, Counter, Histogram, Registry
+from .middleware import (
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    QueryInstrumentationMiddleware,
+    QueryStats,
+)
+from .models import RequestProfile, Task
+from .parsers import FastJSONParser
+from .queue import claim, deferred_receiver, execute, task
+from .readonly import ValuesListMixin, columns_for
+from .renderers import FastJSONRenderer
+from .response_cache import (
+    AnonymousResponseCacheMixin,
+    namespace_stamp,
+    reset_response_cache_stats,
+    response_cache_stats,
+)
+from .routers import (
+    STICKY_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaRoutingMiddleware,
+    sticky_key,
+)
+from .stamps import Stamps, stamps
+from .testing import (
+    QueryBudgetAPIClient,
+    QueryPlanAssertionsMixin,
+    collect_query_budgets,
+)
+
+User = get_user_model()
+
+
+@override_settings(CACHE_STAMP_INTERVAL=60)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="auth@example.com", password="x")
+        self.token = AccessToken.for_user(self.user)
+        self.auth = CachedJWTAuthentication()
+        stamps.refresh()
+
+    def authenticate(self):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        )
+        return self.auth.authenticate(request)[0]
+
+    def test_user_is_cached_with_plan_and_progress(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.plan.name, "Free")
+            self.assertEqual(user.progress.level, 1)
+
+    def test_user_change_invalidates_cache(self):
+        self.authenticate()
+        self.user.first_name = "Changed"
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().first_name, "Changed")
+
+    def test_plan_change_invalidates_cache(self):
+        self.authenticate()
+        plan = Plan.objects.get(name="Free")
+        plan.max_habits = 5
+        plan.save()
+        self.addCleanup(plan_registry.clear)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().plan.max_habits, 5)
+
+    def test_changes_made_by_other_processes_invalidate_cache(self):
+        self.authenticate()
+        User.objects.filter(pk=self.user.pk).update(first_name="Elsewhere")
+        Stamps().bump(user_stamp(self.user.pk))
+        self.assertEqual(self.authenticate().first_name, "")
+
+        stamps.refresh()
+        self.assertEqual(self.authenticate().first_name, "Elsewhere")
+
+    def test_inactive_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+@override_settings(CACHE_STAMP_INTERVAL=60)
+class QueryInstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        stamps.refresh()
+
+    def test_budgets_are_collected_from_urlconfs(self):
+        budgets = collect_query_budgets()
+        self.assertEqual(budgets["plan-list"], 0)
+        self.assertIn("league-list", budgets)
+
+    @override_settings(QUERY_INSTRUMENTATION_HEADERS=True)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("global-leaderboard"))
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    @override_settings(QUERY_INSTRUMENTATION_HEADERS=True)
+    async def test_server_timing_header_on_async_views(self):
+        response = await self.async_client.get(reverse("async-global-leaderboard"))
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    async def test_middleware_stays_async(self):
+        async def view(request):
+            return HttpResponse()
+
+        for middleware in (
+            MetricsMiddleware,
+            QueryInstrumentationMiddleware,
+            ReplicaRoutingMiddleware,
+            ProfilingMiddleware,
+        ):
+            with self.subTest(middleware.__name__):
+                handler = middleware(view)
+                self.assertTrue(iscoroutinefunction(handler))
+                response = await handler(RequestFactory().get("/"))
+                self.assertEqual(response.status_code, 200)
+
+    def test_duplicate_fingerprints(self):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            for email in ("a@example.com", "b@example.com"):
+                User.objects.filter(email=email).exists()
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(list(stats.duplicates.values()), [2])
+
+    def test_budget_exceeded_fails(self):
+        client = QueryBudgetAPIClient()
+        client.budgets = {"global-leaderboard": 0}
+        with self.assertRaises(AssertionError):
+            client.get(reverse("global-leaderboard"))
+
+
+class SeedLoadCommandTests(TestCase):
+    def seed(self, prefix):
+        call_command(
+            "seed_load",
+            prefix=prefix,
+            users=20,
+            habits=4,
+            habits_per_user=2,
+            days=5,
+            leagues=2,
+            largest_league=10,
+            batch_size=7,
+            stdout=StringIO(),
+        )
+
+    def test_seed_is_deterministic(self):
+        self.seed("first")
+        self.seed("second")
+        for model, lookup in (
+            (HabitLog, "user__email__startswith"),
+            (LeagueParticipant, "league__title__startswith"),
+        ):
+            first = model.objects.filter(**{lookup: "first"}).count()
+            second = model.objects.filter(**{lookup: "second"}).count()
+            self.assertEqual(first, second)
+            self.assertGreater(first, 0)
+        self.assertTrue(
+            HabitLog.objects.filter(
+                user__email__startswith="first", date__lt=date.today()
+            ).exists()
+        )
+        self.assertEqual(
+            LeagueParticipant.objects.filter(league__title="first league 0").count(),
+            10,
+        )
+        for league in League.objects.filter(title__startswith="first"):
+            self.assertEqual(league.participant_count, league.participants.count())
+            self.assertEqual(league.status, League.ACTIVE)
+
+
+class BenchmarkTests(TestCase):
+    def test_benchmarks_run(self):
+        fixture = Fixture(size=5)
+        for name, (factory, _) in BENCHMARKS.items():
+            with self.subTest(name):
+                result = run(factory(fixture), number=1, repeat=1)
+                self.assertGreater(result["median"], 0)
+
+
+class AsyncReadPathTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="async@example.com", password="x")
+        other = User.objects.create_user(email="other@example.com", password="x")
+        habit = Habit.objects.create(name="Stretch")
+        self.user.habits.add(habit)
+        league = League.objects.create(
+            created_by=self.user,
+            title="Async League",
+            habit=habit,
+            start_date=date.today(),
+            end_date=date.today(),
+        )
+        LeagueParticipant.objects.create(league=league, user=self.user, score=3)
+        LeagueParticipant.objects.create(league=league, user=other, score=7)
+        UserScore.objects.create(user=self.user, score=10)
+        HabitLog.objects.create(user=self.user, habit=habit)
+
+        self.client = QueryBudgetAPIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        # Budgets assume the user and plans are already cached, as after a
+        # first request; warm them up outside the budgets.
+        APIClient(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}").get(
+            reverse("current-user")
+        )
+        self.routes = [
+            ("current-user", []),
+            ("global-leaderboard", []),
+            ("habit-list", []),
+            ("habit-detail", [habit.id]),
+            ("user-habit-logs", []),
+            ("league-list", []),
+            ("league-detail", [league.id]),
+            ("league_leaderboard", [league.id]),
+        ]
+
+    def async_name(self, name):
+        return "async-" + name.replace("_", "-")
+
+    def test_async_endpoints_match_sync_endpoints(self):
+        for name, args in self.routes:
+            with self.subTest(name):
+                sync = self.client.get(reverse(name, args=args))
+                response = self.client.get(reverse(self.async_name(name), args=args))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.content, sync.content)
+
+    def test_async_authentication(self):
+        self.client.credentials()
+        response = self.client.get(reverse("async-current-user"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse("async-league-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer invalid")
+        response = self.client.get(reverse("async-current-user"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_not_found(self):
+        response = self.client.get(reverse("async-habit-detail", args=[999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_matches_drf_output(self):
+        data = {
+            "utc": datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+            "micro": datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+            "offset": datetime(2025, 1, 2, 3, 4, 5, tzinfo=ZoneInfo("Africa/Cairo")),
+            "naive": datetime(2025, 1, 2, 3, 4, 5),
+            "date": date(2025, 1, 2),
+            "price": Decimal("19.99"),
+            "uuid": uuid.UUID(int=1),
+            "lazy": gettext_lazy("Not found."),
+            "text": "\u00fc \u2028 \u2029",
+            "nested": [{1: (1, 2.5, None, True)}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_floats_orjson_formats_differently_match_drf(self):
+        for value in (1e16, 2.5e-5, [{"a": -1.5e-9}], Decimal("1E+20"), 1e300):
+            with self.subTest(value=value):
+                self.assertEqual(
+                    FastJSONRenderer().render({"v": value}),
+                    JSONRenderer().render({"v": value}),
+                )
+
+    def test_unencodable_values_match_drf(self):
+        for value in (2**64, -(2**70), [1, {"big": 10**30}]):
+            self.assertEqual(
+                FastJSONRenderer().render({"v": value}),
+                JSONRenderer().render({"v": value}),
+            )
+        for value in (
+            {"v": float("nan")},
+            {"v": [None, {"w": -float("inf")}]},
+            {"v": Decimal("NaN")},
+            float("inf"),
+        ):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render(value)
+        self.assertEqual(
+            FastJSONRenderer().render({"v": None, "f": 1.5}), b'{"v":null,"f":1.5}'
+        )
+
+    def test_dataclasses_are_not_encoded(self):
+        @dataclasses.dataclass
+        class Point:
+            x: int
+
+        with self.assertRaises(TypeError):
+            JSONRenderer().render({"p": Point(1)})
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({"p": Point(1)})
+
+    def test_indent_falls_back_to_drf(self):
+        rendered = FastJSONRenderer().render({"a": 1}, "application/json; indent=2", {})
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_parser(self):
+        parsed = FastJSONParser().parse(BytesIO(b'{"completed": true, "n": [1]}'))
+        self.assertEqual(parsed, {"completed": True, "n": [1]})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b"{not json"))
+
+
+class ValuesListMixinTests(TestCase):
+    def test_rows_match_serializers(self):
+        from habit.serializers import HabitLogSerializer, HabitSerializer
+        from leagues.serializers import LeagueParticipantSerializer
+        from user.serializers import UserScoreSerializer
+
+        user = User.objects.create_user(email="values@example.com", password="x")
+        habit = Habit.objects.create(name="Walk", description="")
+        Habit.objects.create(name="Swim", description="Pool")
+        HabitLog.objects.create(user=user, habit=habit, completed=True)
+        league = League.objects.create(
+            created_by=user,
+            title="L",
+            habit=habit,
+            start_date=date.today(),
+            end_date=date.today(),
+        )
+        LeagueParticipant.objects.create(league=league, user=user, score=4)
+        UserScore.objects.create(user=user, score=9)
+
+        mixin = ValuesListMixin()
+        for serializer_class, queryset in (
+            (HabitSerializer, Habit.objects.order_by("id")),
+            (HabitLogSerializer, HabitLog.objects.order_by("-date")),
+            (LeagueParticipantSerializer, LeagueParticipant.objects.all()),
+            (UserScoreSerializer, UserScore.objects.order_by("-score")),
+        ):
+            with self.subTest(serializer_class.__name__):
+                mixin.get_serializer_class = lambda: serializer_class
+                self.assertEqual(
+                    JSONRenderer().render(mixin.values_rows(queryset)),
+                    JSONRenderer().render(serializer_class(queryset, many=True).data),
+                )
+
+    def test_unsupported_fields_are_rejected(self):
+        from leagues.serializers import LeaguesSerializer
+
+        with self.assertRaises(ImproperlyConfigured):
+            columns_for(LeaguesSerializer)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.user = User.objects.create_user(email="replica@example.com", password="x")
+        self.token = AccessToken.for_user(self.user)
+
+    def call(self, method, write=False, token=None, cookies=None):
+        seen = {}
+
+        def view(request):
+            seen["before"] = self.router.db_for_read(User)
+            if write:
+                self.router.db_for_write(User)
+                seen["after"] = self.router.db_for_read(User)
+            return HttpResponse()
+
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        request = getattr(RequestFactory(), method)("/", **headers)
+        request.COOKIES.update(cookies or {})
+        seen["response"] = ReplicaRoutingMiddleware(view)(request)
+        return seen
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(User), "default")
+
+    def test_safe_request_reads_from_replica(self):
+        self.assertEqual(self.call("get")["before"], "replica")
+
+    def test_unsafe_request_reads_from_primary(self):
+        self.assertEqual(self.call("post")["before"], "default")
+
+    def test_reads_after_a_write_use_primary(self):
+        self.assertEqual(self.call("get", write=True)["after"], "default")
+
+    def test_user_sticks_to_primary_after_writing(self):
+        self.call("patch", write=True, token=self.token)
+        self.assertEqual(self.call("get", token=self.token)["before"], "default")
+
+        other = AccessToken.for_user(
+            User.objects.create_user(email="other@example.com", password="x")
+        )
+        self.assertEqual(self.call("get", token=other)["before"], "replica")
+
+    def test_client_sticks_to_primary_through_any_worker(self):
+        response = self.call("post", write=True)["response"]
+        cookie = response.cookies[STICKY_COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+        # The cookie, not this process's cache, pins the next read.
+        cache.clear()
+        seen = self.call("get", cookies={STICKY_COOKIE: cookie.value})
+        self.assertEqual(seen["before"], "default")
+        self.assertEqual(self.call("get")["before"], "replica")
+
+    def test_stickiness_expires(self):
+        self.call("patch", write=True, token=self.token)
+        cache.delete(sticky_key(self.user.pk))
+        self.assertEqual(self.call("get", token=self.token)["before"], "replica")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        self.assertEqual(self.call("get")["before"], "default")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingRequestTests(TransactionTestCase):
+    # "replica" mirrors the primary over its own connection, so the data is
+    # committed for it to see, and each connection's queries show where a
+    # request read from.
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="reader@example.com", password="x")
+        self.client.defaults["HTTP_AUTHORIZATION"] = (
+            f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def request(self, method, name, **kwargs):
+        """(response, {alias: SQL run}) for one request."""
+        with CaptureQueriesContext(
+            connections["default"]
+        ) as primary, CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(self.client, method)(
+                reverse(name, **kwargs), content_type="application/json"
+            )
+        return response, {
+            "default": [query["sql"] for query in primary],
+            "replica": [query["sql"] for query in replica],
+        }
+
+    def reads(self, queries, table):
+        return [sql for sql in queries if sql.startswith("SELECT") and table in sql]
+
+    def test_reads_without_a_write_use_the_replica(self):
+        response, queries = self.request(
+            "get", "user-detail", kwargs={"pk": self.user.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.reads(queries["replica"], User._meta.db_table))
+        self.assertFalse(self.reads(queries["default"], User._meta.db_table))
+
+    def test_reads_after_a_write_use_the_primary(self):
+        response = self.client.patch(
+            reverse("current-user"), {"bio": "Now"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        response, queries = self.request(
+            "get", "user-detail", kwargs={"pk": self.user.pk}
+        )
+        self.assertEqual(response.data["bio"], "Now")
+        self.assertTrue(self.reads(queries["default"], User._meta.db_table))
+        self.assertEqual(queries["replica"], [])
+
+
+class StampTests(TestCase):
+    def test_other_processes_see_bumps_after_refreshing(self):
+        writer, reader = Stamps(), Stamps()
+        before = reader.get("plans")
+        writer.bump("plans")
+        self.assertNotEqual(writer.get("plans"), before)
+
+        reader.refresh()
+        self.assertEqual(reader.get("plans"), writer.get("plans"))
+        with self.assertNumQueries(0):
+            reader.get("plans")
+
+    def test_plan_changes_reach_registries_of_other_processes(self):
+        theirs, registry = Stamps(), PlanRegistry()
+        with mock.patch("user.plans.stamps", theirs):
+            self.assertIsNone(registry.get_by_name("Gold"))
+        self.addCleanup(plan_registry.clear)
+        Plan.objects.create(
+            name="Gold", price_monthly=1, price_annually=10, features=""
+        )
+
+        with mock.patch("user.plans.stamps", theirs):
+            theirs.refresh()
+            self.assertIsNotNone(registry.get_by_name("Gold"))
+
+
+@override_settings(CACHE_STAMP_INTERVAL=60)
+class AnonymousResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_response_cache_stats()
+        stamps.refresh()
+        self.owner = User.objects.create_user(email="owner@example.com", password="x")
+        self.league = League.objects.create(
+            title="Cached",
+            created_by=self.owner,
+            habit=Habit.objects.create(name="Cache"),
+            start_date=date(2030, 1, 1),
+            end_date=date(2030, 2, 1),
+        )
+
+    def test_anonymous_responses_are_cached(self):
+        url = reverse("league-detail", args=[self.league.pk])
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(response_cache_stats()["leagues"], {"miss": 1, "hit": 1})
+
+    def test_writes_invalidate_the_namespace(self):
+        url = reverse("league-detail", args=[self.league.pk])
+        self.client.get(url)
+        self.league.title = "Renamed"
+        self.league.save()
+        self.assertEqual(self.client.get(url).json()["title"], "Renamed")
+
+    def test_writes_in_other_processes_invalidate_the_namespace(self):
+        url = reverse("league-detail", args=[self.league.pk])
+        self.client.get(url)
+        League.objects.filter(pk=self.league.pk).update(title="Elsewhere")
+        Stamps().bump(namespace_stamp("leagues"))
+        self.assertEqual(self.client.get(url).json()["title"], "Cached")
+
+        stamps.refresh()
+        self.assertEqual(self.client.get(url).json()["title"], "Elsewhere")
+
+    def test_user_changes_only_invalidate_that_user(self):
+        other = User.objects.create_user(email="other@example.com", password="x")
+        urls = [reverse("user-detail", args=[user.pk]) for user in (self.owner, other)]
+        for url in urls:
+            self.client.get(url)
+
+        progress = self.owner.progress
+        progress.xp = 50
+        progress.save()
+        with self.assertNumQueries(0):
+            self.client.get(urls[1])
+        self.assertEqual(self.client.get(urls[0]).json()["progress"]["xp"], 50)
+
+    def test_joins_invalidate_leagues(self):
+        url = reverse("league-detail", args=[self.league.pk])
+        self.client.get(url)
+        self.league.participants.add(self.owner)
+        self.assertEqual(self.client.get(url).json()["participants"], [self.owner.pk])
+
+    def test_unlisted_query_params_share_an_entry(self):
+        url = reverse("league-detail", args=[self.league.pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url, {"nocache": "1"})
+        self.assertEqual(response_cache_stats()["leagues"], {"miss": 1, "hit": 1})
+
+        with mock.patch.object(LeagueDetailsView, "cache_query_params", ["lang"]):
+            key = LeagueDetailsView().response_cache_key
+            self.assertEqual(
+                key(RequestFactory().get(url, {"lang": "en", "x": "1"})),
+                key(RequestFactory().get(url, {"lang": "en"})),
+            )
+            self.assertNotEqual(
+                key(RequestFactory().get(url, {"lang": "en"})),
+                key(RequestFactory().get(url, {"lang": "de"})),
+            )
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        url = reverse("user-detail", args=[self.owner.pk])
+        self.client.get(url)
+        token = AccessToken.for_user(self.owner)
+        self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response_cache_stats()["users"], {"miss": 1, "bypass": 1})
+
+    def test_errors_are_not_cached(self):
+        url = reverse("league-detail", args=[self.league.pk + 1])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(response_cache_stats()["leagues"], {"miss": 2})
+
+    def test_stale_entry_is_served_while_another_worker_rebuilds(self):
+        url = reverse("league-detail", args=[self.league.pk])
+        with mock.patch.object(AnonymousResponseCacheMixin, "cache_fresh_seconds", 0):
+            self.client.get(url)
+            key = LeagueDetailsView().response_cache_key(RequestFactory().get(url))
+            cache.add(f"{key}:lock", True)
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.json()["title"], "Cached")
+            self.assertEqual(response_cache_stats()["leagues"]["stale"], 1)
+
+            cache.delete(f"{key}:lock")
+            self.client.get(url)
+        self.assertEqual(response_cache_stats()["leagues"]["miss"], 2)
+
+
+calls = []
+
+
+@task(name="tests.record", max_attempts=2, retry_backoff=30)
+def record_call(value):
+    if value == "boom":
+        raise RuntimeError("boom")
+    calls.append(value)
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_worker(self):
+        call_command("run_worker", "--once", "--threads=1", stdout=StringIO())
+
+    def test_delay_queues_and_worker_runs(self):
+        record_call.delay("a")
+        self.assertEqual(calls, [])
+        self.run_worker()
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_idempotency_key_drops_duplicates(self):
+        self.assertTrue(record_call.enqueue(["a"], idempotency_key="once"))
+        self.assertFalse(record_call.enqueue(["a"], idempotency_key="once"))
+        self.run_worker()
+        self.assertEqual(calls, ["a"])
+        self.assertFalse(record_call.enqueue(["a"], idempotency_key="once"))
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        record_call.delay("boom")
+        with self.assertLogs("core.queue", "WARNING"):
+            self.run_worker()
+        queued = Task.objects.get()
+        self.assertEqual((queued.status, queued.attempts), (Task.PENDING, 1))
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=25))
+        self.assertIn("RuntimeError", queued.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs("core.queue", "WARNING"):
+            self.run_worker()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_abandoned_tasks_are_reclaimed(self):
+        record_call.delay("a")
+        Task.objects.update(
+            status=Task.RUNNING, locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.run_worker()
+        self.assertEqual(calls, ["a"])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_call.delay("a")
+        self.assertEqual(calls, ["a"])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_drops_duplicates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(record_call.enqueue(["a"], idempotency_key="once"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(record_call.enqueue(["a"], idempotency_key="once"))
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_deferred_receiver_reloads_instance_in_worker(self):
+        seen = []
+
+        @deferred_receiver
+        def handler(sender, instance, created, **kwargs):
+            seen.append((instance.email, created))
+
+        user = User.objects.create_user(email="deferred@example.com", password="x")
+        handler(sender=User, instance=user, created=True, update_fields=None)
+        self.assertEqual(seen, [])
+        self.run_worker()
+        self.assertEqual(seen, [("deferred@example.com", True)])
+
+    def test_completing_a_habit_awards_xp_in_the_worker(self):
+        user = User.objects.create_user(email="xp@example.com", password="x")
+        habit = Habit.objects.create(name="Read")
+        log = HabitLog.objects.create(user=user, habit=habit, completed=False)
+        log.completed = True
+        log.save()
+        self.assertEqual(user.progress.xp, 0)
+        self.run_worker()
+        user.progress.refresh_from_db()
+        self.assertEqual(user.progress.xp, 10)
+
+    def test_xp_is_queued_once_per_log(self):
+        user = User.objects.create_user(email="twice@example.com", password="x")
+        log = HabitLog.objects.create(user=user, habit=Habit.objects.create(name="Nap"))
+        for completed in (True, False, True):
+            log.completed = completed
+            log.save()
+        self.run_worker()
+        user.progress.refresh_from_db()
+        self.assertEqual(user.progress.xp, 10)
+
+    def test_task_that_lost_its_lease_rolls_back(self):
+        user = User.objects.create_user(email="lease@example.com", password="x")
+        award_xp.delay(user.id, 10)
+        [record] = claim(1, 60)
+        # Another worker re-claims the task after the lease ran out.
+        Task.objects.update(attempts=record.attempts + 1)
+        with self.assertLogs("core.queue", "WARNING"):
+            self.assertFalse(execute(record))
+        user.progress.refresh_from_db()
+        self.assertEqual(user.progress.xp, 0)
+        self.assertEqual(Task.objects.get().status, Task.RUNNING)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(
+            email="staff@example.com", password="x", is_staff=True
+        )
+        self.url = reverse("global-leaderboard")
+
+    def get(self, user, **headers):
+        token = AccessToken.for_user(user)
+        return self.client.get(
+            self.url, HTTP_AUTHORIZATION=f"Bearer {token}", **headers
+        )
+
+    def test_unsampled_requests_are_not_profiled(self):
+        self.get(self.staff)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_staff_header_profiles_request(self):
+        response = self.get(self.staff, HTTP_X_PROFILE="1")
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual(profile.url_name, "global-leaderboard")
+        self.assertEqual(profile.status_code, 200)
+        self.assertIn("cumulative", profile.summary)
+        self.assertTrue(marshal.loads(bytes(profile.stats)))
+
+    def test_header_is_ignored_for_non_staff(self):
+        user = User.objects.create_user(email="plain@example.com", password="x")
+        response = self.get(user, HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_profiled(self):
+        self.client.get(self.url)
+        self.assertEqual(RequestProfile.objects.get().url_name, "global-leaderboard")
+
+    def test_admin_lists_slowest_first_and_downloads(self):
+        self.get(self.staff, HTTP_X_PROFILE="1")
+        admin = User.objects.create_superuser(email="admin@example.com", password="x")
+        self.client.force_login(admin)
+        profile = RequestProfile.objects.get()
+        changelist = self.client.get(reverse("admin:core_requestprofile_changelist"))
+        self.assertContains(changelist, "global-leaderboard")
+        detail = self.client.get(
+            reverse("admin:core_requestprofile_change", args=[profile.pk])
+        )
+        self.assertContains(detail, "Download")
+        download = self.client.get(
+            reverse("admin:core_requestprofile_download", args=[profile.pk])
+        )
+        self.assertEqual(download.content, bytes(profile.stats))
+
+    def test_download_needs_view_permission(self):
+        self.get(self.staff, HTTP_X_PROFILE="1")
+        url = reverse(
+            "admin:core_requestprofile_download",
+            args=[RequestProfile.objects.get().pk],
+        )
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.staff.user_permissions.add(
+            Permission.objects.get(codename="view_requestprofile")
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.counter = Counter("jobs_total", "Jobs.", ["kind"], registry=self.registry)
+        self.histogram = Histogram(
+            "job_seconds", "Job time.", buckets=(0.1, 1), registry=self.registry
+        )
+
+    def test_thread_shards_are_summed(self):
+        self.counter.inc(kind="a")
+        thread = threading.Thread(target=lambda: self.counter.inc(2, kind="a"))
+        thread.start()
+        thread.join()
+        self.assertEqual(self.counter.snapshot(), {("a",): 3})
+
+    def test_text_exposition(self):
+        self.counter.inc(kind='say "hi"')
+        for value in (0.05, 0.1, 0.5, 3):
+            self.histogram.observe(value)
+        text = self.registry.render()
+        self.assertIn("# TYPE jobs_total counter", text)
+        self.assertIn('jobs_total{kind="say \\"hi\\""} 1.0', text)
+        self.assertIn('job_seconds_bucket{le="0.1"} 2.0', text)
+        self.assertIn('job_seconds_bucket{le="1.0"} 3.0', text)
+        self.assertIn('job_seconds_bucket{le="+Inf"} 4.0', text)
+        self.assertIn("job_seconds_count 4.0", text)
+        self.assertIn("job_seconds_sum 3.65", text)
+
+    def test_processes_are_merged_through_the_metrics_dir(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(f"{directory}/{os.getppid()}-a.json", "w") as other_process:
+                json.dump(
+                    {
+                        "jobs_total": [[["a"], 5]],
+                        "job_seconds": [[[], [[1, 0, 0], 0.05]]],
+                    },
+                    other_process,
+                )
+            self.counter.inc(kind="a")
+            self.histogram.observe(0.5)
+            with override_settings(METRICS_DIR=directory):
+                totals = self.registry.totals()
+        self.assertEqual(totals["jobs_total"], {("a",): 6})
+        self.assertEqual(totals["job_seconds"], {(): [[1, 1, 0], 0.55]})
+
+    def test_exited_processes_are_folded_into_one_file(self):
+        child = subprocess.Popen([sys.executable, "-c", ""])
+        child.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            for name in (f"{child.pid}-a", f"{child.pid}-b"):
+                with open(f"{directory}/{name}.json", "w") as exited_process:
+                    json.dump({"jobs_total": [[["a"], 2]]}, exited_process)
+            self.counter.inc(kind="a")
+            with override_settings(METRICS_DIR=directory):
+                self.assertEqual(self.registry.totals()["jobs_total"], {("a",): 5})
+                self.assertEqual(self.registry.totals()["jobs_total"], {("a",): 5})
+            self.assertEqual(
+                sorted(f for f in os.listdir(directory) if f.endswith(".json")),
+                sorted([EXITED_FILE, self.registry.filename()]),
+            )
+
+    def test_forked_processes_get_their_own_file(self):
+        filename = self.registry.filename()
+        self.assertEqual(self.registry.filename(), filename)
+        self.assertTrue(filename.startswith(f"{os.getpid()}-"))
+        self.registry._file = (os.getpid() + 1, filename)
+        self.assertNotEqual(self.registry.filename(), filename)
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+    def test_endpoint_reports_requests_and_queue_depth(self):
+        self.client.get(reverse("plan-list"))
+        record_call.delay("a")
+        text = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{view="plan-list",method="GET",'
+            'status="200"}',
+            text,
+        )
+        self.assertIn('task_queue_depth{status="pending"} 1.0', text)
+
+    def test_endpoint_is_internal(self):
+        url = reverse("metrics")
+        # Not even from localhost, which is every request behind a proxy.
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with override_settings(METRICS_TOKEN="secret"):
+            response = self.client.get(
+                url, REMOTE_ADDR="10.0.0.1", HTTP_AUTHORIZATION="Bearer secret"
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong")
+            self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"]):
+            self.assertEqual(
+                self.client.get(url, REMOTE_ADDR="10.0.0.1").status_code, 200
+            )
+
+
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email="root@example.com", password="x"
+        )
+        self.client.force_login(self.admin)
+        habits = [Habit.objects.create(name=f"H{i}") for i in range(5)]
+        self.logs = [
+            HabitLog.objects.create(user=self.admin, habit=habit) for habit in habits
+        ]
+        self.url = reverse("admin:habit_habitlog_changelist")
+
+    def page_ids(self, response):
+        return [log.pk for log in response.context["cl"].result_list]
+
+    def test_keyset_pages_newest_first(self):
+        newest_first = [log.pk for log in reversed(self.logs)]
+        with mock.patch.object(HabitLogAdmin, "list_per_page", 2):
+            first = self.client.get(self.url)
+            self.assertEqual(self.page_ids(first), newest_first[:2])
+            self.assertContains(first, "Next page")
+
+            second = self.client.get(self.url + first.context["cl"].next_page_url)
+            self.assertEqual(self.page_ids(second), newest_first[2:4])
+            self.assertContains(second, "First page")
+
+            last = self.client.get(self.url + second.context["cl"].next_page_url)
+            self.assertEqual(self.page_ids(last), newest_first[4:])
+            self.assertIsNone(last.context["cl"].next_page_url)
+
+    def test_keyset_keeps_filters(self):
+        HabitLog.objects.filter(pk=self.logs[-1].pk).update(completed=True)
+        response = self.client.get(self.url + "?completed__exact=1")
+        self.assertEqual(self.page_ids(response), [self.logs[-1].pk])
+        self.assertEqual(response.context["cl"].result_count, 1)
+
+    def test_sorting_falls_back_to_numbered_pages(self):
+        response = self.client.get(self.url + "?o=4")
+        self.assertFalse(response.context["cl"].keyset)
+        self.assertEqual(len(self.page_ids(response)), 5)
+
+    def test_estimated_count_matches_exact_count_off_postgres(self):
+        self.assertEqual(estimated_count(HabitLog.objects.all()), 5)
+
+    def test_league_and_user_changelists(self):
+        league_url = reverse("admin:leagues_league_changelist")
+        self.assertEqual(self.client.get(league_url).status_code, 200)
+        users = self.client.get(
+            reverse("admin:user_customuser_changelist") + "?q=ROOT@example.com"
+        )
+        self.assertEqual(list(users.context["cl"].result_list), [self.admin])
+
+
+class QueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """The hot read paths must stay index scans with no extra sort step."""
+
+    def setUp(self):
+        users = User.objects.bulk_create(
+            User(email=f"plan{i}@example.com") for i in range(20)
+        )
+        self.user = users[0]
+        habit = Habit.objects.create(name="Plan")
+        today = date.today()
+        HabitLog.objects.bulk_create(HabitLog(user=user, habit=habit) for user in users)
+        self.league = League.objects.create(
+            created_by=self.user,
+            title="Plan League",
+            habit=habit,
+            start_date=today,
+            end_date=today + timedelta(days=7),
+        )
+        LeagueParticipant.objects.bulk_create(
+            LeagueParticipant(league=self.league, user=user, score=i)
+            for i, user in enumerate(users)
+        )
+        UserScore.objects.bulk_create(
+            UserScore(user=user, score=i) for i, user in enumerate(users)
+        )
+
+    def view_queryset(self, view_class, **kwargs):
+        view = view_class(kwargs=kwargs)
+        view.request = RequestFactory().get("/")
+        view.request.user = self.user
+        return view.get_queryset()
+
+    def test_user_habit_logs(self):
+        self.assertUsesIndex(
+            self.view_queryset(UserHabitLogListView), "habitlog_user_date_idx"
+        )
+
+    def test_league_leaderboard(self):
+        self.assertUsesIndex(
+            self.view_queryset(LeagueLeaderboardView, league_id=self.league.id),
+            "participant_rank_idx",
+        )
+
+    def test_global_leaderboard(self):
+        self.assertUsesIndex(
+            self.view_queryset(GlobalLeaderboardView), "userscore_rank_idx"
+        )
+
+    def test_leagues_running_on_a_date(self):
+        today = date.today()
+        self.assertUsesIndex(
+            League.objects.filter(start_date__lte=today, end_date__gte=today),
+            "league_dates_idx",
+            ordered=False,
+        )
+
+    def test_active_leagues_for_habit(self):
+        self.assertUsesIndex(
+            League.objects.filter(
+                habit_id=self.league.habit_id, status=League.ACTIVE
+            ).values_list("id", flat=True),
+            "league_habit_status_idx",
+            ordered=False,
+        )
+
+    def test_leagues_due_to_start(self):
+        self.assertUsesIndex(
+            League.objects.filter(status=League.UPCOMING, start_date__lte=date.today()),
+            "league_status_start_idx",
+            ordered=False,
+        )
+
+    def test_unindexed_query_fails(self):
+        with self.assertRaises(AssertionError):
+            self.assertUsesIndex(
+                HabitLog.objects.order_by("completed"), "habitlog_user_date_idx"
+            )
@@ -1,3 +1,21 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
 
-# Create your views here.
+from .metrics import REGISTRY
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, for callers with METRICS_TOKEN or from
+    METRICS_ALLOWED_IPS only.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    authorized = bool(token) and constant_time_compare(header, f"Bearer {token}")
+    allowed_ips = getattr(settings, "METRICS_ALLOWED_IPS", ())
+    if not authorized and request.META.get("REMOTE_ADDR") not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
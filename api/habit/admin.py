@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Habit
+from core.changelists import LargeTableAdminMixin
+from .models import Habit, HabitLog, HabitLogArchive
 
 
 # Register your models here.
@@ -7,3 +8,20 @@ from .models import Habit
 class HabitAdmin(admin.ModelAdmin):
     list_display = ("name", "description", "created_at")
     search_fields = ("name",)
+
+
+@admin.register(HabitLog)
+class HabitLogAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "user", "habit", "date", "completed")
+    list_filter = ("completed",)
+    list_select_related = ("user", "habit")
+    autocomplete_fields = ("user", "habit")
+    search_fields = ("=user__email",)
+
+
+@admin.register(HabitLogArchive)
+class HabitLogArchiveAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "user", "habit", "month", "completed_count")
+    list_select_related = ("user", "habit")
+    autocomplete_fields = ("user", "habit")
+    search_fields = ("=user__email",)
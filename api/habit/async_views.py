@@ -0,0 +1,34 @@
+from core.async_views import AsyncReadView
+from .models import Habit, HabitLog
+from .serializers import HabitLogSerializer, HabitSerializer
+
+
+class AsyncHabitListView(AsyncReadView):
+    """List all habits."""
+
+    async def get(self, request, *args, **kwargs):
+        habits = [habit async for habit in Habit.objects.all()]
+        return self.render(HabitSerializer(habits, many=True).data)
+
+
+class AsyncHabitDetailView(AsyncReadView):
+    """Retrieve a habit."""
+
+    async def get(self, request, *args, **kwargs):
+        habit = await Habit.objects.filter(pk=kwargs["pk"]).afirst()
+        if habit is None:
+            return self.not_found()
+        return self.render(HabitSerializer(habit).data)
+
+
+class AsyncUserHabitLogListView(AsyncReadView):
+    """List all logs of the authenticated user."""
+
+    async def get(self, request, *args, **kwargs):
+        logs = [
+            log
+            async for log in HabitLog.objects.filter(user=request.user).order_by(
+                "-date"
+            )
+        ]
+        return self.render(HabitLogSerializer(logs, many=True).data)
@@ -0,0 +1,84 @@
+"""
+Readers for a user's full habit history, which lives in two tables: recent
+days in HabitLog and older months compacted into HabitLogArchive.
+"""
+
+import heapq
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.streaming import iterate
+from .models import HabitLog, HabitLogArchive
+
+
+def month_days(month, mask):
+    """The dates whose bit is set in a month bitmask."""
+    day = 1
+    while mask:
+        if mask & 1:
+            yield month.replace(day=day)
+        mask >>= 1
+        day += 1
+
+
+def expand_archive(rows):
+    """
+    Turn archive rows of (month, logged_mask, completed_mask, *values) into
+    one (*values, date, completed) row per logged day.
+    """
+    for month, logged_mask, completed_mask, *values in rows:
+        for day in month_days(month, logged_mask):
+            yield (*values, day, bool(completed_mask >> (day.day - 1) & 1))
+
+
+def user_history(user_id):
+    """(habit_id, date, completed) for every logged day, by habit and date."""
+    archived = expand_archive(
+        iterate(
+            HabitLogArchive.objects.filter(user_id=user_id)
+            .order_by("habit_id", "month")
+            .values_list("month", "logged_mask", "completed_mask", "habit_id")
+        )
+    )
+    live = iterate(
+        HabitLog.objects.filter(user_id=user_id)
+        .order_by("habit_id", "date")
+        .values_list("habit_id", "date", "completed")
+    )
+    return heapq.merge(archived, live)
+
+
+def habit_stats(user_id):
+    """Lifetime totals and streaks per habit, in one pass over the history."""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    stats = {}
+    for habit_id, day, completed in user_history(user_id):
+        entry = stats.setdefault(
+            habit_id,
+            {
+                "habit": habit_id,
+                "logged": 0,
+                "completed": 0,
+                "current_streak": 0,
+                "longest_streak": 0,
+                "last_completed": None,
+            },
+        )
+        entry["logged"] += 1
+        if not completed:
+            continue
+        entry["completed"] += 1
+        if entry["last_completed"] == day - timedelta(days=1):
+            entry["current_streak"] += 1
+        else:
+            entry["current_streak"] = 1
+        entry["longest_streak"] = max(entry["longest_streak"], entry["current_streak"])
+        entry["last_completed"] = day
+
+    for entry in stats.values():
+        # A streak is still running if it reaches today or yesterday.
+        last = entry.pop("last_completed")
+        if last is None or last < yesterday:
+            entry["current_streak"] = 0
+    return list(stats.values())
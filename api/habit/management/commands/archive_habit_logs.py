@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Min, Q, Sum, Value, When
+from django.db.models.functions import Cast, ExtractDay
+from django.utils import timezone
+
+from habit.models import HabitLog, HabitLogArchive
+
+ARCHIVE_AFTER_DAYS = 365
+
+
+def next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compact habit logs older than the horizon into one HabitLogArchive "
+        "row per user, habit and month, then delete them in chunks. Only "
+        "whole months are archived. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "HABIT_LOG_ARCHIVE_DAYS", ARCHIVE_AFTER_DAYS),
+            help="Keep at least this many days of logs in the live table.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Users compacted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = (timezone.localdate() - timedelta(days=options["days"])).replace(day=1)
+        oldest = HabitLog.objects.filter(date__lt=cutoff).aggregate(Min("date"))[
+            "date__min"
+        ]
+
+        archived = deleted = 0
+        month = oldest.replace(day=1) if oldest else cutoff
+        while month < cutoff:
+            logs = HabitLog.objects.filter(date__gte=month, date__lt=next_month(month))
+            last_user = 0
+            while True:
+                users = list(
+                    logs.filter(user_id__gt=last_user)
+                    .order_by("user_id")
+                    .values_list("user_id", flat=True)
+                    .distinct()[: options["batch_size"]]
+                )
+                if not users:
+                    break
+                last_user = users[-1]
+                rows, removed = self.compact(month, logs.filter(user_id__in=users))
+                archived += rows
+                deleted += removed
+            month = next_month(month)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {deleted} logs into {archived} monthly rows "
+                f"(everything before {cutoff})."
+            )
+        )
+
+    @transaction.atomic
+    def compact(self, month, logs):
+        # Each (user, habit, date) is unique, so summing 1 << (day - 1) sets
+        # exactly one bit per logged day.
+        # EXTRACT yields numeric on Postgres, which can't be a shift operand.
+        day = Cast(ExtractDay("date"), IntegerField())
+        day_bit = Value(1).bitleftshift(day - 1)
+        summaries = list(
+            logs.order_by()
+            .values("user_id", "habit_id")
+            .annotate(
+                logged_mask=Sum(day_bit),
+                completed_mask=Sum(
+                    Case(
+                        When(completed=True, then=day_bit),
+                        default=0,
+                        output_field=IntegerField(),
+                    )
+                ),
+                completed_count=Count("id", filter=Q(completed=True)),
+            )
+        )
+
+        # Months archived by an earlier run may have gained late logs since.
+        existing = {
+            (row.user_id, row.habit_id): row
+            for row in HabitLogArchive.objects.select_for_update().filter(
+                month=month, user_id__in={summary["user_id"] for summary in summaries}
+            )
+        }
+        to_create, to_update = [], []
+        for summary in summaries:
+            row = existing.get((summary["user_id"], summary["habit_id"]))
+            if row is None:
+                to_create.append(HabitLogArchive(month=month, **summary))
+                continue
+            new_days = summary["logged_mask"] & ~row.logged_mask
+            row.logged_mask |= summary["logged_mask"]
+            row.completed_mask |= summary["completed_mask"] & new_days
+            row.completed_count = bin(row.completed_mask).count("1")
+            to_update.append(row)
+
+        HabitLogArchive.objects.bulk_create(to_create)
+        HabitLogArchive.objects.bulk_update(
+            to_update, ["logged_mask", "completed_mask", "completed_count"]
+        )
+        deleted, _ = logs.delete()
+        return len(to_create) + len(to_update), deleted
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.db import connections, models
+
+
+class HabitLogManager(models.Manager):
+    def set_today(self, user_id, habit_id, completed):
+        """
+        Create or update the user's log of a habit for today in a single
+        statement. Returns (log id, changed), or None if the habit does not
+        exist. Repeating a call changes nothing and reads the log back.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        habit_table = quote(
+            self.model._meta.get_field("habit").related_model._meta.db_table
+        )
+        today = date.today()  # what auto_now_add stores for HabitLog.date
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (habit_id, user_id, date, completed) "
+                f"SELECT %s, %s, %s, %s "
+                f"WHERE EXISTS (SELECT 1 FROM {habit_table} WHERE id = %s) "
+                f"ON CONFLICT (habit_id, user_id, date) "
+                f"DO UPDATE SET completed = EXCLUDED.completed "
+                f"WHERE {table}.completed <> EXCLUDED.completed "
+                f"RETURNING id",
+                [habit_id, user_id, today, completed, habit_id],
+            )
+            row = cursor.fetchone()
+        if row is not None:
+            return row[0], True
+
+        log_id = (
+            self.filter(user_id=user_id, habit_id=habit_id, date=today)
+            .values_list("id", flat=True)
+            .first()
+        )
+        return None if log_id is None else (log_id, False)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0004_habitlogarchive"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="habitlog",
+            index=models.Index(fields=["user", "-date"], name="habitlog_user_date_idx"),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from user.models import CustomUser
 from django.utils import timezone
+from .managers import HabitLogManager
 
 
 class Habit(models.Model):
@@ -20,8 +21,37 @@ class HabitLog(models.Model):
     date = models.DateField(auto_now_add=True)
     completed = models.BooleanField(default=False)
 
+    objects = HabitLogManager()
+
     class Meta:
         unique_together = ("habit", "user", "date")
+        indexes = [
+            models.Index(fields=["user", "-date"], name="habitlog_user_date_idx")
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.habit} on {self.date} ({'done' if self.completed else 'missed'})"
+
+
+class HabitLogArchive(models.Model):
+    """
+    Logs of one user and habit for a whole month, compacted by the
+    archive_habit_logs command. Bit n-1 of a mask stands for day n.
+    """
+
+    habit = models.ForeignKey(
+        Habit, on_delete=models.CASCADE, related_name="archived_logs"
+    )
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="archived_habit_logs"
+    )
+    month = models.DateField(help_text="First day of the month.")
+    logged_mask = models.IntegerField(default=0)
+    completed_mask = models.IntegerField(default=0)
+    completed_count = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "habit", "month")
+
+    def __str__(self):
+        return f"{self.user} - {self.habit} in {self.month:%Y-%m} ({self.completed_count} done)"
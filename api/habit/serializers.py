@@ -13,3 +13,7 @@ class HabitLogSerializer(serializers.ModelSerializer):
         model = HabitLog
         fields = "__all__"
         read_only_fields = ["user", "habit", "date"]
+
+
+class HabitLogTodaySerializer(serializers.Serializer):
+    completed = serializers.BooleanField(default=True)
@@ -1,13 +1,33 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 
-from user.models import UserProgress
+from core.metrics import SIGNAL_TIME
 from .models import HabitLog
+from .tasks import COMPLETION_XP, award_xp, xp_key
+from leagues.tasks import record_completion
 
 
 @receiver(pre_save, sender=HabitLog)
+@SIGNAL_TIME.time(handler="add_xp_on_completion")
 def add_xp_on_completion(sender, instance, **kwargs):
-    if instance.pk:
-        old = HabitLog.objects.get(pk=instance.pk)
-        if not old.completed and instance.completed:
-            UserProgress.add_xp(instance.user.progress, 10)
+    if instance.pk and instance.completed:
+        was_completed = (
+            HabitLog.objects.filter(pk=instance.pk)
+            .values_list("completed", flat=True)
+            .first()
+        )
+        if was_completed is False:
+            award_xp.enqueue(
+                [instance.user_id, COMPLETION_XP], idempotency_key=xp_key(instance.pk)
+            )
+            record_completion.delay(instance.user_id, instance.habit_id)
+
+
+@receiver(post_save, sender=HabitLog)
+def record_logged_completion(sender, instance, created, **kwargs):
+    # Logs created already completed never pass through the update path.
+    if created and instance.completed:
+        award_xp.enqueue(
+            [instance.user_id, COMPLETION_XP], idempotency_key=xp_key(instance.pk)
+        )
+        record_completion.delay(instance.user_id, instance.habit_id)
@@ -0,0 +1,17 @@
+from core.queue import task
+from user.models import UserProgress
+
+# XP for completing a habit on a given day.
+COMPLETION_XP = 10
+
+
+def xp_key(log_id):
+    return f"xp:{log_id}"
+
+
+@task(max_attempts=5)
+def award_xp(user_id, amount):
+    # Runs on the run_worker command (or at commit with TASKS_EAGER), so XP
+    # shows up once the worker has picked the task up. Callers pass an
+    # idempotency key per log, e.g. xp_key(log_id), to enqueue it once.
+    UserProgress.objects.select_for_update().get(user_id=user_id).add_xp(amount)
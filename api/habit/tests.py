@@ -1,8 +1,19 @@
-from rest_framework.test import APITestCase, APIClient
+import csv
+import gzip
+import json
+from datetime import date, timedelta
+from io import StringIO
+
+from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from .models import Habit, HabitLog
+from django.core.management import call_command
+from django.utils import timezone
+from core.models import Task
+from core.testing import QueryBudgetAPIClient
+from .models import Habit, HabitLog, HabitLogArchive
+from .tasks import award_xp
 
 
 User = get_user_model()
@@ -10,7 +21,7 @@ User = get_user_model()
 
 class HabitViewsTests(APITestCase):
     def setUp(self):
-        self.client = APIClient()
+        self.client = QueryBudgetAPIClient()
 
         # Create user (without Plan for now — remove if you have plan logic)
         self.user = User.objects.create_user(
@@ -67,11 +78,64 @@ class HabitViewsTests(APITestCase):
         self.assertEqual(log.habit, self.habit1)
         self.assertEqual(log.user, self.user)
 
+    def test_create_completed_habit_log_awards_xp(self):
+        url = reverse("habit-log-create", args=[self.habit1.id])
+        response = self.client.post(url, {"completed": True}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        call_command("run_worker", "--once", "--threads=1", stdout=StringIO())
+        self.user.progress.refresh_from_db()
+        self.assertEqual(self.user.progress.xp, 10)
+
     def test_create_habit_log_invalid_habit(self):
         url = reverse("habit-log-create", args=[999])
         response = self.client.post(url, format="json")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    # ---------------- HabitLogTodayView ----------------
+    def test_set_today_creates_then_is_idempotent(self):
+        url = reverse("habit-today", args=[self.habit1.id])
+        first = self.client.put(url, {"completed": True}, format="json")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["xp_awarded"], 10)
+        self.assertTrue(first.data["changed"])
+
+        again = self.client.put(url, {"completed": True}, format="json")
+        self.assertEqual(again.data["id"], first.data["id"])
+        self.assertFalse(again.data["changed"])
+        self.assertEqual(again.data["xp_awarded"], 0)
+
+        call_command("run_worker", "--once", "--threads=1", stdout=StringIO())
+        self.user.progress.refresh_from_db()
+        self.assertEqual(self.user.progress.xp, 10)
+        log = HabitLog.objects.get()
+        self.assertEqual((log.date, log.completed), (date.today(), True))
+
+    def test_set_today_updates_existing_log(self):
+        log = HabitLog.objects.create(user=self.user, habit=self.habit1)
+        url = reverse("habit-today", args=[self.habit1.id])
+        response = self.client.put(url, {}, format="json")
+        self.assertEqual(response.data["id"], log.id)
+        self.assertEqual(response.data["xp_awarded"], 10)
+
+        response = self.client.put(url, {"completed": False}, format="json")
+        self.assertTrue(response.data["changed"])
+        self.assertEqual(response.data["xp_awarded"], 0)
+        log.refresh_from_db()
+        self.assertFalse(log.completed)
+
+        # Checking it again changes the log but awards nothing new.
+        response = self.client.put(url, {"completed": True}, format="json")
+        self.assertTrue(response.data["changed"])
+        self.assertEqual(response.data["xp_awarded"], 0)
+        self.assertEqual(Task.objects.filter(name=award_xp.name).count(), 1)
+
+    def test_set_today_unknown_habit(self):
+        response = self.client.put(
+            reverse("habit-today", args=[999]), {}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(HabitLog.objects.exists())
+
     # ---------------- UserHabitLogListView ----------------
     def test_list_user_habit_logs(self):
         HabitLog.objects.create(user=self.user, habit=self.habit1)
@@ -91,3 +155,124 @@ class HabitViewsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         log.refresh_from_db()
         self.assertTrue(log.completed)
+
+    # ---------------- Exports ----------------
+    def create_logs(self):
+        for habit in (self.habit1, self.habit2):
+            HabitLog.objects.create(user=self.user, habit=habit, completed=True)
+        other = User.objects.create_user(email="other@example.com", password="x")
+        HabitLog.objects.create(user=other, habit=self.habit3)
+
+    def test_export_user_logs_as_csv(self):
+        self.create_logs()
+        response = self.client.get(reverse("user-habit-log-export"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = list(
+            csv.reader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual(rows[0], ["id", "habit", "habit_name", "date", "completed"])
+        self.assertEqual([row[2] for row in rows[1:]], ["Drink Water", "Read 10 pages"])
+
+    def test_export_user_logs_as_gzipped_ndjson(self):
+        self.create_logs()
+        response = self.client.get(
+            reverse("user-habit-log-export") + "?as=ndjson",
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = gzip.decompress(b"".join(response.streaming_content))
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["habit"], self.habit1.id)
+        self.assertIs(lines[0]["completed"], True)
+
+    def test_export_rejects_unknown_format(self):
+        response = self.client.get(reverse("user-habit-log-export") + "?as=xml")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_all_logs_is_staff_only(self):
+        self.create_logs()
+        url = reverse("habit-log-export")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0], "user,id,habit,habit_name,date,completed")
+        self.assertEqual(len(rows), 4)
+
+
+class HabitLogArchiveTests(APITestCase):
+    def setUp(self):
+        self.client = QueryBudgetAPIClient()
+        self.user = User.objects.create_user(email="archive@example.com", password="x")
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(name="Meditate")
+        self.old_month = date(2020, 3, 1)
+
+    def log(self, day, completed=True, habit=None):
+        log = HabitLog.objects.create(
+            user=self.user, habit=habit or self.habit, completed=completed
+        )
+        HabitLog.objects.filter(pk=log.pk).update(date=day)
+
+    def archive(self, *args):
+        call_command("archive_habit_logs", *args, stdout=StringIO())
+
+    def test_old_logs_are_compacted_into_monthly_masks(self):
+        self.log(date(2020, 3, 1))
+        self.log(date(2020, 3, 2), completed=False)
+        self.log(date(2020, 3, 31))
+        self.log(timezone.localdate())
+
+        self.archive()
+
+        row = HabitLogArchive.objects.get()
+        self.assertEqual(row.month, self.old_month)
+        self.assertEqual(row.logged_mask, 0b11 | 1 << 30)
+        self.assertEqual(row.completed_mask, 0b1 | 1 << 30)
+        self.assertEqual(row.completed_count, 2)
+        self.assertEqual(HabitLog.objects.count(), 1)
+
+    def test_rerun_merges_late_logs(self):
+        self.log(date(2020, 3, 1))
+        self.archive()
+        self.log(date(2020, 3, 3))
+        self.archive()
+
+        row = HabitLogArchive.objects.get()
+        self.assertEqual(row.logged_mask, 0b101)
+        self.assertEqual(row.completed_count, 2)
+        self.assertFalse(HabitLog.objects.exists())
+
+    def test_export_includes_archived_days(self):
+        self.log(date(2020, 3, 2), completed=False)
+        self.log(timezone.localdate())
+        self.archive()
+
+        response = self.client.get(reverse("user-habit-log-export"))
+        rows = list(
+            csv.reader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual(
+            rows[1], ["", str(self.habit.id), "Meditate", "2020-03-02", "False"]
+        )
+        self.assertEqual(rows[2][3], timezone.localdate().isoformat())
+
+    def test_stats_merge_archive_and_live_logs(self):
+        today = timezone.localdate()
+        first = today.replace(day=1)
+        self.log(first - timedelta(days=2))
+        self.log(first - timedelta(days=1))
+        self.log(first)
+        self.archive("--days=0")
+        self.assertEqual(HabitLog.objects.count(), 1)
+
+        response = self.client.get(reverse("user-habit-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data[0]
+        self.assertEqual(stats["habit"], self.habit.id)
+        self.assertEqual((stats["logged"], stats["completed"]), (3, 3))
+        self.assertEqual(stats["longest_streak"], 3)
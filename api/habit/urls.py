@@ -13,10 +13,34 @@ urlpatterns = [
         views.HabitLogCreateView.as_view(),
         name="habit-log-create",
     ),
+    path(
+        "<int:habit_id>/today/", views.HabitLogTodayView.as_view(), name="habit-today"
+    ),
     path("me/logs/", views.UserHabitLogListView.as_view(), name="user-habit-logs"),
+    path(
+        "me/logs/export/",
+        views.UserHabitLogExportView.as_view(),
+        name="user-habit-log-export",
+    ),
+    path("logs/export/", views.HabitLogExportView.as_view(), name="habit-log-export"),
+    path("me/stats/", views.UserHabitStatsView.as_view(), name="user-habit-stats"),
     path(
         "me/logs/<int:log_id>/",
         views.UserHabitLogUpdateView.as_view(),
         name="user-habit-log-update",
     ),
 ]
+
+# Maximum queries per request, enforced in tests by QueryBudgetAPIClient.
+query_budgets = {
+    "user-habits": 10,
+    "habit-list": 1,
+    "habit-detail": 1,
+    "habit-log-create": 4,
+    "habit-today": 5,
+    "user-habit-logs": 1,
+    "user-habit-log-export": 2,
+    "habit-log-export": 3,
+    "user-habit-stats": 2,
+    "user-habit-log-update": 5,
+}
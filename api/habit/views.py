@@ -1,13 +1,26 @@
+from itertools import chain
+
 from rest_framework import generics, permissions
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
-from .models import Habit, HabitLog
-from .serializers import HabitSerializer, HabitLogSerializer
+from core.readonly import ValuesListMixin
+from core.streaming import iterate, streaming_export
+from .history import expand_archive, habit_stats
+from .models import Habit, HabitLog, HabitLogArchive
+from .serializers import HabitSerializer, HabitLogSerializer, HabitLogTodaySerializer
+from .tasks import COMPLETION_XP, award_xp, xp_key
+from leagues.tasks import record_completion
+from user.models import UserUsage
+from user.plans import plan_registry
 from user.serializers import UserSerializer
 
+# Export columns filled in from an archive row's masks rather than a field.
+ARCHIVE_EXPANDED = ("id", "date", "completed")
+
 
-class HabitListView(generics.ListAPIView):
+class HabitListView(ValuesListMixin, generics.ListAPIView):
     """List all habits, or create a new habit."""
 
     queryset = Habit.objects.all()
@@ -42,18 +55,20 @@ class UsersHabitsView(generics.UpdateAPIView):
         if not isinstance(habit_ids, list):
             raise ValidationError({"habits": "Must be a list of habit IDs."})
 
-        plan = user.plan
-        if plan and len(habit_ids) > plan.max_habits:
+        max_habits = plan_registry.max_habits(user.plan_id)
+        if max_habits is not None and len(habit_ids) > max_habits:
             raise ValidationError(
                 {
-                    "habits": f"You can only have {plan.max_habits} habits with your current plan."
+                    "habits": f"You can only have {max_habits} habits with your current plan."
                 }
             )
 
-        habits = Habit.objects.filter(id__in=habit_ids)
+        habits = list(Habit.objects.filter(id__in=habit_ids))
 
-        user.habits.set(habits)
-        user.save()
+        with transaction.atomic():
+            user.habits.set(habits)
+            user.save()
+            UserUsage.objects.set_value(user.id, "habits_subscribed", len(habits))
 
         return Response(UserSerializer(user).data)
 
@@ -69,7 +84,48 @@ class HabitLogCreateView(generics.CreateAPIView):
         serializer.save(user=self.request.user, habit=habit)
 
 
-class UserHabitLogListView(generics.ListAPIView):
+class HabitLogTodayView(generics.GenericAPIView):
+    """
+    Set today's log of a habit for the current user, creating it if needed.
+    Idempotent: returns the log's state and the XP the call awarded.
+    """
+
+    serializer_class = HabitLogTodaySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def put(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        completed = serializer.validated_data["completed"]
+        user_id, habit_id = request.user.id, self.kwargs["habit_id"]
+
+        with transaction.atomic():
+            result = HabitLog.objects.set_today(user_id, habit_id, completed)
+            if result is None:
+                raise NotFound("Habit not found.")
+            log_id, changed = result
+            # The upsert bypasses the HabitLog signals, so queue their work here.
+            xp = 0
+            if changed and completed:
+                # A log re-checked after being unchecked already got its XP.
+                if award_xp.enqueue(
+                    [user_id, COMPLETION_XP], idempotency_key=xp_key(log_id)
+                ):
+                    xp = COMPLETION_XP
+                record_completion.delay(user_id, habit_id)
+
+        return Response(
+            {
+                "id": log_id,
+                "habit": habit_id,
+                "completed": completed,
+                "changed": changed,
+                "xp_awarded": xp,
+            }
+        )
+
+
+class UserHabitLogListView(ValuesListMixin, generics.ListAPIView):
     """List all logs of the authenticated user."""
 
     serializer_class = HabitLogSerializer
@@ -79,6 +135,83 @@ class UserHabitLogListView(generics.ListAPIView):
         return HabitLog.objects.filter(user=self.request.user).order_by("-date")
 
 
+class UserHabitLogExportView(generics.GenericAPIView):
+    """
+    Stream the authenticated user's full habit history, archived months
+    first (their days have no log id), then live logs by date.
+    - `?as=csv` (default) or `?as=ndjson`; gzip when accepted by the client.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    fields = {
+        "id": "id",
+        "habit": "habit_id",
+        "habit_name": "habit__name",
+        "date": "date",
+        "completed": "completed",
+    }
+    filename = "habit-logs"
+
+    def get_queryset(self):
+        return HabitLog.objects.filter(user=self.request.user)
+
+    def get_archive_queryset(self):
+        return HabitLogArchive.objects.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        live = (
+            self.get_queryset()
+            .order_by("date", "id")
+            .values_list(*self.fields.values())
+        )
+        rows = chain(self.archived_rows(), iterate(live))
+        return streaming_export(request, list(self.fields), rows, self.filename)
+
+    def archived_rows(self):
+        names = [name for name in self.fields if name not in ARCHIVE_EXPANDED]
+        archived = expand_archive(
+            iterate(
+                self.get_archive_queryset()
+                .order_by("month", "id")
+                .values_list(
+                    "month",
+                    "logged_mask",
+                    "completed_mask",
+                    *(self.fields[name] for name in names),
+                )
+            )
+        )
+        return (self.archived_row(names, row) for row in archived)
+
+    def archived_row(self, names, row):
+        *values, day, completed = row
+        by_name = dict(zip(names, values), id=None, date=day, completed=completed)
+        return tuple(by_name[name] for name in self.fields)
+
+
+class HabitLogExportView(UserHabitLogExportView):
+    """Stream every user's habit history. Staff only."""
+
+    permission_classes = [permissions.IsAdminUser]
+    fields = {"user": "user_id", **UserHabitLogExportView.fields}
+    filename = "all-habit-logs"
+
+    def get_queryset(self):
+        return HabitLog.objects.all()
+
+    def get_archive_queryset(self):
+        return HabitLogArchive.objects.all()
+
+
+class UserHabitStatsView(generics.GenericAPIView):
+    """Lifetime totals and streaks per habit, across live and archived logs."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response(habit_stats(request.user.id))
+
+
 class UserHabitLogUpdateView(generics.UpdateAPIView):
     serializer_class = HabitLogSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -0,0 +1,87 @@
+"""
+League activity feeds.
+
+Small leagues get a precomputed timeline: completions and joins are
+written to every league of the member (fan-out on write) and each timeline
+is trimmed to LEAGUE_FEED_CAP rows. Leagues above LEAGUE_FEED_FANOUT_LIMIT
+members would turn every completion into a write storm, so their members'
+completions are written once per user instead and merged into the feed on
+read (fan-out on read).
+"""
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import League, LeagueActivity, LeagueParticipant
+
+FEED_CAP = 500
+FANOUT_LIMIT = 5000
+
+
+def feed_cap():
+    return getattr(settings, "LEAGUE_FEED_CAP", FEED_CAP)
+
+
+def fanout_limit():
+    return getattr(settings, "LEAGUE_FEED_FANOUT_LIMIT", FANOUT_LIMIT)
+
+
+def trim(**timeline):
+    """Delete all but the newest feed_cap() rows of one timeline."""
+    oldest_kept = (
+        LeagueActivity.objects.filter(**timeline)
+        .order_by("-id")
+        .values_list("id", flat=True)[feed_cap() - 1 : feed_cap()]
+    )
+    LeagueActivity.objects.filter(**timeline, id__lt=oldest_kept).delete()
+
+
+def record_completion(user_id, habit_id):
+    leagues = list(
+        League.objects.filter(
+            leaderboard__user_id=user_id, habit_id=habit_id, status=League.ACTIVE
+        ).values_list("id", "participant_count")
+    )
+    small = [league_id for league_id, count in leagues if count <= fanout_limit()]
+    in_large_league = len(small) < len(leagues)
+
+    LeagueActivity.objects.bulk_create(
+        [
+            LeagueActivity(
+                league_id=league_id,
+                user_id=user_id,
+                habit_id=habit_id,
+                kind=LeagueActivity.COMPLETED,
+            )
+            for league_id in small
+        ]
+        + (
+            [
+                LeagueActivity(
+                    user_id=user_id, habit_id=habit_id, kind=LeagueActivity.COMPLETED
+                )
+            ]
+            if in_large_league
+            else []
+        )
+    )
+    for league_id in small:
+        trim(league_id=league_id)
+    if in_large_league:
+        trim(league=None, user_id=user_id)
+
+
+def record_join(league_id, user_id):
+    LeagueActivity.objects.create(
+        league_id=league_id, user_id=user_id, kind=LeagueActivity.JOINED
+    )
+    trim(league_id=league_id)
+
+
+def league_feed(league):
+    """The league's activity, newest first by id."""
+    entries = Q(league=league)
+    if league.participant_count > fanout_limit():
+        members = LeagueParticipant.objects.filter(league=league).values("user_id")
+        entries |= Q(league=None, habit_id=league.habit_id, user_id__in=members)
+    return LeagueActivity.objects.filter(entries).select_related("user")
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from core.changelists import EstimatedCountPaginator
 from .models import League, LeagueParticipant
 
 
@@ -15,12 +16,18 @@ class LeagueAdmin(admin.ModelAdmin):
         "habit",
         "start_date",
         "end_date",
+        "status",
         "created_at",
     )
-    list_filter = ("start_date", "end_date", "created_by")
-    search_fields = ("title", "description", "rules", "rewards", "created_by__email")
+    list_filter = ("status", "start_date", "end_date")
+    list_select_related = ("created_by", "habit")
+    autocomplete_fields = ("created_by", "habit")
+    search_fields = ("title", "=created_by__email")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     ordering = ("-created_at",)
-    readonly_fields = ("created_at",)
+    # Status only moves through advance_leagues, which runs the hooks.
+    readonly_fields = ("status", "created_at")
 
     fieldsets = (
         (
@@ -35,13 +42,14 @@ class LeagueAdmin(admin.ModelAdmin):
                 "fields": (
                     "start_date",
                     "end_date",
+                    "status",
                 ),
             },
         ),
         (
             "Additional Details",
             {
-                "fields": ("rules", "rewards"),
+                "fields": ("rules", "scoring_rules", "rewards"),
             },
         ),
         (
@@ -56,3 +64,4 @@ class LeagueAdmin(admin.ModelAdmin):
 class LeagueParticipantInline(admin.TabularInline):
     model = LeagueParticipant
     extra = 1  # how many empty forms to show
+    autocomplete_fields = ("user",)
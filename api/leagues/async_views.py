@@ -0,0 +1,129 @@
+import asyncio
+
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+
+from core.async_views import AsyncReadView
+from . import live
+from .models import League, LeagueParticipant
+from .serializers import LeagueParticipantSerializer, LeaguesSerializer
+
+
+def leagues_queryset():
+    return League.objects.select_related("created_by").prefetch_related("participants")
+
+
+class AsyncLeagueListView(AsyncReadView):
+    """List all leagues."""
+
+    authentication_required = False
+
+    async def get(self, request, *args, **kwargs):
+        leagues = [league async for league in leagues_queryset()]
+        return self.render(LeaguesSerializer(leagues, many=True).data)
+
+
+class AsyncLeagueDetailsView(AsyncReadView):
+    """Retrieve details of a single league."""
+
+    authentication_required = False
+
+    async def get(self, request, *args, **kwargs):
+        league = await leagues_queryset().filter(pk=kwargs["pk"]).afirst()
+        if league is None:
+            return self.not_found()
+        return self.render(LeaguesSerializer(league).data)
+
+
+class AsyncLeagueLeaderboardView(AsyncReadView):
+    """List users ranked in a specific league."""
+
+    async def get(self, request, *args, **kwargs):
+        participants = [
+            participant
+            async for participant in LeagueParticipant.objects.filter(
+                league_id=kwargs["league_id"]
+            ).order_by("-score")
+        ]
+        return self.render(LeagueParticipantSerializer(participants, many=True).data)
+
+
+class AsyncLeagueLeaderboardStreamView(AsyncReadView):
+    """
+    Stream a league's leaderboard as server-sent events: a `snapshot` event
+    with every entry, then `update` events with the changed entries and
+    removed users. Comment lines keep idle connections open.
+
+    Besides a Bearer token, accepts `?ticket=` from
+    LeagueStreamTicketView, since browsers' EventSource cannot send an
+    Authorization header:
+
+        const {ticket} = await (await fetch(ticketUrl, {method: "POST",
+            headers: {Authorization: `Bearer ${access}`}})).json();
+        const source = new EventSource(`${streamUrl}?ticket=${ticket}`);
+
+    Tickets expire after live.TICKET_SECONDS, so fetch a new one before
+    reconnecting (EventSource's automatic retry would reuse the old one).
+    """
+
+    keepalive_seconds = 15
+
+    async def authenticate(self, request):
+        ticket = request.GET.get("ticket")
+        if ticket is None:
+            return await super().authenticate(request)
+        user_id = live.ticket_user(ticket, self.kwargs["league_id"])
+        if user_id is None:
+            raise exceptions.AuthenticationFailed(
+                _("Stream ticket is invalid or expired"), code="invalid_ticket"
+            )
+        user = await self.authentication.acached_user(user_id)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        return user, None
+
+    async def get(self, request, *args, **kwargs):
+        league_id = kwargs["league_id"]
+        if not await League.objects.filter(pk=league_id).aexists():
+            return self.not_found()
+        response = StreamingHttpResponse(
+            LeaderboardEvents(league_id, self.renderer, self.keepalive_seconds),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class LeaderboardEvents:
+    """
+    The server-sent events of one stream. Django calls close() when the
+    response ends, including when the client disconnects mid-stream, which
+    unsubscribes the watcher right away; an async generator would only be
+    closed whenever it happened to be finalized.
+    """
+
+    def __init__(self, league_id, renderer, keepalive_seconds):
+        self.watch = live.hub.watch(league_id)
+        self.renderer = renderer
+        self.keepalive_seconds = keepalive_seconds
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.watch.queue is None:
+            await self.watch.__aenter__()
+        try:
+            kind, data = await asyncio.wait_for(
+                self.watch.queue.get(), self.keepalive_seconds
+            )
+        except asyncio.TimeoutError:
+            return b": keepalive\n\n"
+        return b"event: %s\ndata: %s\n\n" % (kind.encode(), self.renderer.render(data))
+
+    def close(self):
+        self.watch.close()
@@ -0,0 +1,74 @@
+"""
+League lifecycle: upcoming, then active from start_date, then ended after
+end_date.
+
+advance() moves every league that is due in bulk and, in the same
+transaction, queues the start or end hook for each league it moved and
+releases the leagues_joined slots of leagues that ended. A
+league is only moved by the run that changes its status, so its hooks are
+queued exactly once however often the scheduler runs.
+"""
+
+from django.db import transaction
+
+from core.response_cache import bump_response_cache
+from user.models import UserUsage
+from .models import League, LeagueParticipant
+from .tasks import end_league, start_league
+
+HOOKS = {League.ACTIVE: start_league, League.ENDED: end_league}
+
+
+def queue_hook(league_id, status):
+    HOOKS[status].enqueue([league_id], idempotency_key=f"league-{status}:{league_id}")
+
+
+def transition(leagues, status):
+    """Move a queryset of leagues to `status`; returns the ids moved."""
+    with transaction.atomic():
+        ids = list(
+            leagues.select_for_update(skip_locked=True).values_list("id", flat=True)
+        )
+        if not ids:
+            return ids
+        League.objects.filter(pk__in=ids).update(status=status)
+        for league_id in ids:
+            queue_hook(league_id, status)
+            if status == League.ENDED:
+                release_slots(league_id)
+        transaction.on_commit(lambda: bump_response_cache("leagues"))
+    return ids
+
+
+def release_slots(league_id):
+    """
+    Give a league's participants back the leagues_joined slot it used:
+    plan quotas count the leagues a user is in until they end.
+    """
+    UserUsage.objects.decrement(
+        LeagueParticipant.objects.filter(league_id=league_id).values("user_id"),
+        "leagues_joined",
+    )
+
+
+def advance(day):
+    """Apply the transitions due on `day`; returns (started ids, ended ids)."""
+    started = transition(
+        League.objects.filter(status=League.UPCOMING, start_date__lte=day),
+        League.ACTIVE,
+    )
+    ended = transition(
+        League.objects.filter(status=League.ACTIVE, end_date__lt=day), League.ENDED
+    )
+    return started, ended
+
+
+def initial_status(start_date, day):
+    """The status of a league created on `day`: active if it starts then."""
+    return League.ACTIVE if start_date <= day else League.UPCOMING
+
+
+def queue_start(league):
+    """Queue the start hook of a league created active."""
+    if league.status == League.ACTIVE:
+        queue_hook(league.pk, League.ACTIVE)
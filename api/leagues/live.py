@@ -0,0 +1,306 @@
+"""
+Live league leaderboards.
+
+Writers call publish(league_id) once a league's scores have changed. The
+backend carries the notification to every ASGI process: LocalBackend within
+the current process, RedisBackend across processes through Redis pub/sub.
+In each process one Channel per watched league coalesces notifications: at
+most once per LEAGUE_LIVE_INTERVAL seconds it reads the leaderboard with a
+single query and sends the rank and score changes to all of its watchers.
+
+Browsers' EventSource cannot send an Authorization header, so clients
+exchange their JWT for a stream ticket (see stream_ticket) and pass it in
+the stream URL instead.
+"""
+
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.utils.module_loading import import_string
+
+from .models import LeagueParticipant
+
+INTERVAL = 1.0
+QUEUE_SIZE = 16
+REDIS_CHANNEL = "leagues:live"
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+TICKET_SECONDS = 60
+TICKET_SALT = "leagues.live.stream"
+
+logger = logging.getLogger(__name__)
+
+
+def interval():
+    return getattr(settings, "LEAGUE_LIVE_INTERVAL", INTERVAL)
+
+
+def ranks(rows):
+    """{user id: (rank, score)} for (user id, score) rows in rank order."""
+    return {user_id: (rank, score) for rank, (user_id, score) in enumerate(rows, 1)}
+
+
+def entries(board):
+    return [
+        {"user": user_id, "rank": rank, "score": score}
+        for user_id, (rank, score) in sorted(board.items(), key=lambda e: e[1][0])
+    ]
+
+
+def deltas(previous, current):
+    """The entries that changed between two boards, and the users removed."""
+    changed = {
+        user_id: position
+        for user_id, position in current.items()
+        if previous.get(user_id) != position
+    }
+    removed = sorted(user_id for user_id in previous if user_id not in current)
+    return entries(changed), removed
+
+
+class Channel:
+    """The watchers of one league and the last leaderboard sent to them."""
+
+    def __init__(self, league_id):
+        self.league_id = league_id
+        self.watchers = set()
+        self.board = None
+        self.dirty = asyncio.Event()
+        self.dirty.set()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def fetch(self):
+        rows = (
+            LeagueParticipant.objects.filter(league_id=self.league_id)
+            .order_by("-score", "id")
+            .values_list("user_id", "score")
+        )
+        return ranks([row async for row in rows])
+
+    async def run(self):
+        while self.watchers:
+            await self.dirty.wait()
+            self.dirty.clear()
+            try:
+                board = await self.fetch()
+            except Exception:
+                logger.exception(
+                    "Could not read leaderboard of league %s", self.league_id
+                )
+                self.dirty.set()
+                await asyncio.sleep(interval())
+                continue
+            if self.board is None:
+                self.board = board
+                for queue in self.watchers:
+                    self.send(queue, *self.snapshot())
+            else:
+                changed, removed = deltas(self.board, board)
+                self.board = board
+                if changed or removed:
+                    event = {
+                        "league": self.league_id,
+                        "changes": changed,
+                        "removed": removed,
+                    }
+                    for queue in self.watchers:
+                        self.send(queue, "update", event)
+            await asyncio.sleep(interval())
+
+    def snapshot(self):
+        return "snapshot", {"league": self.league_id, "entries": entries(self.board)}
+
+    def send(self, queue, kind, data):
+        try:
+            queue.put_nowait((kind, data))
+        except asyncio.QueueFull:
+            # A watcher this far behind gets a fresh snapshot instead.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(self.snapshot())
+
+    def add(self, queue):
+        self.watchers.add(queue)
+        if self.board is not None:
+            self.send(queue, *self.snapshot())
+
+
+class Hub:
+    """The channels of this process, living on its event loop."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.loop = None
+        self.channels = {}
+        self.listener = None
+
+    def bind(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.channels = {}
+            self.listener = self.backend.listen(self)
+        elif self.listener is not None and self.listener.done():
+            # The listener died despite retrying (or was cancelled): start
+            # another, and refresh every board in case notifications were
+            # missed meanwhile.
+            self.listener = self.backend.listen(self)
+            self.mark_all()
+
+    def watch(self, league_id):
+        """
+        An async context manager giving a queue of (event, data) pairs for
+        one league's leaderboard.
+        """
+        return Watch(self, league_id)
+
+    def subscribe(self, league_id):
+        self.bind()
+        channel = self.channels.get(league_id)
+        if channel is None or channel.task.done():
+            channel = self.channels[league_id] = Channel(league_id)
+        queue = asyncio.Queue(QUEUE_SIZE)
+        channel.add(queue)
+        return queue
+
+    def unsubscribe(self, league_id, queue):
+        """Stop sending to a queue; safe to repeat and to call from any thread."""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not loop:
+            loop.call_soon_threadsafe(self.unsubscribe, league_id, queue)
+            return
+        channel = self.channels.get(league_id)
+        if channel is None or queue not in channel.watchers:
+            return
+        channel.watchers.discard(queue)
+        if not channel.watchers:
+            channel.task.cancel()
+            del self.channels[league_id]
+
+    def notify(self, league_id):
+        """Mark a league changed; safe to call from any thread."""
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.mark, league_id)
+
+    def mark(self, league_id):
+        channel = self.channels.get(league_id)
+        if channel is not None:
+            channel.dirty.set()
+
+    def mark_all(self):
+        for channel in self.channels.values():
+            channel.dirty.set()
+
+
+class Watch:
+    """
+    Hub.watch()'s context manager. A class rather than an
+    @asynccontextmanager generator so that a watcher abandoned by its
+    client is unsubscribed however its enclosing generator is finalized.
+    """
+
+    def __init__(self, hub, league_id):
+        self.hub = hub
+        self.league_id = league_id
+        self.queue = None
+
+    async def __aenter__(self):
+        self.queue = self.hub.subscribe(self.league_id)
+        return self.queue
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.queue is not None:
+            self.hub.unsubscribe(self.league_id, self.queue)
+
+
+class LocalBackend:
+    """Delivers notifications within the current process only."""
+
+    def publish(self, league_id):
+        hub.notify(league_id)
+
+    def listen(self, hub):
+        return None
+
+
+class RedisBackend:
+    """Delivers notifications to every process through Redis pub/sub."""
+
+    def __init__(self):
+        import redis
+
+        self.url = settings.LEAGUE_LIVE_REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+
+    def publish(self, league_id):
+        self.client.publish(REDIS_CHANNEL, league_id)
+
+    def listen(self, hub):
+        return asyncio.get_running_loop().create_task(self.receive(hub))
+
+    async def receive(self, hub):
+        """Forward notifications to the hub, reconnecting whenever Redis fails."""
+        import redis.asyncio
+
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                client = redis.asyncio.Redis.from_url(self.url)
+                async with client, client.pubsub() as pubsub:
+                    await pubsub.subscribe(REDIS_CHANNEL)
+                    delay = RECONNECT_DELAY
+                    # Notifications sent while disconnected were lost.
+                    hub.mark_all()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            hub.mark(int(message["data"]))
+            except Exception:
+                logger.exception(
+                    "Lost the league live Redis subscription, reconnecting in %ss",
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+
+hub = Hub(
+    import_string(
+        getattr(settings, "LEAGUE_LIVE_BACKEND", "leagues.live.LocalBackend")
+    )()
+)
+
+
+def publish(league_id):
+    """Tell every watcher of a league that its scores changed."""
+    hub.backend.publish(league_id)
+
+
+def stream_ticket(user_id, league_id):
+    """
+    A signed ticket letting a user open one league's stream for the next
+    TICKET_SECONDS, for clients that cannot send an Authorization header.
+    """
+    return signing.dumps([user_id, league_id], salt=TICKET_SALT)
+
+
+def ticket_user(ticket, league_id):
+    """The user id of a valid, unexpired ticket for the league, else None."""
+    try:
+        user_id, ticket_league = signing.loads(
+            ticket, salt=TICKET_SALT, max_age=TICKET_SECONDS
+        )
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    return user_id if ticket_league == league_id else None
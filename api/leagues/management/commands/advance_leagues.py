@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from leagues.lifecycle import advance
+
+
+class Command(BaseCommand):
+    help = (
+        "Start leagues whose start date has come and end leagues whose end "
+        "date has passed, queueing their start and end hooks. Run shortly "
+        "after midnight (or more often); safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            help="Apply the transitions due on this day (YYYY-MM-DD). "
+            "Defaults to today.",
+        )
+
+    def handle(self, *args, **options):
+        day = options["date"] or timezone.localdate()
+        started, ended = advance(day)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Started {len(started)} leagues and ended {len(ended)} on {day}."
+            )
+        )
@@ -0,0 +1,50 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from leagues import scoring
+from leagues.models import League
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the scores of every active league through a date from its "
+        "participants' habit logs, applying each league's scoring_rules. "
+        "Run at the end of the day; safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            help="Score leagues through this day (YYYY-MM-DD). Defaults to today.",
+        )
+        parser.add_argument(
+            "--league",
+            type=int,
+            action="append",
+            dest="leagues",
+            help="Only score this league id, if active. May be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        if scoring.np is None:
+            raise CommandError("score_leagues needs numpy, which is not installed.")
+
+        day = options["date"] or timezone.localdate()
+        leagues = League.objects.filter(status=League.ACTIVE)
+        if options["leagues"]:
+            leagues = leagues.filter(pk__in=options["leagues"])
+
+        scored = updated = 0
+        for league in leagues.order_by("pk"):
+            updated += scoring.score_league(league, day)
+            scored += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scored {scored} leagues through {day}, "
+                f"updating {updated} participants."
+            )
+        )
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_participants(apps, schema_editor):
+    League = apps.get_model("leagues", "League")
+    LeagueParticipant = apps.get_model("leagues", "LeagueParticipant")
+    counts = (
+        LeagueParticipant.objects.filter(league=OuterRef("pk"))
+        .order_by()
+        .values("league")
+        .annotate(n=Count("*"))
+        .values("n")
+    )
+    League.objects.update(
+        participant_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0004_habitlogarchive"),
+        ("leagues", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="league",
+            name="participant_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="LeagueActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("completed", "Completed"), ("joined", "Joined")],
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="habit.habit",
+                    ),
+                ),
+                (
+                    "league",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="activity",
+                        to="leagues.league",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="league_activity",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["league", "-id"], name="leagues_lea_league__902e97_idx"
+                    ),
+                    models.Index(
+                        fields=["user", "-id"], name="leagues_lea_user_id_92fbda_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(count_participants, migrations.RunPython.noop),
+    ]
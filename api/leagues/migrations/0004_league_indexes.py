@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0005_habitlog_user_date_index"),
+        ("leagues", "0003_league_activity"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="league",
+            index=models.Index(
+                fields=["start_date", "end_date"], name="league_dates_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leagueparticipant",
+            index=models.Index(
+                fields=["league", "-score"], name="participant_rank_idx"
+            ),
+        ),
+    ]
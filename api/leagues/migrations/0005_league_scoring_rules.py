@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leagues", "0004_league_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="league",
+            name="scoring_rules",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_status(apps, schema_editor):
+    # Existing leagues take the state their dates imply, without hooks.
+    League = apps.get_model("leagues", "League")
+    today = timezone.localdate()
+    League.objects.filter(end_date__lt=today).update(status="ended")
+    League.objects.filter(start_date__lte=today, end_date__gte=today).update(
+        status="active"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habit", "0005_habitlog_user_date_index"),
+        ("leagues", "0005_league_scoring_rules"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="league",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("upcoming", "Upcoming"),
+                    ("active", "Active"),
+                    ("ended", "Ended"),
+                ],
+                default="upcoming",
+                max_length=10,
+            ),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="league",
+            index=models.Index(
+                fields=["habit", "status"], name="league_habit_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="league",
+            index=models.Index(
+                fields=["status", "start_date"], name="league_status_start_idx"
+            ),
+        ),
+    ]
@@ -4,6 +4,11 @@ from habit.models import Habit
 
 
 class League(models.Model):
+    UPCOMING = "upcoming"
+    ACTIVE = "active"
+    ENDED = "ended"
+    STATUS_CHOICES = [(UPCOMING, "Upcoming"), (ACTIVE, "Active"), (ENDED, "Ended")]
+
     created_by = models.ForeignKey(
         CustomUser,
         on_delete=models.CASCADE,
@@ -22,11 +27,29 @@ class League(models.Model):
     habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name="leagues")
     start_date = models.DateField()
     end_date = models.DateField()
+    # Moved along by the advance_leagues command, which runs the start and
+    # end hooks on each transition.
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UPCOMING)
     rules = models.TextField(blank=True, null=True)
+    # Declarative settings for leagues.scoring; empty means one point per
+    # completed day.
+    scoring_rules = models.JSONField(default=dict, blank=True)
     rewards = models.TextField(blank=True, null=True)
+    # Maintained on join; decides between the precomputed activity feed and
+    # fan-out on read (see leagues.activity).
+    participant_count = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["start_date", "end_date"], name="league_dates_idx"),
+            models.Index(fields=["habit", "status"], name="league_habit_status_idx"),
+            models.Index(
+                fields=["status", "start_date"], name="league_status_start_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title} made by {self.created_by}"
 
@@ -44,6 +67,46 @@ class LeagueParticipant(models.Model):
     class Meta:
         unique_together = ("league", "user")
         ordering = ["-score"]
+        indexes = [
+            models.Index(fields=["league", "-score"], name="participant_rank_idx")
+        ]
 
     def __str__(self):
         return f"{self.user} in {self.league} → {self.score} pts"
+
+
+class LeagueActivity(models.Model):
+    """
+    An entry of a league's activity feed. Rows without a league are
+    per-user completions, written only for members of very large leagues
+    whose feeds are assembled on read.
+    """
+
+    COMPLETED = "completed"
+    JOINED = "joined"
+    KIND_CHOICES = [(COMPLETED, "Completed"), (JOINED, "Joined")]
+
+    league = models.ForeignKey(
+        League,
+        on_delete=models.CASCADE,
+        related_name="activity",
+        blank=True,
+        null=True,
+    )
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="league_activity"
+    )
+    habit = models.ForeignKey(
+        Habit, on_delete=models.CASCADE, related_name="+", blank=True, null=True
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["league", "-id"]),
+            models.Index(fields=["user", "-id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.kind} in {self.league or 'their leagues'}"
@@ -0,0 +1,172 @@
+"""
+Batch scoring of leagues from their participants' habit logs.
+
+A league's completions are loaded once into a participants × days boolean
+matrix and its `scoring_rules` are applied with array operations:
+
+- per_completion: points for each completed day.
+- streak_length / streak_bonus: extra points for each completed day that is
+  at least the streak_length-th in a row.
+- perfect_week_multiplier: multiplies the points of every full week (counted
+  from the league's start) completed on all seven days.
+- catch_up_cap: no participant trails the leader by more than this many
+  points; null disables it.
+"""
+
+import math
+
+from django.db import connections, router, transaction
+
+from habit.models import HabitLog
+from . import live
+from .models import LeagueParticipant
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None
+
+DEFAULT_RULES = {
+    "per_completion": 1,
+    "streak_length": 0,
+    "streak_bonus": 0,
+    "perfect_week_multiplier": 1,
+    "catch_up_cap": None,
+}
+# Upper bounds keeping a day's points at most 1000 * 2 * 10, so scores fit
+# LeagueParticipant.score (a 32-bit integer) for leagues of up to 290 years.
+MAX_RULES = {
+    "per_completion": 1000,
+    "streak_length": 366,
+    "streak_bonus": 1000,
+    "perfect_week_multiplier": 10,
+    "catch_up_cap": 2**31 - 1,
+}
+BATCH_SIZE = 2000
+
+
+def validate_rules(rules):
+    """Return a list of problems with a scoring_rules value."""
+    if not isinstance(rules, dict):
+        return ["Must be an object."]
+    errors = [f"Unknown rule '{name}'." for name in rules if name not in DEFAULT_RULES]
+    for name, value in rules.items():
+        if name not in DEFAULT_RULES or (value is None and name == "catch_up_cap"):
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"'{name}' must be a number.")
+        elif not math.isfinite(value):
+            errors.append(f"'{name}' must be finite.")
+        elif value < 0:
+            errors.append(f"'{name}' cannot be negative.")
+        elif value > MAX_RULES[name]:
+            errors.append(f"'{name}' cannot exceed {MAX_RULES[name]}.")
+    return errors
+
+
+def completion_matrix(league, through):
+    """
+    (participant rows, completions) for the league's days up to `through`.
+    Rows are (participant id, user id, score) sorted by user id; completions
+    is a bool array with one row per participant and one column per day.
+    """
+    participants = np.array(
+        list(
+            LeagueParticipant.objects.filter(league=league)
+            .order_by("user_id")
+            .values_list("id", "user_id", "score")
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    start, end = league.start_date, min(through, league.end_date)
+    days = max((end - start).days + 1, 0)
+    done = np.zeros((len(participants), days), dtype=bool)
+    if not len(participants) or not days:
+        return participants, done
+
+    logs = HabitLog.objects.filter(
+        habit_id=league.habit_id,
+        completed=True,
+        date__range=(start, end),
+        user_id__in=LeagueParticipant.objects.filter(league=league).values("user_id"),
+    ).values_list("user_id", "date")
+    completions = list(logs)
+    if completions:
+        user_ids, dates = zip(*completions)
+        rows = np.searchsorted(participants[:, 1], np.array(user_ids, dtype=np.int64))
+        columns = (
+            np.array(dates, dtype="datetime64[D]") - np.datetime64(start, "D")
+        ).astype(np.int64)
+        done[rows, columns] = True
+    return participants, done
+
+
+def streaks(done):
+    """Length of the run of completed days ending at each cell."""
+    counts = np.cumsum(done, axis=1)
+    # The count at each missed day, carried forward: a run starts after it.
+    reset = np.maximum.accumulate(np.where(done, 0, counts), axis=1)
+    return counts - reset
+
+
+def score_matrix(done, rules):
+    """Total score per participant (row) of a completion matrix."""
+    rules = {**DEFAULT_RULES, **rules}
+    points = done * float(rules["per_completion"])
+    if rules["streak_length"] and rules["streak_bonus"]:
+        points += (streaks(done) >= rules["streak_length"]) * float(
+            rules["streak_bonus"]
+        )
+    totals = points.sum(axis=1)
+
+    weeks = done.shape[1] // 7
+    if weeks and rules["perfect_week_multiplier"] != 1:
+        shape = (done.shape[0], weeks, 7)
+        perfect = done[:, : weeks * 7].reshape(shape).all(axis=2)
+        week_points = points[:, : weeks * 7].reshape(shape).sum(axis=2)
+        totals += ((rules["perfect_week_multiplier"] - 1) * week_points * perfect).sum(
+            axis=1
+        )
+
+    totals = np.rint(totals).astype(np.int64)
+    if rules["catch_up_cap"] is not None and totals.size:
+        totals = np.maximum(totals, totals.max() - int(rules["catch_up_cap"]))
+    return totals
+
+
+def write_scores(rows):
+    """
+    Set the score of (participant id, score) rows, BATCH_SIZE rows per
+    UPDATE ... FROM (VALUES ...) statement: the database joins the new
+    scores on the primary key instead of evaluating bulk_update's per-row
+    CASE expression.
+    """
+    connection = connections[router.db_for_write(LeagueParticipant)]
+    table = connection.ops.quote_name(LeagueParticipant._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start : start + BATCH_SIZE]
+            values = ", ".join(["(%s, %s)"] * len(batch))
+            # VALUES columns are named column1, column2... on both PostgreSQL
+            # and SQLite.
+            cursor.execute(
+                f"UPDATE {table} SET score = new.column2 "
+                f"FROM (VALUES {values}) AS new "
+                f"WHERE {table}.id = new.column1",
+                [value for row in batch for value in row],
+            )
+
+
+def score_league(league, through):
+    """Recompute the league's scores up to `through`; returns rows updated."""
+    participants, done = completion_matrix(league, through)
+    if not len(participants):
+        return 0
+    scores = score_matrix(done, league.scoring_rules)
+    changed = scores != participants[:, 2]
+    rows = list(zip(participants[changed, 0].tolist(), scores[changed].tolist()))
+    if rows:
+        with transaction.atomic():
+            write_scores(rows)
+            transaction.on_commit(lambda: live.publish(league.pk))
+    return len(rows)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import League, LeagueParticipant
+from .models import League, LeagueActivity, LeagueParticipant
+from .scoring import validate_rules
 from datetime import date
 
 
@@ -9,13 +10,22 @@ class LeaguesSerializer(serializers.ModelSerializer):
     class Meta:
         model = League
         fields = "__all__"
-        read_only_fields = ["created_by", "created_at", "status"]
+        read_only_fields = ["created_by", "created_at", "status", "participant_count"]
+
+    def validate_scoring_rules(self, value):
+        errors = validate_rules(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
 
     def validate(self, attrs):
         start_date = attrs.get("start_date")
         end_date = attrs.get("end_date")
 
-        if start_date and end_date and end_date <= start_date:
+        # Partial edits are checked against the league's other date.
+        first = start_date or getattr(self.instance, "start_date", None)
+        last = end_date or getattr(self.instance, "end_date", None)
+        if (start_date or end_date) and first and last and last <= first:
             raise serializers.ValidationError(
                 {"end_date": "End date must be after start date."}
             )
@@ -27,6 +37,15 @@ class LeaguesSerializer(serializers.ModelSerializer):
 
         return attrs
 
+    def update(self, instance, validated_data):
+        # Write only the submitted fields: participant_count and status are
+        # moved by concurrent joins and the lifecycle scheduler.
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if validated_data:
+            instance.save(update_fields=list(validated_data))
+        return instance
+
     def get_created_by_name(self, obj):
         first_name = obj.created_by.first_name or ""
         last_name = obj.created_by.last_name or ""
@@ -38,3 +57,11 @@ class LeagueParticipantSerializer(serializers.ModelSerializer):
     class Meta:
         model = LeagueParticipant
         fields = ["user", "score"]
+
+
+class LeagueActivitySerializer(serializers.ModelSerializer):
+    user_email = serializers.EmailField(source="user.email", read_only=True)
+
+    class Meta:
+        model = LeagueActivity
+        fields = ["id", "kind", "user", "user_email", "habit", "created_at"]
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by the lifecycle hook tasks, exactly once per league, with
+# `league=<League>`. Connect receivers for notifications and the like.
+league_started = Signal()
+league_ended = Signal()
@@ -0,0 +1,29 @@
+from core.queue import task
+from . import activity, scoring
+from .models import League
+from .signals import league_ended, league_started
+
+
+@task
+def record_completion(user_id, habit_id):
+    activity.record_completion(user_id, habit_id)
+
+
+@task
+def record_join(league_id, user_id):
+    activity.record_join(league_id, user_id)
+
+
+@task
+def start_league(league_id):
+    league = League.objects.get(pk=league_id)
+    league_started.send(sender=League, league=league)
+
+
+@task
+def end_league(league_id):
+    league = League.objects.get(pk=league_id)
+    # Final scores; score_leagues leaves ended leagues alone from now on.
+    if scoring.np is not None:
+        scoring.score_league(league, league.end_date)
+    league_ended.send(sender=League, league=league)
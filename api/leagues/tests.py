@@ -1,18 +1,34 @@
-from rest_framework.test import APITestCase, APIClient
+import asyncio
+
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework import status
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
-from habit.models import Habit
-from .models import League, LeagueParticipant
+from io import StringIO
+from unittest import mock, skipUnless
+from core.models import Task
+from core.testing import QueryBudgetAPIClient
+from habit.models import Habit, HabitLog
+from user.models import Plan, UserUsage
+from user.plans import plan_registry
+from . import activity, live, scoring
+from .signals import league_ended, league_started
+from .models import League, LeagueActivity, LeagueParticipant
+from .serializers import LeaguesSerializer
+from .views import LeagueActivityPagination
 
 User = get_user_model()
 
 
 class LeagueViewsTests(APITestCase):
     def setUp(self):
-        self.client = APIClient()
+        self.client = QueryBudgetAPIClient()
 
         # Users
         self.user = User.objects.create_user(
@@ -113,6 +129,17 @@ class LeagueViewsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(self.league.participants.filter(id=self.other_user.id).exists())
 
+    def test_edits_do_not_overwrite_participant_count(self):
+        stale = League.objects.get(pk=self.league.pk)
+        League.objects.filter(pk=self.league.pk).update(participant_count=5)
+        serializer = LeaguesSerializer(stale, data={"title": "Renamed"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.league.refresh_from_db()
+        self.assertEqual(
+            (self.league.title, self.league.participant_count), ("Renamed", 5)
+        )
+
     def test_user_cannot_join_twice(self):
         self.client.force_authenticate(user=self.other_user)
         url = reverse("league-enter", args=[self.league.id])
@@ -120,6 +147,36 @@ class LeagueViewsTests(APITestCase):
         response = self.client.patch(url, {}, format="json")  # second join
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_join_respects_plan_league_quota(self):
+        # other_user is on the Free plan, which allows one league
+        second = League.objects.create(
+            created_by=self.user,
+            title="Second League",
+            habit=self.habit,
+            start_date=self.start_date,
+            end_date=self.end_date,
+        )
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.patch(
+            reverse("league-enter", args=[self.league.id]), {}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(UserUsage.objects.get(user=self.other_user).leagues_joined, 1)
+
+        response = self.client.patch(
+            reverse("league-enter", args=[second.id]), {}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(second.participants.filter(id=self.other_user.id).exists())
+        self.assertEqual(UserUsage.objects.get(user=self.other_user).leagues_joined, 1)
+
+    def test_delete_league_releases_quota(self):
+        self.league.participants.add(self.other_user)
+        UserUsage.objects.filter(user=self.other_user).update(leagues_joined=1)
+        response = self.client.delete(reverse("league-edit", args=[self.league.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(UserUsage.objects.get(user=self.other_user).leagues_joined, 0)
+
     # ---------------- LeagueLeaderboardView ----------------
     def test_league_leaderboard(self):
         LeagueParticipant.objects.create(league=self.league, user=self.user, score=50)
@@ -133,3 +190,555 @@ class LeagueViewsTests(APITestCase):
         self.assertEqual(len(response.data), 2)
         # Highest score should be first
         self.assertEqual(response.data[0]["user"], self.other_user.id)
+
+
+class LeagueActivityTests(APITestCase):
+    def setUp(self):
+        self.client = QueryBudgetAPIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="pass1234"
+        )
+        self.other_user = User.objects.create_user(
+            email="other@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(name="Daily Pushups")
+        today = timezone.now().date()
+        self.league = League.objects.create(
+            created_by=self.user,
+            title="Champions League",
+            habit=self.habit,
+            start_date=today,
+            end_date=today + timedelta(days=7),
+            status=League.ACTIVE,
+        )
+        self.url = reverse("league-activity", args=[self.league.id])
+
+    def join(self, league, user):
+        LeagueParticipant.objects.create(league=league, user=user)
+        League.objects.filter(pk=league.pk).update(
+            participant_count=league.leaderboard.count()
+        )
+        league.refresh_from_db()
+
+    def test_join_is_recorded_by_worker(self):
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.patch(
+            reverse("league-enter", args=[self.league.id]), {}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.league.refresh_from_db()
+        self.assertEqual(self.league.participant_count, 1)
+
+        call_command("run_worker", "--once", "--threads=1", stdout=StringIO())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(a["kind"], a["user"]) for a in response.data["results"]],
+            [(LeagueActivity.JOINED, self.other_user.id)],
+        )
+
+    def test_completion_fans_out_to_members_leagues(self):
+        other_habit = Habit.objects.create(name="Reading")
+        self.join(self.league, self.user)
+        activity.record_completion(self.user.id, self.habit.id)
+        activity.record_completion(self.user.id, other_habit.id)
+        activity.record_completion(self.other_user.id, self.habit.id)
+
+        feed = list(activity.league_feed(self.league))
+        self.assertEqual(len(feed), 1)
+        self.assertEqual(feed[0].user_id, self.user.id)
+        self.assertEqual(feed[0].kind, LeagueActivity.COMPLETED)
+
+    @override_settings(LEAGUE_FEED_CAP=2)
+    def test_timeline_is_trimmed_to_cap(self):
+        self.join(self.league, self.user)
+        for _ in range(4):
+            activity.record_completion(self.user.id, self.habit.id)
+        rows = LeagueActivity.objects.filter(league=self.league)
+        self.assertEqual(rows.count(), 2)
+
+    @override_settings(LEAGUE_FEED_FANOUT_LIMIT=1)
+    def test_large_league_merges_member_activity_on_read(self):
+        self.join(self.league, self.user)
+        self.join(self.league, self.other_user)
+        activity.record_completion(self.user.id, self.habit.id)
+
+        self.assertFalse(LeagueActivity.objects.filter(league=self.league).exists())
+        self.assertEqual(LeagueActivity.objects.filter(league=None).count(), 1)
+        feed = list(activity.league_feed(self.league))
+        self.assertEqual([entry.user_id for entry in feed], [self.user.id])
+
+    def test_feed_is_cursor_paginated(self):
+        self.join(self.league, self.user)
+        for _ in range(3):
+            activity.record_completion(self.user.id, self.habit.id)
+        with mock.patch.object(LeagueActivityPagination, "page_size", 2):
+            first = self.client.get(self.url)
+            second = self.client.get(first.data["next"])
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertEqual(len(second.data["results"]), 1)
+        ids = [a["id"] for a in first.data["results"] + second.data["results"]]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+
+@override_settings(LEAGUE_LIVE_INTERVAL=0)
+class LiveLeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="live@example.com", password="x")
+        self.other_user = User.objects.create_user(
+            email="rival@example.com", password="x"
+        )
+        today = timezone.now().date()
+        self.league = League.objects.create(
+            created_by=self.user,
+            title="Live League",
+            habit=Habit.objects.create(name="Run"),
+            start_date=today,
+            end_date=today + timedelta(days=7),
+        )
+        self.first = LeagueParticipant.objects.create(
+            league=self.league, user=self.user, score=5
+        )
+        self.second = LeagueParticipant.objects.create(
+            league=self.league, user=self.other_user, score=3
+        )
+
+    async def next_event(self, queue):
+        return await asyncio.wait_for(queue.get(), 1)
+
+    def test_deltas(self):
+        before = live.ranks([(1, 5), (2, 3), (3, 1)])
+        after = live.ranks([(2, 9), (1, 5), (4, 0)])
+        changed, removed = live.deltas(before, after)
+        self.assertEqual(
+            changed,
+            [
+                {"user": 2, "rank": 1, "score": 9},
+                {"user": 1, "rank": 2, "score": 5},
+                {"user": 4, "rank": 3, "score": 0},
+            ],
+        )
+        self.assertEqual(removed, [3])
+
+    async def test_watchers_share_one_read_per_change(self):
+        reads = []
+        fetch = live.Channel.fetch
+
+        async def counting_fetch(channel):
+            reads.append(channel.league_id)
+            return await fetch(channel)
+
+        with mock.patch.object(live.Channel, "fetch", counting_fetch):
+            async with live.hub.watch(self.league.id) as first, live.hub.watch(
+                self.league.id
+            ) as second:
+                for queue in (first, second):
+                    kind, data = await self.next_event(queue)
+                    self.assertEqual(kind, "snapshot")
+                    self.assertEqual(
+                        [entry["user"] for entry in data["entries"]],
+                        [self.user.id, self.other_user.id],
+                    )
+
+                await LeagueParticipant.objects.filter(pk=self.second.pk).aupdate(
+                    score=8
+                )
+                for _ in range(3):
+                    live.publish(self.league.id)
+
+                for queue in (first, second):
+                    kind, data = await self.next_event(queue)
+                    self.assertEqual(kind, "update")
+                    self.assertEqual(
+                        data["changes"],
+                        [
+                            {"user": self.other_user.id, "rank": 1, "score": 8},
+                            {"user": self.user.id, "rank": 2, "score": 5},
+                        ],
+                    )
+                    self.assertTrue(queue.empty())
+        self.assertEqual(len(reads), 2)
+        self.assertNotIn(self.league.id, live.hub.channels)
+
+    async def test_late_watcher_gets_current_snapshot(self):
+        async with live.hub.watch(self.league.id) as first:
+            await self.next_event(first)
+            async with live.hub.watch(self.league.id) as second:
+                kind, data = await self.next_event(second)
+        self.assertEqual(kind, "snapshot")
+        self.assertEqual(len(data["entries"]), 2)
+
+    async def test_stream_view(self):
+        url = reverse("async-league-leaderboard-stream", args=[self.league.id])
+        headers = {"authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+        self.assertTrue((await anext(events)).startswith(b"event: snapshot\ndata: {"))
+        # What Django does once the response ends or the client disconnects.
+        await events.aclose()
+        response.close()
+        await asyncio.sleep(0)
+        self.assertNotIn(self.league.id, live.hub.channels)
+
+        response = await self.async_client.get(
+            reverse("async-league-leaderboard-stream", args=[999]), headers=headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_stream_ticket(self):
+        url = reverse("async-league-leaderboard-stream", args=[self.league.id])
+        ticket = live.stream_ticket(self.user.id, self.league.id)
+        response = await self.async_client.get(url, {"ticket": ticket})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        events = aiter(response.streaming_content)
+        self.assertTrue((await anext(events)).startswith(b"event: snapshot"))
+        await events.aclose()
+        response.close()
+
+        other_league = live.stream_ticket(self.user.id, self.league.id + 1)
+        for bad in (other_league, ticket + "x"):
+            response = await self.async_client.get(url, {"ticket": bad})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        with mock.patch.object(live, "TICKET_SECONDS", -1):
+            response = await self.async_client.get(url, {"ticket": ticket})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_ticket_view(self):
+        client = QueryBudgetAPIClient()
+        url = reverse("league-stream-ticket", args=[self.league.id])
+        self.assertEqual(client.post(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        client.force_authenticate(user=self.user)
+        response = client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            live.ticket_user(response.data["ticket"], self.league.id), self.user.id
+        )
+        response = client.post(reverse("league-stream-ticket", args=[999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_dead_listener_is_restarted(self):
+        class Backend:
+            listens = 0
+
+            def listen(self, hub):
+                self.listens += 1
+                return asyncio.get_running_loop().create_task(asyncio.sleep(0))
+
+        hub = live.Hub(Backend())
+        async with hub.watch(self.league.id) as queue:
+            await self.next_event(queue)
+            await hub.listener
+            async with hub.watch(self.league.id):
+                self.assertEqual(hub.backend.listens, 2)
+                # Notifications may have been missed: the board is re-read.
+                self.assertTrue(hub.channels[self.league.id].dirty.is_set())
+
+
+@skipUnless(scoring.np, "numpy is not installed")
+class LeagueScoringTests(APITestCase):
+    def setUp(self):
+        self.client = QueryBudgetAPIClient()
+        self.user = User.objects.create_user(email="score@example.com", password="x")
+        self.other_user = User.objects.create_user(
+            email="trailer@example.com", password="x"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(name="Swim")
+        self.today = timezone.localdate()
+        self.league = League.objects.create(
+            created_by=self.user,
+            title="Scored League",
+            habit=self.habit,
+            start_date=self.today - timedelta(days=6),
+            end_date=self.today + timedelta(days=1),
+            status=League.ACTIVE,
+        )
+        for user in (self.user, self.other_user):
+            LeagueParticipant.objects.create(league=self.league, user=user)
+
+    def log(self, user, day, habit=None):
+        log = HabitLog.objects.create(
+            user=user, habit=habit or self.habit, completed=True
+        )
+        HabitLog.objects.filter(pk=log.pk).update(date=day)
+
+    def matrix(self, *rows):
+        return scoring.np.array(rows, dtype=bool)
+
+    def test_streaks(self):
+        done = self.matrix([1, 1, 0, 1, 1, 1], [0, 1, 1, 0, 0, 1])
+        self.assertEqual(
+            scoring.streaks(done).tolist(), [[1, 2, 0, 1, 2, 3], [0, 1, 2, 0, 0, 1]]
+        )
+
+    def test_rules(self):
+        done = self.matrix([1] * 14, [1, 1, 1] + [0] * 11)
+        cases = [
+            ({}, [14, 3]),
+            ({"per_completion": 2}, [28, 6]),
+            ({"streak_length": 3, "streak_bonus": 1}, [26, 4]),
+            ({"perfect_week_multiplier": 2}, [28, 3]),
+            ({"perfect_week_multiplier": 1.5, "per_completion": 3}, [63, 9]),
+            ({"catch_up_cap": 5}, [14, 9]),
+        ]
+        for rules, expected in cases:
+            with self.subTest(rules):
+                self.assertEqual(scoring.score_matrix(done, rules).tolist(), expected)
+
+    def test_command_scores_running_leagues(self):
+        self.league.scoring_rules = {"perfect_week_multiplier": 2}
+        self.league.save()
+        for offset in range(7):
+            self.log(self.user, self.league.start_date + timedelta(days=offset))
+        self.log(self.other_user, self.today - timedelta(days=30))
+        self.log(self.other_user, self.today)
+        self.log(self.other_user, self.today, habit=Habit.objects.create(name="Yoga"))
+
+        out = StringIO()
+        call_command("score_leagues", stdout=out)
+        self.assertIn("updating 2 participants", out.getvalue())
+        scores = dict(self.league.leaderboard.values_list("user_id", "score"))
+        self.assertEqual(scores, {self.user.id: 14, self.other_user.id: 1})
+
+        out = StringIO()
+        call_command("score_leagues", f"--league={self.league.id}", stdout=out)
+        self.assertIn("updating 0 participants", out.getvalue())
+
+    def test_scores_are_written_in_batches(self):
+        self.log(self.user, self.today)
+        self.log(self.other_user, self.today)
+        with mock.patch.object(scoring, "BATCH_SIZE", 1):
+            self.assertEqual(scoring.score_league(self.league, self.today), 2)
+        scores = self.league.leaderboard.values_list("score", flat=True)
+        self.assertEqual(list(scores), [1, 1])
+
+    def test_rules_are_bounded(self):
+        self.assertEqual(
+            scoring.validate_rules(
+                {
+                    "per_completion": 1e300,
+                    "streak_bonus": float("nan"),
+                    "catch_up_cap": 2**31,
+                }
+            ),
+            [
+                "'per_completion' cannot exceed 1000.",
+                "'streak_bonus' must be finite.",
+                f"'catch_up_cap' cannot exceed {2**31 - 1}.",
+            ],
+        )
+        self.assertEqual(scoring.validate_rules(scoring.MAX_RULES), [])
+
+    def test_rules_are_validated(self):
+        url = reverse("league-edit", args=[self.league.id])
+        response = self.client.patch(
+            url, {"scoring_rules": {"bonus": 1, "streak_bonus": -1}}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data["scoring_rules"]), 2)
+
+        response = self.client.patch(
+            url,
+            {"scoring_rules": {"streak_length": 3, "streak_bonus": 2}},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.league.refresh_from_db()
+        self.assertEqual(self.league.scoring_rules["streak_bonus"], 2)
+
+
+class LeagueLifecycleTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="cycle@example.com", password="x")
+        self.habit = Habit.objects.create(name="Walk")
+        self.today = timezone.localdate()
+
+    def league(self, start, end, status=League.UPCOMING):
+        league = League.objects.create(
+            created_by=self.user,
+            title="Cycle League",
+            habit=self.habit,
+            start_date=self.today + timedelta(days=start),
+            end_date=self.today + timedelta(days=end),
+            status=status,
+        )
+        LeagueParticipant.objects.create(league=league, user=self.user)
+        return league
+
+    def advance(self, *args):
+        out = StringIO()
+        call_command("advance_leagues", *args, stdout=out)
+        return out.getvalue()
+
+    def run_worker(self):
+        call_command("run_worker", "--once", "--threads=1", stdout=StringIO())
+
+    def statuses(self, *leagues):
+        return [League.objects.get(pk=league.pk).status for league in leagues]
+
+    def test_transitions_are_applied_once(self):
+        starting = self.league(0, 7)
+        future = self.league(3, 7)
+        ending = self.league(-7, -1, status=League.ACTIVE)
+        missed = self.league(-7, -1)
+
+        self.assertIn("Started 2 leagues and ended 2", self.advance())
+        self.assertEqual(
+            self.statuses(starting, future, ending, missed),
+            [League.ACTIVE, League.UPCOMING, League.ENDED, League.ENDED],
+        )
+        self.assertIn("Started 0 leagues and ended 0", self.advance())
+        hooks = sorted(Task.objects.values_list("name", "args"))
+        self.assertEqual(
+            hooks,
+            [
+                ("leagues.tasks.end_league", [ending.id]),
+                ("leagues.tasks.end_league", [missed.id]),
+                ("leagues.tasks.start_league", [starting.id]),
+                ("leagues.tasks.start_league", [missed.id]),
+            ],
+        )
+
+        later = (self.today + timedelta(days=3)).isoformat()
+        self.assertIn("Started 1 leagues", self.advance(f"--date={later}"))
+        self.assertEqual(self.statuses(future), [League.ACTIVE])
+
+    def test_leagues_starting_today_are_created_active(self):
+        plan = Plan.objects.create(
+            name="Pro", price_monthly=5, price_annually=50, features="", max_leagues=5
+        )
+        self.addCleanup(plan_registry.invalidate)
+        self.user.plan = plan
+        self.user.save()
+        client = QueryBudgetAPIClient()
+        client.force_authenticate(user=self.user)
+
+        statuses = {}
+        for days in (0, 1):
+            response = client.post(
+                reverse("league-create"),
+                {
+                    "title": f"Starts in {days}",
+                    "habit": self.habit.id,
+                    "start_date": self.today + timedelta(days=days),
+                    "end_date": self.today + timedelta(days=7),
+                },
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            statuses[days] = (response.data["status"], response.data["id"])
+
+        self.assertEqual(statuses[0][0], League.ACTIVE)
+        self.assertEqual(statuses[1][0], League.UPCOMING)
+        self.assertEqual(
+            list(Task.objects.values_list("name", "args")),
+            [("leagues.tasks.start_league", [statuses[0][1]])],
+        )
+        self.assertIn("Started 0 leagues", self.advance())
+
+    def test_edits_do_not_revert_status(self):
+        league = self.league(0, 7)
+        stale = League.objects.get(pk=league.pk)
+        self.advance()
+        serializer = LeaguesSerializer(stale, data={"title": "Renamed"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(self.statuses(league), [League.ACTIVE])
+
+    def test_date_edits_recompute_status(self):
+        upcoming = self.league(3, 7)
+        active = self.league(0, 7, status=League.ACTIVE)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.patch(
+            reverse("league-edit", args=[upcoming.pk]),
+            {"start_date": self.today},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], League.ACTIVE)
+        self.assertEqual(
+            list(Task.objects.values_list("name", "args")),
+            [("leagues.tasks.start_league", [upcoming.pk])],
+        )
+
+        response = self.client.patch(
+            reverse("league-edit", args=[active.pk]),
+            {"start_date": self.today + timedelta(days=2)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.statuses(active), [League.ACTIVE])
+
+    def test_partial_date_edits_keep_end_after_start(self):
+        league = self.league(3, 7)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(
+            reverse("league-edit", args=[league.pk]),
+            {"end_date": self.today + timedelta(days=2)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("end_date", response.data)
+
+    def test_ending_releases_joined_slots(self):
+        ending = self.league(-7, -1, status=League.ACTIVE)
+        self.league(-7, 7, status=League.ACTIVE)
+        UserUsage.objects.filter(user=self.user).update(leagues_joined=2)
+        self.advance()
+        self.advance()
+        self.assertEqual(UserUsage.objects.get(user=self.user).leagues_joined, 1)
+
+        # Deleting the ended league doesn't release its slot twice.
+        self.client.force_authenticate(user=self.user)
+        response = self.client.delete(reverse("league-edit", args=[ending.pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(UserUsage.objects.get(user=self.user).leagues_joined, 1)
+
+    def test_hooks_send_signals(self):
+        league = self.league(-7, -1)
+        received = []
+
+        def receiver(signal, league, **kwargs):
+            received.append((signal, league.pk))
+
+        league_started.connect(receiver)
+        league_ended.connect(receiver)
+        self.addCleanup(league_started.disconnect, receiver)
+        self.addCleanup(league_ended.disconnect, receiver)
+
+        self.advance()
+        self.run_worker()
+        self.assertCountEqual(
+            received, [(league_started, league.pk), (league_ended, league.pk)]
+        )
+
+    @skipUnless(scoring.np, "numpy is not installed")
+    def test_end_hook_freezes_final_scores(self):
+        league = self.league(-3, -1, status=League.ACTIVE)
+        log = HabitLog.objects.create(user=self.user, habit=self.habit, completed=True)
+        HabitLog.objects.filter(pk=log.pk).update(date=league.end_date)
+
+        self.advance()
+        self.run_worker()
+        participant = league.leaderboard.get()
+        self.assertEqual(participant.score, 1)
+
+        LeagueParticipant.objects.filter(pk=participant.pk).update(score=50)
+        call_command("score_leagues", f"--league={league.id}", stdout=StringIO())
+        participant.refresh_from_db()
+        self.assertEqual(participant.score, 50)
+
+    def test_feed_skips_leagues_that_are_not_active(self):
+        for status in (League.UPCOMING, League.ENDED):
+            self.league(0, 7, status=status)
+        active = self.league(0, 7, status=League.ACTIVE)
+        activity.record_completion(self.user.id, self.habit.id)
+        self.assertEqual(
+            list(LeagueActivity.objects.values_list("league_id", flat=True)),
+            [active.id],
+        )
@@ -17,4 +17,26 @@ urlpatterns = [
         views.LeagueLeaderboardView.as_view(),
         name="league_leaderboard",
     ),
+    path(
+        "leaderboards/<int:league_id>/stream/ticket/",
+        views.LeagueStreamTicketView.as_view(),
+        name="league-stream-ticket",
+    ),
+    path(
+        "<int:league_id>/activity/",
+        views.LeagueActivityView.as_view(),
+        name="league-activity",
+    ),
 ]
+
+# Maximum queries per request, enforced in tests by QueryBudgetAPIClient.
+query_budgets = {
+    "league-list": 2,
+    "league-create": 9,
+    "league-detail": 2,
+    "league-edit": 11,
+    "league-enter": 13,
+    "league_leaderboard": 1,
+    "league-stream-ticket": 1,
+    "league-activity": 2,
+}
@@ -1,12 +1,29 @@
 from rest_framework import generics, permissions
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import F
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from . import live
+from .activity import league_feed
+from .lifecycle import initial_status, queue_start, release_slots
 from .models import League, LeagueParticipant
-from .serializers import LeaguesSerializer, LeagueParticipantSerializer
+from .serializers import (
+    LeagueActivitySerializer,
+    LeaguesSerializer,
+    LeagueParticipantSerializer,
+)
+from .tasks import record_join
 from core.permissions import IsOwner
+from core.readonly import ValuesListMixin
+from core.response_cache import AnonymousResponseCacheMixin
+from user.models import UserUsage
+from user.plans import plan_registry
 
 
-class LeagueListView(generics.ListAPIView):
+class LeagueListView(AnonymousResponseCacheMixin, generics.ListAPIView):
     """
     List all leagues.
     - If permission_classes = AllowAny → anyone can view all leagues.
@@ -14,9 +31,12 @@ class LeagueListView(generics.ListAPIView):
       users to see only their own leagues.
     """
 
-    queryset = League.objects.all()
+    queryset = League.objects.select_related("created_by").prefetch_related(
+        "participants"
+    )
     serializer_class = LeaguesSerializer
     permission_classes = [permissions.AllowAny]
+    cache_namespace = "leagues"
 
 
 class LeagueCreateView(generics.CreateAPIView):
@@ -32,19 +52,34 @@ class LeagueCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         user = self.request.user
-        if user.plan and user.plan.name.lower() == "free":
+        plan = plan_registry.get(user.plan_id)
+        if plan and plan.name.lower() == "free":
             raise PermissionDenied(
                 "Free plan users cannot create leagues. Upgrade your plan."
             )
-        serializer.save(created_by=user)
+
+        with transaction.atomic():
+            max_leagues = plan.max_leagues if plan else None
+            if not UserUsage.objects.increment(user.id, "leagues_created", max_leagues):
+                raise PermissionDenied(
+                    f"You can only create {max_leagues} leagues with your current plan."
+                )
+            status = initial_status(
+                serializer.validated_data["start_date"], timezone.localdate()
+            )
+            league = serializer.save(created_by=user, status=status)
+            queue_start(league)
 
 
-class LeagueDetailsView(generics.RetrieveAPIView):
+class LeagueDetailsView(AnonymousResponseCacheMixin, generics.RetrieveAPIView):
     """Retrieve details of a single league."""
 
-    queryset = League.objects.all()
+    queryset = League.objects.select_related("created_by").prefetch_related(
+        "participants"
+    )
     serializer_class = LeaguesSerializer
     permission_classes = [permissions.AllowAny]
+    cache_namespace = "leagues"
 
 
 class LeagueRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -60,6 +95,37 @@ class LeagueRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return League.objects.filter(created_by=self.request.user)
 
+    def perform_update(self, serializer):
+        dates = [
+            field
+            for field in ("start_date", "end_date")
+            if field in serializer.validated_data
+        ]
+        if not dates:
+            serializer.save()
+            return
+        with transaction.atomic():
+            # The scheduler may have started the league since it was read.
+            league = League.objects.select_for_update().get(pk=serializer.instance.pk)
+            if league.status != League.UPCOMING:
+                raise ValidationError(
+                    {
+                        field: "Dates cannot change once a league has started."
+                        for field in dates
+                    }
+                )
+            start_date = serializer.validated_data.get("start_date", league.start_date)
+            status = initial_status(start_date, timezone.localdate())
+            queue_start(serializer.save(status=status))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        UserUsage.objects.decrement([instance.created_by_id], "leagues_created")
+        # An ended league already released its participants' slots.
+        if instance.status != League.ENDED:
+            release_slots(instance.pk)
+        instance.delete()
+
 
 class LeagueEnterView(generics.RetrieveUpdateAPIView):
     serializer_class = LeaguesSerializer
@@ -71,17 +137,27 @@ class LeagueEnterView(generics.RetrieveUpdateAPIView):
 
     def perform_update(self, serializer):
         user = self.request.user
-        league = self.get_object()
-
-        if league.participants.filter(id=user.id).exists():
-            raise ValidationError("You have already joined this league.")
-
-        league.participants.add(user)
-
-        serializer.save()
+        max_leagues = plan_registry.max_leagues(user.plan_id)
+        with transaction.atomic():
+            # Joins of one league queue up on its row, so the membership
+            # check and participant_count cannot race.
+            league = League.objects.select_for_update().get(pk=serializer.instance.pk)
+            if league.participants.filter(id=user.id).exists():
+                raise ValidationError("You have already joined this league.")
+
+            if not UserUsage.objects.increment(user.id, "leagues_joined", max_leagues):
+                raise PermissionDenied(
+                    f"You can only join {max_leagues} leagues with your current plan."
+                )
+            league.participants.add(user)
+            serializer.save()
+            League.objects.filter(pk=league.pk).update(
+                participant_count=F("participant_count") + 1
+            )
+            record_join.delay(league.pk, user.id)
 
 
-class LeagueLeaderboardView(generics.ListAPIView):
+class LeagueLeaderboardView(ValuesListMixin, generics.ListAPIView):
     """List users ranked in a specific league."""
 
     serializer_class = LeagueParticipantSerializer
@@ -90,3 +166,40 @@ class LeagueLeaderboardView(generics.ListAPIView):
     def get_queryset(self):
         league_id = self.kwargs["league_id"]
         return LeagueParticipant.objects.filter(league_id=league_id).order_by("-score")
+
+
+class LeagueStreamTicketView(generics.GenericAPIView):
+    """
+    Issue a ticket for the live leaderboard stream, for clients such as the
+    browser's EventSource that cannot send an Authorization header. It is
+    only valid for this league and for live.TICKET_SECONDS.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        league_id = self.kwargs["league_id"]
+        if not League.objects.filter(pk=league_id).exists():
+            raise NotFound()
+        return Response(
+            {
+                "ticket": live.stream_ticket(request.user.pk, league_id),
+                "expires_in": live.TICKET_SECONDS,
+            }
+        )
+
+
+class LeagueActivityPagination(CursorPagination):
+    ordering = "-id"
+    page_size = 50
+
+
+class LeagueActivityView(generics.ListAPIView):
+    """Recent completions and joins in a league, newest first."""
+
+    serializer_class = LeagueActivitySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LeagueActivityPagination
+
+    def get_queryset(self):
+        return league_feed(get_object_or_404(League, pk=self.kwargs["league_id"]))
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from core.changelists import EstimatedCountPaginator
 from .models import CustomUser, Plan
 
 
@@ -7,7 +8,12 @@ class CustomUserAdmin(UserAdmin):
     model = CustomUser
     list_display = ("email", "first_name", "last_name", "plan", "is_staff", "is_active")
     list_filter = ("is_staff", "is_active", "plan")
-    search_fields = ("email", "first_name", "last_name")
+    list_select_related = ("plan",)
+    # Exact, case-insensitive and backed by user_email_upper_idx; substring
+    # search over millions of users is a sequential scan.
+    search_fields = ("=email",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {"fields": ("email", "password", "plan")}),
@@ -0,0 +1,24 @@
+from asgiref.sync import sync_to_async
+
+from core.async_views import AsyncReadView
+from .models import UserScore
+from .serializers import UserScoreSerializer, UserSerializer
+
+
+class AsyncCurrentUserView(AsyncReadView):
+    """Retrieve the currently authenticated user."""
+
+    async def get(self, request, *args, **kwargs):
+        # Habits and the plan payload may need the ORM, so serialize in a thread.
+        data = await sync_to_async(lambda: UserSerializer(request.user).data)()
+        return self.render(data)
+
+
+class AsyncGlobalLeaderboardView(AsyncReadView):
+    """List users ranked globally by score."""
+
+    authentication_required = False
+
+    async def get(self, request, *args, **kwargs):
+        scores = [score async for score in UserScore.objects.order_by("-score")]
+        return self.render(UserScoreSerializer(scores, many=True).data)
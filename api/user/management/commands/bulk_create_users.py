@@ -0,0 +1,107 @@
+import csv
+from itertools import islice
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from user.models import CustomUser, UserProgress, UserScore, UserUsage
+from user.plans import plan_registry
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Provision users from a CSV file with batched inserts. "
+        "Columns: email (required), first_name, last_name, plan, "
+        "password_hash (already hashed) or password (hashed here, slow). "
+        "Rows without a password get an unusable one and must reset it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        default_plan = plan_registry.default()
+
+        created = skipped = 0
+        with open(options["csv_path"], newline="", encoding="utf-8") as fh:
+            reader = csv.DictReader(fh)
+            if "email" not in (reader.fieldnames or []):
+                raise CommandError("CSV must have an 'email' column.")
+
+            for rows in batched(reader, batch_size):
+                users = [self.build_user(row, default_plan) for row in rows]
+                n_created = self.insert_batch(users)
+                created += n_created
+                skipped += len(users) - n_created
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {created} users, skipped {skipped}.")
+        )
+
+    def build_user(self, row, default_plan):
+        email = CustomUser.objects.normalize_email((row.get("email") or "").strip())
+        if not email:
+            raise CommandError(f"Missing email in row: {row}")
+
+        plan = default_plan
+        plan_name = (row.get("plan") or "").strip()
+        if plan_name:
+            plan = plan_registry.get_by_name(plan_name)
+            if plan is None:
+                raise CommandError(f"Unknown plan '{plan_name}' for {email}.")
+
+        password_hash = (row.get("password_hash") or "").strip()
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                raise CommandError(f"Unrecognised password hash for {email}.")
+        elif row.get("password"):
+            password_hash = make_password(row["password"])
+        else:
+            password_hash = make_password(None)
+
+        return CustomUser(
+            email=email,
+            first_name=(row.get("first_name") or "").strip(),
+            last_name=(row.get("last_name") or "").strip(),
+            plan=plan,
+            password=password_hash,
+        )
+
+    @transaction.atomic
+    def insert_batch(self, users):
+        existing = set(
+            CustomUser.objects.filter(
+                email__in=[user.email for user in users]
+            ).values_list("email", flat=True)
+        )
+        seen = set()
+        new_users = []
+        for user in users:
+            if user.email in existing or user.email in seen:
+                continue
+            seen.add(user.email)
+            new_users.append(user)
+
+        # bulk_create skips signals, so the progress, usage and score rows the
+        # post_save handlers would add are inserted here in bulk as well.
+        new_users = CustomUser.objects.bulk_create(new_users)
+        UserProgress.objects.bulk_create(
+            [UserProgress(user=user) for user in new_users]
+        )
+        UserUsage.objects.bulk_create([UserUsage(user=user) for user in new_users])
+        UserScore.objects.bulk_create([UserScore(user=user) for user in new_users])
+        return len(new_users)
@@ -0,0 +1,86 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.core.management.base import BaseCommand
+
+from leagues.models import League, LeagueParticipant
+from user.models import CustomUser, UserUsage
+
+
+def count_of(rows, field):
+    """Correlated COUNT(*) of the `rows` whose `field` points at the outer user."""
+    counted = (
+        rows.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(n=Count("*"))
+        .values("n")
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute plan usage counters from the source tables in chunks and "
+        "correct any drift. Meant to run periodically."
+    )
+
+    fields = ("leagues_joined", "leagues_created", "habits_subscribed")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        actual_counts = CustomUser.objects.annotate(
+            # Ended leagues release their participants' slots.
+            actual_leagues_joined=count_of(
+                LeagueParticipant.objects.exclude(league__status=League.ENDED), "user"
+            ),
+            actual_leagues_created=count_of(League.objects.all(), "created_by"),
+            actual_habits_subscribed=count_of(
+                CustomUser.habits.through.objects.all(), "customuser"
+            ),
+        ).order_by("pk")
+
+        fixed = created = 0
+        last_pk = 0
+        while True:
+            users = list(
+                actual_counts.filter(pk__gt=last_pk).values(
+                    "pk", *(f"actual_{field}" for field in self.fields)
+                )[:batch_size]
+            )
+            if not users:
+                break
+            last_pk = users[-1]["pk"]
+
+            usages = UserUsage.objects.in_bulk(
+                [row["pk"] for row in users], field_name="user_id"
+            )
+            to_update, to_create = [], []
+            for row in users:
+                usage = usages.get(row["pk"])
+                if usage is None:
+                    to_create.append(
+                        UserUsage(
+                            user_id=row["pk"],
+                            **{field: row[f"actual_{field}"] for field in self.fields},
+                        )
+                    )
+                    continue
+                drifted = False
+                for field in self.fields:
+                    if getattr(usage, field) != row[f"actual_{field}"]:
+                        setattr(usage, field, row[f"actual_{field}"])
+                        drifted = True
+                if drifted:
+                    to_update.append(usage)
+
+            UserUsage.objects.bulk_create(to_create)
+            UserUsage.objects.bulk_update(to_update, self.fields)
+            created += len(to_create)
+            fixed += len(to_update)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {created} usage rows, corrected {fixed}.")
+        )
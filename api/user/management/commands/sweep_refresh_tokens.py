@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from user.tokens import get_token_store
+
+
+class Command(BaseCommand):
+    help = "Delete expired opaque refresh tokens in chunks. Run periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        removed = get_token_store().sweep(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired tokens."))
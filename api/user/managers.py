@@ -1,4 +1,6 @@
 from django.contrib.auth.models import BaseUserManager
+from django.db import models
+from django.db.models import F
 
 
 class CustomUserManager(BaseUserManager):
@@ -21,3 +23,31 @@ class CustomUserManager(BaseUserManager):
             raise ValueError("Superuser must have is_superuser=True.")
 
         return self.create_user(email, password, **extra_fields)
+
+
+class UserUsageManager(models.Manager):
+    def increment(self, user_id, field, limit=None):
+        """
+        Atomically add one to a usage counter unless it already reached
+        `limit`. Returns False when the quota is exhausted.
+        """
+        qs = self.filter(user_id=user_id)
+        if limit is not None:
+            qs = qs.filter(**{f"{field}__lt": limit})
+        if qs.update(**{field: F(field) + 1}):
+            return True
+        # Users created before the counters existed get their row lazily;
+        # reconcile_usage fills in the real values.
+        if self.filter(user_id=user_id).exists():
+            return False
+        self.get_or_create(user_id=user_id)
+        return qs.update(**{field: F(field) + 1}) == 1
+
+    def decrement(self, user_ids, field):
+        self.filter(user_id__in=user_ids, **{f"{field}__gt": 0}).update(
+            **{field: F(field) - 1}
+        )
+
+    def set_value(self, user_id, field, value):
+        if not self.filter(user_id=user_id).update(**{field: value}):
+            self.create(user_id=user_id, **{field: value})
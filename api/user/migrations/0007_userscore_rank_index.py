@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0006_email_upper_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userscore",
+            index=models.Index(fields=["-score"], name="userscore_rank_idx"),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:40
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(rows, field):
+    counted = (
+        rows.filter(**{field: OuterRef("user_id")})
+        .order_by()
+        .values(field)
+        .annotate(n=Count("*"))
+        .values("n")
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def backfill_usage(apps, schema_editor):
+    # 0005 created the table empty: give every user a row with their real
+    # counts so quotas hold from the first request.
+    CustomUser = apps.get_model("user", "CustomUser")
+    UserUsage = apps.get_model("user", "UserUsage")
+    League = apps.get_model("leagues", "League")
+    LeagueParticipant = apps.get_model("leagues", "LeagueParticipant")
+
+    missing = CustomUser.objects.filter(usage__isnull=True).values_list("pk", flat=True)
+    UserUsage.objects.bulk_create(
+        (UserUsage(user_id=pk) for pk in missing.iterator()), batch_size=2000
+    )
+    UserUsage.objects.update(
+        # Ended leagues don't count against the quota.
+        leagues_joined=count_of(
+            LeagueParticipant.objects.exclude(league__status="ended"), "user"
+        ),
+        leagues_created=count_of(League.objects.all(), "created_by"),
+        habits_subscribed=count_of(
+            CustomUser.habits.through.objects.all(), "customuser"
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leagues", "0006_league_status"),
+        ("user", "0007_userscore_rank_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_usage, migrations.RunPython.noop),
+    ]
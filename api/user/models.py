@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
-from .managers import CustomUserManager
+from django.db.models.functions import Upper
+from .managers import CustomUserManager, UserUsageManager
 
 
 class CustomUser(AbstractBaseUser, PermissionsMixin):
@@ -44,6 +45,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name"]
 
+    class Meta:
+        # Serves case-insensitive exact email lookups, e.g. admin search.
+        indexes = [models.Index(Upper("email"), name="user_email_upper_idx")]
+
     def __str__(self):
         return self.email
 
@@ -54,6 +59,9 @@ class UserScore(models.Model):
     )
     score = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [models.Index(fields=["-score"], name="userscore_rank_idx")]
+
     def __str__(self):
         return f"{self.user} → {self.score} pts"
 
@@ -119,3 +127,37 @@ class UserProgress(models.Model):
 
     def __str__(self):
         return f"{self.user} → L{self.level} ({self.xp} XP)"
+
+
+class UserUsage(models.Model):
+    """Plan quota counters, kept in step with the operations that change them."""
+
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.CASCADE, related_name="usage"
+    )
+    leagues_joined = models.IntegerField(default=0)
+    leagues_created = models.IntegerField(default=0)
+    habits_subscribed = models.IntegerField(default=0)
+
+    objects = UserUsageManager()
+
+    def __str__(self):
+        return (
+            f"{self.user} → {self.leagues_joined} joined, "
+            f"{self.leagues_created} created, {self.habits_subscribed} habits"
+        )
+
+
+class RefreshTokenRecord(models.Model):
+    """An opaque refresh token, stored by hash, mapped to the real refresh JWT."""
+
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="refresh_tokens"
+    )
+    token_hash = models.CharField(max_length=64, unique=True)
+    refresh = models.TextField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} → refresh token until {self.expires_at}"
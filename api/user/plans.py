@@ -0,0 +1,87 @@
+import threading
+
+from core.stamps import stamps
+
+DEFAULT_PLAN_NAME = "Free"
+
+
+class PlanRegistry:
+    """
+    Process-wide, read-mostly copy of the Plan table.
+
+    Plans are loaded once and served from memory together with their
+    serialized payloads. Every Plan change bumps the "plans" stamp in the
+    database (see core.stamps); each process reloads once its memo of the
+    stamp moved, within about CACHE_STAMP_INTERVAL seconds.
+    """
+
+    version_key = "plans"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _load(self):
+        from .models import Plan
+        from .serializers import PlanSerializer
+
+        version = stamps.get(self.version_key)
+        plans = list(Plan.objects.order_by("id"))
+        by_id = {plan.id: plan for plan in plans}
+        by_name = {plan.name.lower(): plan for plan in plans}
+        payloads = {plan.id: dict(PlanSerializer(plan).data) for plan in plans}
+        return {
+            "version": version,
+            "by_id": by_id,
+            "by_name": by_name,
+            "payloads": payloads,
+            "payload_list": list(payloads.values()),
+        }
+
+    def _current(self):
+        state = self._state
+        if state is not None and stamps.get(self.version_key) == state["version"]:
+            return state
+
+        with self._lock:
+            state = self._state
+            if state is None or stamps.get(self.version_key) != state["version"]:
+                state = self._state = self._load()
+        return state
+
+    def get(self, plan_id):
+        """Return the Plan with this id, or None."""
+        return self._current()["by_id"].get(plan_id)
+
+    def get_by_name(self, name):
+        return self._current()["by_name"].get(name.lower())
+
+    def default(self):
+        return self.get_by_name(DEFAULT_PLAN_NAME)
+
+    def max_habits(self, plan_id):
+        plan = self.get(plan_id)
+        return plan.max_habits if plan else None
+
+    def max_leagues(self, plan_id):
+        plan = self.get(plan_id)
+        return plan.max_leagues if plan else None
+
+    def payload(self, plan_id):
+        """Serialized PlanSerializer data for a plan, or None."""
+        return self._current()["payloads"].get(plan_id)
+
+    def payloads(self):
+        return self._current()["payload_list"]
+
+    def clear(self):
+        """Drop this process's copy; it is reloaded on next access."""
+        self._state = None
+
+    def invalidate(self):
+        """Make every process reload, e.g. after a Plan was saved."""
+        stamps.bump(self.version_key)
+        self.clear()
+
+
+plan_registry = PlanRegistry()
@@ -1,12 +1,12 @@
-import secrets
-from django.core.cache import cache
+from django.db import transaction
 from rest_framework_simplejwt.serializers import (
     TokenObtainPairSerializer,
 )
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import serializers
 from .models import CustomUser, UserScore, Plan, UserProgress
-from habit.models import Habit
+from .plans import plan_registry
+from .tokens import get_token_store
 
 
 class OpaqueTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -15,11 +15,7 @@ class OpaqueTokenObtainPairSerializer(TokenObtainPairSerializer):
         raw_refresh = data.pop("refresh")
 
         refresh = RefreshToken(raw_refresh)
-        opaque = secrets.token_urlsafe(32)
-
-        cache.set(opaque, str(refresh), timeout=refresh.lifetime.total_seconds())
-
-        data["refresh"] = opaque
+        data["refresh"] = get_token_store().issue(refresh)
         return data
 
 
@@ -51,13 +47,10 @@ class PlanSerializer(serializers.ModelSerializer):
 
 class UserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(validators=[])
-    habits = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Habit.objects.all(),
-        required=False,
-        allow_empty=True,
-    )
-    plan = PlanSerializer(read_only=True)
+    # Subscriptions change through the user-habits endpoint only, which
+    # enforces the plan's max_habits and keeps UserUsage in step.
+    habits = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    plan = serializers.SerializerMethodField()
 
     progress = UserProgressSerializer(read_only=True)
 
@@ -97,6 +90,10 @@ class UserSerializer(serializers.ModelSerializer):
             "password": {"write_only": True},
         }
 
+    def get_plan(self, obj):
+        # Same payload as PlanSerializer, served from memory.
+        return plan_registry.payload(obj.plan_id)
+
     def validate_email(self, value):
         if CustomUser.objects.filter(email=value).exists():
             raise serializers.ValidationError("A user with this email already exists.")
@@ -104,10 +101,13 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         if not validated_data.get("plan"):
-            free_plan = Plan.objects.get(name="Free")
-            validated_data["plan"] = free_plan
+            validated_data["plan"] = plan_registry.default()
 
-        user = CustomUser.objects.create_user(**validated_data)
+        # The user row is written once; progress is created by the post_save
+        # signal inside the same transaction, and the score row alongside it.
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(**validated_data)
+            UserScore.objects.create(user=user)
         return user
 
 
@@ -1,16 +1,17 @@
-from django.db.models.signals import post_save, post_migrate
+from django.db.models.signals import post_delete, post_save, post_migrate, pre_save
 from django.dispatch import receiver
 
-from .models import CustomUser, UserProgress, Plan
+from core.metrics import SIGNAL_TIME
+from .models import CustomUser, UserProgress, UserUsage, Plan
+from .plans import plan_registry
 
 
-@receiver(post_save, sender=CustomUser)
-def set_default_plan(sender, instance, created, **kwargs):
-    if created and not instance.plan:
-        free_plan = Plan.objects.get(name="Free")
-        if free_plan:
-            instance.plan = free_plan
-            instance.save()
+@receiver(pre_save, sender=CustomUser)
+@SIGNAL_TIME.time(handler="set_default_plan")
+def set_default_plan(sender, instance, **kwargs):
+    # Assigned before the INSERT so a new user is written only once.
+    if instance._state.adding and instance.plan_id is None:
+        instance.plan = plan_registry.default()
 
 
 @receiver(post_save, sender=CustomUser)
@@ -19,6 +20,18 @@ def create_user_progress(sender, instance, created, **kwargs):
         UserProgress.objects.create(user=instance)
 
 
+@receiver(post_save, sender=CustomUser)
+def create_user_usage(sender, instance, created, **kwargs):
+    if created:
+        UserUsage.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def refresh_plan_registry(sender, **kwargs):
+    plan_registry.invalidate()
+
+
 @receiver(post_migrate)
 def create_default_plan(sender, **kwargs):
     if sender.name == "user":
@@ -1,17 +1,29 @@
+import os
+from importlib import import_module
+from datetime import timedelta
+import tempfile
+from io import StringIO
+from django.core.management import call_command
 from django.urls import reverse
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APIClient, APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
 from django.core.cache import cache
 from django.contrib.auth import get_user_model
-from .models import UserScore, Plan, UserProgress
+from django.test import override_settings
+from core.testing import QueryBudgetAPIClient
+from habit.models import Habit
+from .models import UserScore, Plan, UserProgress, UserUsage, RefreshTokenRecord
+from .serializers import PlanSerializer
+from .plans import plan_registry
+from .tokens import get_token_store
 
 User = get_user_model()
 
 
 class UserViewsTests(APITestCase):
     def setUp(self):
-        self.client = APIClient()
+        self.client = QueryBudgetAPIClient()
 
         # Ensure base plans exist
         self.free_plan, _ = Plan.objects.get_or_create(
@@ -84,6 +96,29 @@ class UserViewsTests(APITestCase):
         self.assertTrue(
             UserProgress.objects.filter(user=new_user).exists()
         )  # progress created
+        self.assertTrue(UserScore.objects.filter(user=new_user).exists())
+
+    def test_signup_ignores_habits(self):
+        habits = [Habit.objects.create(name=f"Signup {i}") for i in range(6)]
+        data = {
+            "email": "habits@example.com",
+            "password": "strongpassword",
+            "habits": [habit.id for habit in habits],
+        }
+        response = self.client.post(reverse("user-create"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["habits"], [])
+        self.assertFalse(User.objects.get(email="habits@example.com").habits.exists())
+
+    def test_current_user_cannot_patch_habits(self):
+        habit = Habit.objects.create(name="Sneaky")
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.patch(
+            reverse("current-user"), {"habits": [habit.id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.user.habits.exists())
 
     # ---------------- UserDetailView ----------------
     def test_retrieve_user_detail(self):
@@ -117,9 +152,7 @@ class UserViewsTests(APITestCase):
 
     def test_refresh_with_opaque_token(self):
         refresh = RefreshToken.for_user(self.user)
-
-        opaque = "opaque123"
-        cache.set(opaque, str(refresh), timeout=int(refresh.lifetime.total_seconds()))
+        opaque = get_token_store().issue(refresh)
 
         url = reverse("token_refresh")
         response = self.client.post(url, {"refresh": opaque}, format="json")
@@ -128,6 +161,50 @@ class UserViewsTests(APITestCase):
         self.assertIn("access", response.data)
         self.assertIn("refresh", response.data)
 
+        # The old opaque token is consumed by the rotation
+        response = self.client.post(url, {"refresh": opaque}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_tokens_are_stored_hashed(self):
+        opaque = get_token_store().issue(RefreshToken.for_user(self.user))
+        self.assertFalse(RefreshTokenRecord.objects.filter(token_hash=opaque).exists())
+        self.assertEqual(RefreshTokenRecord.objects.filter(user=self.user).count(), 1)
+
+    def test_revoke_all_sessions(self):
+        store = get_token_store()
+        opaques = [store.issue(RefreshToken.for_user(self.user)) for _ in range(2)]
+        other = store.issue(RefreshToken.for_user(self.other_user))
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse("token_revoke_all"))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertTrue(all(store.get(opaque) is None for opaque in opaques))
+        self.assertIsNotNone(store.get(other))
+
+    def test_sweep_removes_expired_tokens(self):
+        store = get_token_store()
+        store.issue(RefreshToken.for_user(self.user))
+        expired = RefreshToken.for_user(self.other_user)
+        expired.set_exp(lifetime=-timedelta(seconds=1))
+        store.issue(expired)
+
+        self.assertEqual(store.sweep(chunk_size=1), 1)
+        self.assertEqual(RefreshTokenRecord.objects.count(), 1)
+
+    @override_settings(OPAQUE_TOKEN_STORE="user.tokens.CacheTokenStore")
+    def test_cache_token_store(self):
+        store = get_token_store()
+        opaque = store.issue(RefreshToken.for_user(self.user))
+        self.assertIsNotNone(store.get(opaque))
+
+        new_opaque = store.rotate(opaque)
+        self.assertIsNotNone(new_opaque)
+        self.assertIsNone(store.rotate(opaque))
+
+        store.revoke_user(self.user.id)
+        self.assertIsNone(store.get(new_opaque))
+
     def test_refresh_with_invalid_opaque_token(self):
         url = reverse("token_refresh")
         response = self.client.post(url, {"refresh": "invalid"}, format="json")
@@ -155,3 +232,107 @@ class UserViewsTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["id"], self.plus_plan.id)
+
+    def test_retrieve_plan_not_found(self):
+        url = reverse("plan-detail", args=[999])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_plans_are_served_from_registry(self):
+        plan_registry.payloads()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("plan-list"))
+        self.assertEqual(
+            response.data, [PlanSerializer(p).data for p in Plan.objects.order_by("id")]
+        )
+
+    def test_plan_save_refreshes_registry(self):
+        self.addCleanup(plan_registry.clear)
+        self.plus_plan.max_habits = 42
+        self.plus_plan.save()
+        self.assertEqual(plan_registry.max_habits(self.plus_plan.id), 42)
+
+
+class BulkCreateUsersCommandTests(APITestCase):
+    def write_csv(self, content):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w") as fh:
+            fh.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_bulk_create_users(self):
+        User.objects.create_user(email="existing@example.com", password="pass1234")
+        path = self.write_csv(
+            "email,first_name,last_name,plan,password\n"
+            "a@example.com,A,One,Plus,secret123\n"
+            "b@example.com,B,Two,,\n"
+            "existing@example.com,E,Three,,\n"
+        )
+
+        call_command("bulk_create_users", path, batch_size=2, stdout=StringIO())
+
+        a = User.objects.get(email="a@example.com")
+        b = User.objects.get(email="b@example.com")
+        self.assertEqual(a.plan.name, "Plus")
+        self.assertEqual(b.plan.name, "Free")
+        self.assertTrue(a.check_password("secret123"))
+        self.assertFalse(b.has_usable_password())
+        self.assertTrue(UserProgress.objects.filter(user=b).exists())
+        self.assertTrue(UserScore.objects.filter(user=b).exists())
+        self.assertEqual(User.objects.filter(email="existing@example.com").count(), 1)
+
+
+class ReconcileUsageCommandTests(APITestCase):
+    def test_reconcile_corrects_drift(self):
+        from habit.models import Habit
+
+        user = User.objects.create_user(email="drift@example.com", password="x")
+        user.habits.set(
+            [Habit.objects.create(name="A"), Habit.objects.create(name="B")]
+        )
+        UserUsage.objects.filter(user=user).update(leagues_joined=5)
+        legacy = User.objects.create_user(email="legacy@example.com", password="x")
+        UserUsage.objects.filter(user=legacy).delete()
+
+        call_command("reconcile_usage", batch_size=1, stdout=StringIO())
+
+        usage = UserUsage.objects.get(user=user)
+        self.assertEqual(usage.leagues_joined, 0)
+        self.assertEqual(usage.habits_subscribed, 2)
+        self.assertTrue(UserUsage.objects.filter(user=legacy).exists())
+
+    def test_reconcile_skips_ended_leagues(self):
+        from datetime import date
+        from habit.models import Habit
+        from leagues.models import League, LeagueParticipant
+
+        user = User.objects.create_user(email="veteran@example.com", password="x")
+        for status in (League.ACTIVE, League.ENDED):
+            league = League.objects.create(
+                created_by=user,
+                title=status,
+                habit=Habit.objects.create(name=status),
+                start_date=date(2030, 1, 1),
+                end_date=date(2030, 2, 1),
+                status=status,
+            )
+            LeagueParticipant.objects.create(league=league, user=user)
+
+        call_command("reconcile_usage", stdout=StringIO())
+        self.assertEqual(UserUsage.objects.get(user=user).leagues_joined, 1)
+
+    def test_migration_backfills_real_counts(self):
+        from django.apps import apps
+        from habit.models import Habit
+
+        migration = import_module("user.migrations.0008_backfill_userusage")
+        user = User.objects.create_user(email="old@example.com", password="x")
+        user.habits.add(Habit.objects.create(name="A"))
+        UserUsage.objects.filter(user=user).delete()
+
+        migration.backfill_usage(apps, None)
+
+        usage = UserUsage.objects.get(user=user)
+        self.assertEqual(usage.habits_subscribed, 1)
+        self.assertEqual(usage.leagues_joined, 0)
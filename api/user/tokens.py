@@ -0,0 +1,187 @@
+import hashlib
+import secrets
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RefreshTokenRecord
+
+DEFAULT_TOKEN_STORE = "user.tokens.DatabaseTokenStore"
+
+
+def hash_token(opaque: str) -> str:
+    return hashlib.sha256(opaque.encode()).hexdigest()
+
+
+def new_opaque_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+class BaseTokenStore:
+    """
+    Maps opaque refresh tokens handed to clients onto the real refresh JWTs.
+
+    Implementations must be shared by every worker, and `rotate` must let
+    exactly one caller consume a given opaque token.
+    """
+
+    def issue(self, refresh) -> str:
+        """Store a RefreshToken and return the opaque token for it."""
+        raise NotImplementedError
+
+    def get(self, opaque: str) -> str | None:
+        """Return the refresh JWT for an opaque token, or None."""
+        raise NotImplementedError
+
+    def rotate(self, opaque: str) -> str | None:
+        """Replace an opaque token with a new one, or return None if it is gone."""
+        raise NotImplementedError
+
+    def revoke(self, opaque: str) -> None:
+        raise NotImplementedError
+
+    def revoke_user(self, user_id) -> None:
+        """Revoke every refresh token issued to a user ("log out everywhere")."""
+        raise NotImplementedError
+
+    def sweep(self, chunk_size: int = 5000) -> int:
+        """Delete expired tokens; return how many were removed."""
+        return 0
+
+    @staticmethod
+    def user_id_of(refresh):
+        return refresh[api_settings.USER_ID_CLAIM]
+
+    @staticmethod
+    def expiry_of(refresh) -> datetime:
+        return datetime.fromtimestamp(refresh["exp"], tz=dt_timezone.utc)
+
+
+class DatabaseTokenStore(BaseTokenStore):
+    """Stores hashed opaque tokens in RefreshTokenRecord."""
+
+    def issue(self, refresh) -> str:
+        opaque = new_opaque_token()
+        RefreshTokenRecord.objects.create(
+            user_id=self.user_id_of(refresh),
+            token_hash=hash_token(opaque),
+            refresh=str(refresh),
+            expires_at=self.expiry_of(refresh),
+        )
+        return opaque
+
+    def get(self, opaque: str) -> str | None:
+        return (
+            RefreshTokenRecord.objects.filter(
+                token_hash=hash_token(opaque), expires_at__gt=timezone.now()
+            )
+            .values_list("refresh", flat=True)
+            .first()
+        )
+
+    def rotate(self, opaque: str) -> str | None:
+        new_opaque = new_opaque_token()
+        # A single conditional UPDATE: only one concurrent caller can match
+        # the old hash, so the token is consumed exactly once.
+        updated = RefreshTokenRecord.objects.filter(
+            token_hash=hash_token(opaque), expires_at__gt=timezone.now()
+        ).update(token_hash=hash_token(new_opaque))
+        return new_opaque if updated else None
+
+    def revoke(self, opaque: str) -> None:
+        RefreshTokenRecord.objects.filter(token_hash=hash_token(opaque)).delete()
+
+    def revoke_user(self, user_id) -> None:
+        RefreshTokenRecord.objects.filter(user_id=user_id).delete()
+
+    def sweep(self, chunk_size: int = 5000) -> int:
+        removed = 0
+        now = timezone.now()
+        while True:
+            ids = list(
+                RefreshTokenRecord.objects.filter(expires_at__lte=now).values_list(
+                    "pk", flat=True
+                )[:chunk_size]
+            )
+            if not ids:
+                return removed
+            removed += RefreshTokenRecord.objects.filter(pk__in=ids).delete()[0]
+
+
+class CacheTokenStore(BaseTokenStore):
+    """
+    Stores tokens in the default cache. Only safe across workers when CACHES
+    points at a shared backend such as Redis; expiry is left to the cache.
+    """
+
+    key_prefix = "refresh-token"
+
+    def key(self, opaque: str) -> str:
+        return f"{self.key_prefix}:{hash_token(opaque)}"
+
+    def generation_key(self, user_id) -> str:
+        return f"{self.key_prefix}-generation:{user_id}"
+
+    def generation(self, user_id) -> int:
+        return cache.get(self.generation_key(user_id), 0)
+
+    def _set(self, opaque, user_id, refresh_str, expires_at):
+        timeout = max(int((expires_at - timezone.now()).total_seconds()), 1)
+        cache.set(
+            self.key(opaque),
+            (user_id, self.generation(user_id), refresh_str, expires_at),
+            timeout=timeout,
+        )
+
+    def _load(self, opaque):
+        entry = cache.get(self.key(opaque))
+        if entry is None:
+            return None
+        user_id, generation, _, _ = entry
+        if generation != self.generation(user_id):
+            return None
+        return entry
+
+    def issue(self, refresh) -> str:
+        opaque = new_opaque_token()
+        self._set(
+            opaque, self.user_id_of(refresh), str(refresh), self.expiry_of(refresh)
+        )
+        return opaque
+
+    def get(self, opaque: str) -> str | None:
+        entry = self._load(opaque)
+        return entry[2] if entry else None
+
+    def rotate(self, opaque: str) -> str | None:
+        entry = self._load(opaque)
+        # delete() reports whether the key existed, so only one caller wins.
+        if entry is None or not cache.delete(self.key(opaque)):
+            return None
+        user_id, _, refresh_str, expires_at = entry
+        new_opaque = new_opaque_token()
+        self._set(new_opaque, user_id, refresh_str, expires_at)
+        return new_opaque
+
+    def revoke(self, opaque: str) -> None:
+        cache.delete(self.key(opaque))
+
+    def revoke_user(self, user_id) -> None:
+        key = self.generation_key(user_id)
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+_store = None
+
+
+def get_token_store() -> BaseTokenStore:
+    global _store
+    path = getattr(settings, "OPAQUE_TOKEN_STORE", DEFAULT_TOKEN_STORE)
+    if _store is None or _store[0] != path:
+        _store = (path, import_string(path)())
+    return _store[1]
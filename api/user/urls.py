@@ -5,6 +5,11 @@ urlpatterns = [
     # Auth (JWT)
     path("token/", views.OpaqueTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", views.OpaqueRefreshView.as_view(), name="token_refresh"),
+    path(
+        "token/revoke-all/",
+        views.RevokeAllSessionsView.as_view(),
+        name="token_revoke_all",
+    ),
     # User endpoints
     path("", views.UserCreateView.as_view(), name="user-create"),
     path("<int:pk>/", views.UserDetailView.as_view(), name="user-detail"),
@@ -18,3 +23,16 @@ urlpatterns = [
     path("plans/", views.PlanListView.as_view(), name="plan-list"),
     path("plans/<int:pk>/", views.PlanDetailView.as_view(), name="plan-detail"),
 ]
+
+# Maximum queries per request, enforced in tests by QueryBudgetAPIClient.
+query_budgets = {
+    "token_obtain_pair": 2,
+    "token_refresh": 2,
+    "token_revoke_all": 1,
+    "user-create": 8,
+    "user-detail": 3,
+    "current-user": 1,
+    "global-leaderboard": 1,
+    "plan-list": 0,
+    "plan-detail": 0,
+}
@@ -1,11 +1,13 @@
-import secrets
-from django.core.cache import cache
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework import generics, permissions
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from core.authentication import user_stamp
+from core.readonly import ValuesListMixin
+from core.response_cache import AnonymousResponseCacheMixin
 from .models import CustomUser, UserScore, Plan
 from .serializers import (
     UserSerializer,
@@ -13,6 +15,8 @@ from .serializers import (
     OpaqueTokenObtainPairSerializer,
     PlanSerializer,
 )
+from .plans import plan_registry
+from .tokens import get_token_store
 
 
 # User Views
@@ -33,7 +37,8 @@ class OpaqueRefreshView(TokenRefreshView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        real_refresh = cache.get(opaque)
+        store = get_token_store()
+        real_refresh = store.get(opaque)
         if not real_refresh:
             return Response(
                 {"detail": "Invalid or expired refresh token."},
@@ -44,20 +49,32 @@ class OpaqueRefreshView(TokenRefreshView):
             refresh = RefreshToken(real_refresh)
             access = refresh.access_token
         except Exception:
+            store.revoke(opaque)
             return Response(
                 {"detail": "Token invalid."}, status=status.HTTP_401_UNAUTHORIZED
             )
 
         # Rotate: invalidate old opaque and issue a new one
-        cache.delete(opaque)
-        new_opaque = secrets.token_urlsafe(32)
-        cache.set(
-            new_opaque, str(refresh), timeout=int(refresh.lifetime.total_seconds())
-        )
+        new_opaque = store.rotate(opaque)
+        if not new_opaque:
+            return Response(
+                {"detail": "Invalid or expired refresh token."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
 
         return Response({"access": str(access), "refresh": new_opaque})
 
 
+class RevokeAllSessionsView(generics.GenericAPIView):
+    """Revoke every refresh token of the current user (log out everywhere)."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        get_token_store().revoke_user(request.user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class UserCreateView(generics.CreateAPIView):
     """Create a new user."""
 
@@ -66,12 +83,17 @@ class UserCreateView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(AnonymousResponseCacheMixin, generics.RetrieveAPIView):
     """Retrieve details of a specific user by ID."""
 
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    cache_namespace = "users"
+
+    def response_cache_stamps(self):
+        # A user's own changes only bump their stamp (see core.signals).
+        return [*super().response_cache_stamps(), user_stamp(self.kwargs["pk"])]
 
     def get_object(self):
         return get_object_or_404(CustomUser, pk=self.kwargs.get("pk"))
@@ -87,21 +109,32 @@ class CurrentUserView(generics.RetrieveUpdateDestroyAPIView):
         return self.request.user
 
 
-class GlobalLeaderboardView(generics.ListAPIView):
-    """List users ranked globally by score."""
+class GlobalLeaderboardView(
+    AnonymousResponseCacheMixin, ValuesListMixin, generics.ListAPIView
+):
+    """
+    List users ranked globally by score.
+    Scores change constantly, so anonymous responses expire by time only.
+    """
 
     queryset = UserScore.objects.all().order_by("-score")
     serializer_class = UserScoreSerializer
     permission_classes = [permissions.AllowAny]
+    cache_namespace = "leaderboard"
+    cache_fresh_seconds = 10
 
 
 # Plans Views
-class PlanListView(generics.ListAPIView):
+class PlanListView(AnonymousResponseCacheMixin, generics.ListAPIView):
     """List all plans. Creation of plans is handled via admin interface."""
 
     queryset = Plan.objects.all()
     serializer_class = PlanSerializer
     permission_classes = [permissions.AllowAny]
+    cache_namespace = "plans"
+
+    def list(self, request, *args, **kwargs):
+        return Response(plan_registry.payloads())
 
 
 class PlanDetailView(generics.RetrieveAPIView):
@@ -111,5 +144,8 @@ class PlanDetailView(generics.RetrieveAPIView):
     serializer_class = PlanSerializer
     permission_classes = [permissions.AllowAny]
 
-    def get_object(self):
-        return get_object_or_404(Plan, pk=self.kwargs.get("pk"))
+    def retrieve(self, request, *args, **kwargs):
+        payload = plan_registry.payload(self.kwargs.get("pk"))
+        if payload is None:
+            raise Http404
+        return Response(payload)